@@ -1,56 +1,135 @@
 import asyncio
 import json
 import os
-from crawl4ai import AsyncWebCrawler, BrowserConfig, CrawlerRunConfig, CacheMode, JsonCssExtractionStrategy
+from functools import lru_cache
+from crawl4ai import AsyncWebCrawler, BrowserConfig, CrawlerRunConfig, CacheMode
 
-SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+# The shared TCDS_Scraping_Tool package has to be importable: use `python -m TCDS_Scraping_Tool crawl`,
+# or run this script from the repository root with PYTHONPATH=. (see the README)
+from TCDS_Scraping_Tool.detail_extractor import load_schema
+from TCDS_Scraping_Tool.response_cache import CacheMiss, cache_key
 
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 TCDS_BASE_URL = "https://txdot.public.ms2soft.com/tcds/tsearch.asp"
+SCHEMA_PATH = os.path.join(SCRIPT_DIR, 'tcds_extraction_schema.json')
 
 
-async def go_to_station(station_id, crawler):
+async def go_to_station(station_id, crawler, cache=None, session_id="tcds_session"):
+    """
+    Crawl a station detail page and extract it with the schema.
+    The schema is compiled once per process and applied to the page HTML, so the crawler
+    only loads the page. With a ResponseCache, a fresh cached page is extracted without
+    loading the site.
+    """
     url = f"{TCDS_BASE_URL}?loc=Txdot&mod=tcds&local_id={station_id}"
+    extractor = load_schema(SCHEMA_PATH)
+
+    key = cache_key('tsearch.asp', 'Txdot', station_id)
+    try:
+        cached_html = cache.get_fresh(key, current=True) if cache else None
+    except CacheMiss:
+        print(f"{station_id} is not in the cache")
+        return None
+
+    if cached_html is not None:
+        return extractor.extract(cached_html)
 
-    schema_path = os.path.join(SCRIPT_DIR, 'tcds_extraction_schema.json')
-    with open(schema_path, 'r') as f:
-        schema = json.load(f)
+    result = await crawler.arun(url=url, config=station_run_config(session_id))
+    if result.success:
+        if cache:
+            cache.store(key, result.html)
+        return extractor.extract(result.html)
+    else:
+        print(f"Crawl failed for {station_id}: {result.error_message}")
+        return None
 
-    crawler_config = CrawlerRunConfig(
+
+@lru_cache(maxsize=None)
+def station_run_config(session_id):
+    """Run config for loading a station detail page in a browser session, built once per session"""
+    return CrawlerRunConfig(
         cache_mode=CacheMode.DISABLED,
-        extraction_strategy=JsonCssExtractionStrategy(schema, verbose=True),
-        session_id="tcds_session",
+        session_id=session_id,
         wait_until="networkidle",
         wait_for="css:#TCDS_TDETAIL_AADT_DIV table#tblTable4",
         delay_before_return_html=1.0,
         process_iframes=True,
     )
 
-    result = await crawler.arun(url=url, config=crawler_config)
-
-    if result.success:
-        extracted_data = json.loads(result.extracted_content)
-        return extracted_data
-    else:
-        print(f"Crawl failed for {station_id}: {result.error_message}")
-        return None
-    
 
-async def crawl_stations(station_ids, headless=True, output_file=None):
-    """Crawl one or more stations and return all results."""
+async def crawl_stations_iter(station_ids, crawler, concurrency=4, timeout=90, retries=2, cache=None):
+    """
+    Crawl stations over `concurrency` browser sessions and yield (station_id, data) as each finishes.
+    Each attempt is limited to `timeout` seconds and retried up to `retries` times with backoff;
+    data is None for stations that still failed.
+    """
+    sessions = asyncio.Queue()
+    for i in range(concurrency):
+        sessions.put_nowait(f"tcds_session_{i}")
+
+    async def crawl_one(station_id):
+        session_id = await sessions.get()
+        try:
+            for attempt in range(retries + 1):
+                try:
+                    data = await asyncio.wait_for(go_to_station(station_id, crawler, cache, session_id), timeout)
+                    if data:
+                        return station_id, data
+                except asyncio.TimeoutError:
+                    print(f"Timeout crawling {station_id} (attempt {attempt + 1}/{retries + 1})")
+                except Exception as e:
+                    print(f"Error crawling {station_id} (attempt {attempt + 1}/{retries + 1}): {e}")
+                if attempt < retries:
+                    await asyncio.sleep(2 ** attempt)
+            return station_id, None
+        finally:
+            sessions.put_nowait(session_id)
+
+    tasks = [asyncio.create_task(crawl_one(station_id)) for station_id in station_ids]
+    try:
+        for task in asyncio.as_completed(tasks):
+            yield await task
+    finally:
+        for task in tasks:
+            task.cancel()
+        for i in range(concurrency):
+            try:
+                await crawler.crawler_strategy.kill_session(f"tcds_session_{i}")
+            except Exception:
+                pass
+
+
+async def crawl_stations(station_ids, headless=True, output_file=None, cache=None, concurrency=1, timeout=90, retries=2):
+    """
+    Crawl one or more stations and return all results. `cache` is an optional ResponseCache.
+    With a .jsonl output_file each station is written as soon as it is crawled.
+    """
     browser_config = BrowserConfig(headless=headless)
     all_results = {}
-
-    async with AsyncWebCrawler(config=browser_config) as crawler:
-        for i, station_id in enumerate(station_ids, 1):
-            print(f"[{i}/{len(station_ids)}] Crawling {station_id}...")
-            data = await go_to_station(station_id, crawler)
-            if data:
+    out_path = os.path.join(SCRIPT_DIR, output_file) if output_file else None
+    stream = open(out_path, 'a') if out_path and out_path.endswith('.jsonl') else None
+
+    try:
+        async with AsyncWebCrawler(config=browser_config) as crawler:
+            results = crawl_stations_iter(station_ids, crawler, concurrency, timeout, retries, cache)
+            done = 0
+            async for station_id, data in results:
+                done += 1
+                print(f"[{done}/{len(station_ids)}] Crawled {station_id}" + ("" if data else " (failed)"))
+                if not data:
+                    continue
                 all_results[station_id] = data
-
-    if output_file:
-        out_path = os.path.join(SCRIPT_DIR, output_file)
+                if stream:
+                    stream.write(json.dumps({"station_id": station_id, "data": data}) + "\n")
+                    stream.flush()
+    finally:
+        if stream:
+            stream.close()
+
+    if out_path and not stream:
         with open(out_path, 'w') as f:
             json.dump(all_results, f, indent=2)
+    if out_path:
         print(f"Results saved to {out_path}")
 
     return all_results
@@ -0,0 +1,101 @@
+import re
+from typing import Dict, Iterable, List, Optional
+
+import lxml.html
+
+# direction value of the combined table in output records
+TWO_WAY = "two-way"
+# Column names as in C4A Tools/tcds_extraction_schema.json, in table order
+AADT_COLUMNS = ['year', 'aadt', 'dhv_30', 'k_percent', 'd_percent', 'pa', 'bc', 'src']
+AADT_TYPES = {
+    'year': int,
+    'aadt': int,
+    'dhv_30': int,
+    'k_percent': float,
+    'd_percent': float,
+    'pa': int,
+    'bc': int,
+    'src': str,
+}
+
+NUMBER_RE = re.compile(r'-?\d[\d,]*(?:\.\d+)?')
+
+
+def parse_int(value: str) -> Optional[int]:
+    """Leading number of a cell such as "12,345" or "1,234 (9%)", None if there is none"""
+    match = NUMBER_RE.search(value)
+    return int(float(match.group(0).replace(',', ''))) if match else None
+
+
+def parse_float(value: str) -> Optional[float]:
+    match = NUMBER_RE.search(value)
+    return float(match.group(0).replace(',', '')) if match else None
+
+
+CONVERTERS = {int: parse_int, float: parse_float, str: str.strip}
+
+
+def cell_text(td) -> str:
+    """Text of a cell without its <sup> footnote markers"""
+    parts = [td.text or '']
+    for child in td:
+        if child.tag != 'sup':
+            parts.append(child.text_content())
+        parts.append(child.tail or '')
+    return ''.join(parts).strip()
+
+
+def parse_aadt_page(html: str) -> List[dict]:
+    """
+    Extract the typed rows of one tcds_tdetail_aadt.asp page.
+    The first FormRowLabel row holds the column names; data rows follow until the
+    single-cell pagination row. Cells are read by position (the first cell is the
+    row icon), so an empty cell doesn't shift the remaining columns.
+    Returns:
+        [{'year': 2023, 'aadt': 12345, 'dhv_30': ..., 'src': ...}, ...]
+    """
+    if not html or 'FormRowLabel' not in html:
+        return []
+    rows = []
+    label_rows = [tr for tr in lxml.html.fromstring(html).iter('tr') if 'FormRowLabel' in (tr.get('class') or '').split()]
+    for tr in label_rows[1:]:
+        tds = tr.findall('td')
+        if len(tds) <= 1:
+            break
+        values = [cell_text(td) for td in tds[1:len(AADT_COLUMNS) + 1]]
+        row = {
+            name: CONVERTERS[AADT_TYPES[name]](value) if value else None
+            for name, value in zip(AADT_COLUMNS, values)
+        }
+        if row.get('year') is not None:
+            rows.append(row)
+    return rows
+
+
+def parse_aadt_pages(pages: Iterable[str]) -> List[dict]:
+    """
+    Typed rows of all pages of a station, keeping the first row seen for each year
+    """
+    all_rows = []
+    seen_year = set()
+    for html in pages:
+        for row in parse_aadt_page(html):
+            if row['year'] not in seen_year:
+                seen_year.add(row['year'])
+                all_rows.append(row)
+    return all_rows
+
+
+def station_records(station_id: str, results: Dict[Optional[str], List[dict]]) -> List[dict]:
+    """
+    Combine the AADT of all directions of a station into one table with a direction column
+    Args:
+        results: {None: two-way AADT, "NB": AADT, ...} as returned by ScrapeBackend.scrape_station
+    Returns:
+        [{'station_id': ..., 'direction': 'two-way' | 'NB' | ..., 'year': 2023, ...}, ...]
+    """
+    return [
+        {'station_id': station_id, 'direction': dir or TWO_WAY, **row}
+        for dir, rows in results.items()
+        for row in rows
+    ]
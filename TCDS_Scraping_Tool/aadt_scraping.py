@@ -1,76 +1,109 @@
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, ElementClickInterceptedException, NoSuchElementException
 import time
 import random
-import re
-import pandas as pd
 import argparse
-import csv
-from typing import List, Dict
+from typing import List, Dict, Optional
 from pathlib import Path
 import os
 import json
 import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta
 
+from TCDS_Scraping_Tool.aadt_parser import station_records
+from TCDS_Scraping_Tool.backends import ScrapeBackend, get_backend
+from TCDS_Scraping_Tool.config import (add_cache_arguments, add_output_arguments, add_rate_arguments, rate_controller,
+                                       response_cache, setup_logging, sink_options)
+from TCDS_Scraping_Tool.metrics import Metrics
+from TCDS_Scraping_Tool.progress_store import ProgressStore
+from TCDS_Scraping_Tool.rate_limit import AdaptiveRateController
+from TCDS_Scraping_Tool.response_cache import CacheMiss, ResponseCache
+from TCDS_Scraping_Tool.sinks import RecordSink, open_sink, output_files
+from TCDS_Scraping_Tool.spool import Spool, parse_spool_files
+from TCDS_Scraping_Tool.work_queue import WorkQueue, worker_name, worker_output_path
+
 class BatchScrapper:
 
     def __init__(self, 
                  batch_size: int = 25,
-                 delay_between_requests: tuple = (10, 15),
                  delay_between_batches: tuple = (300, 600), 
                  max_retries: int = 3,
-                 progress_file: str = "scraping_progress.json"):
+                 progress_file: str = "scraping_progress.sqlite",
+                 backend: str = "http",
+                 fallback_backend: Optional[str] = None,
+                 driver_pool_size: int = 1,
+                 driver_max_uses: int = 50,
+                 driver_timeout: float = 20,
+                 workers: int = 1,
+                 rate_limit: float = 0.5,
+                 min_rate: float = 0.05,
+                 max_rate: float = 2.0,
+                 output_file: str = "output.jsonl",
+                 flush_every: int = 500,
+                 rotate_bytes: Optional[int] = None,
+                 spool_dir: Optional[str] = None,
+                 parse_processes: Optional[int] = None,
+                 cache: Optional[ResponseCache] = None,
+                 metrics_prom: Optional[str] = None):
         
         self.batch_size = batch_size
-        self.delay_between_requests = delay_between_requests
         self.delay_between_batches = delay_between_batches
         self.max_retries = max_retries
         self.progress_file = progress_file
+        self.backend_name = backend
+        self.fallback_backend_name = fallback_backend
+        self.backends: Dict[str, ScrapeBackend] = {}
+        self.workers = workers
+        # Requests per second to the server, adapted to its responses; shared by all workers and backends
+        self.rate_limiter = AdaptiveRateController(rate_limit, min_rate, max_rate, burst=workers)
+        self._progress_lock = threading.Lock()
+        self._in_progress_ids = set()
+        self.output_file = output_file
+        self.output_options = {'flush_every': flush_every, 'max_bytes': rotate_bytes}
+        self._sink: Optional[RecordSink] = None
+        # Pipeline mode: raw responses go to the spool and are parsed in a process pool while fetching
+        # continues, or only fetched (spool_parse False) and parsed later with TCDS_Scraping_Tool.spool
+        self.spool = Spool(spool_dir) if spool_dir else None
+        self.spool_parse = True
+        self.parse_processes = parse_processes
+        self._parser: Optional[ProcessPoolExecutor] = None
+        # (id, spool files, future of the records) of the stations being parsed
+        self._parsing = []
+        # IDs whose records are still buffered in the sink; marked completed once flushed
+        self._awaiting_flush = set()
+        # Spool files whose records are still buffered in the sink; marked parsed once flushed
+        self._parsed_files = []
+        # Stage timings and counters, dumped to batch_N_metrics.json (and metrics_prom) after each batch
+        self.metrics = Metrics()
+        self.metrics_prom = metrics_prom
+        self.backend_options = {
+            'http': {'cache': cache},
+            'selenium': {'pool_size': driver_pool_size, 'max_uses': driver_max_uses, 'timeout': driver_timeout},
+        }
         
         # Setup logging
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler('scraping.log'),
-                logging.StreamHandler()
-            ]
-        )
+        setup_logging('scraping.log')
         self.logger = logging.getLogger(__name__)
         
         # Load or initialize progress
         self.progress = self.load_progress()
 
-    def load_progress(self) -> dict:
-        """Load scraping progress from file"""
-        if os.path.exists(self.progress_file):
-            with open(self.progress_file, 'r') as f:
-                return json.load(f)
-        return {
-            'completed_ids': [],
-            'failed_ids': [],
-            'last_batch': 0,
-            'total_processed': 0
-        }
-    
-    def save_progress(self):
-        """Save current progress to file"""
-        with open(self.progress_file, 'w') as f:
-            json.dump(self.progress, f, indent=2)
+    def load_progress(self) -> ProgressStore:
+        """
+        Open the progress database, importing the old scraping_progress.json on first use.
+        Completed and failed IDs are committed one by one as they finish.
+        """
+        legacy_json = str(Path(self.progress_file).with_name("scraping_progress.json"))
+        return ProgressStore(self.progress_file, legacy_json=legacy_json)
     
-    def read_ids_from_file(self, file_path: str) -> List[str]:
-        """Read all ids from the input file"""
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return [id.strip() for id in f if id.strip()]
+    def save_progress(self, batch_num: int, batch_size: int):
+        """Save the batch counters"""
+        total_processed = self.progress.get_state('total_processed', 0) + batch_size
+        self.progress.set_state(last_batch=batch_num, total_processed=total_processed)
     
     def get_pending_ids(self, all_ids: List[str]) -> List[str]:
         """Get ids that haven't been processed yet"""
-        completed = set(self.progress['completed_ids'])
-        return [id for id in all_ids if id not in completed]
+        return self.progress.pending(all_ids)
     
     def create_batches(self, ids: List[str]) -> List[List[str]]:
         """Divide lines into batches"""
@@ -79,150 +112,187 @@ class BatchScrapper:
             batches.append(ids[i:i + self.batch_size])
         return batches
     
-    def open_tcds_detail_page(self, id: str):
-        """
-        Setup the the chromedriver and open the TCDS detail page.
-        Args:
-            id: station ID
+    def get_backend(self, name: str) -> ScrapeBackend:
+        """Return the backend with that name, creating it on first use"""
+        if name not in self.backends:
+            self.backends[name] = get_backend(name, self.logger, rate_controller=self.rate_limiter, metrics=self.metrics, **self.backend_options.get(name, {}))
+        return self.backends[name]
+
+    def close_backends(self):
+        for backend in self.backends.values():
+            backend.close()
+        self.backends = {}
+
+    @property
+    def sink(self) -> RecordSink:
+        """Output writer, opened on first use"""
+        if self._sink is None:
+            self._sink = open_sink(self.output_file, on_flush=self.commit_flushed, **self.output_options)
+        return self._sink
+
+    def commit_flushed(self):
+        """Mark IDs completed, and their spool files parsed, once their records have been flushed to the output"""
+        with self._progress_lock:
+            flushed, self._awaiting_flush = self._awaiting_flush, set()
+            parsed_files, self._parsed_files = self._parsed_files, []
+        if parsed_files:
+            self.spool.mark_parsed(parsed_files)
+        for id in flushed:
+            self.progress.mark_completed(id)
+
+    def submit_parse(self, id: str, paths: List[Path]):
+        """Start parsing the spool files of a station in the process pool, while fetching goes on"""
+        with self._progress_lock:
+            if self._parser is None:
+                self._parser = ProcessPoolExecutor(max_workers=self.parse_processes)
+            future = self._parser.submit(parse_spool_files, [str(path) for path in paths])
+            self._parsing.append((id, paths, future))
+
+    def finish_parsing(self) -> Dict[str, str]:
         """
-        global driver
-        options = webdriver.ChromeOptions()
-        options.add_argument('--headless')  
-        options.add_argument('--no-sandbox')
-        options.add_argument('--disable-dev-shm-usage')
-        options.add_argument('--disable-gpu')
-        options.add_argument('--window-size=1920,1080')
-        user_agents = [
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
-            "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36",
-            "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36"
-        ]
-        options.add_argument(f'--user-agent={random.choice(user_agents)}')
-
-        driver = webdriver.Chrome()
-        driver.get(
-            f'https://txdot.public.ms2soft.com/tcds/tsearch.asp?loc=Txdot&mod=tcds&local_id={id}'  
-            )
-        #Sleep for at least 8 seconds in case the AADT table doesn't load 
-        time.sleep(random.randint(8,10)) 
-
-        return
-
-    def check_dir(self):
-        """
-        Check if there are multiple directions in AADT page. 
-        If it is only two-way, proceed with just one scraping process.
-        If there are different directions, after finishing the two-way, scrape each direction. 
-
-        Returns: 
-            A list of available directions ["NB", "SB"] or None for "two-way" only
+        Wait for the stations being parsed and write their records. Each station is marked
+        completed, and its spool files parsed, when the records are flushed.
+        Returns:
+            {id: reason} of the stations whose spool files could not be parsed
         """
-
-        # One-way or Two-way X-Path: //*[@id="DIR_BUTTONS_DIV"]/span/div[2]/input
-        global driver
-        input_elements = driver.find_elements(By.XPATH, "//div[@id='DIR_BUTTONS_DIV']//input")
-        values = [element.get_attribute('value') for element in input_elements if element.get_attribute('value') in ["NB", "SB", "EB", "WB"]]
-        return values
-
-    def click_dir_button(self, dir: str, timeout = 20):
-        global driver
-        xpath = f"//div[@id='DIR_BUTTONS_DIV']//input[@value='{dir}']"
-        print(f"Getting Direction {dir} direction")
-        self.logger.info(f"Getting Direction {dir} direction")
+        with self._progress_lock:
+            parsing, self._parsing = self._parsing, []
+        failures = {}
+        for id, paths, future in parsing:
+            try:
+                with self.metrics.span('parse', step='spool'):
+                    records = future.result()
+            except Exception as e:
+                failures[id] = f"could not parse spooled responses: {e}"
+                self.logger.error(f"Failed to parse the spooled responses of ID {id}: {e}")
+                with self._progress_lock:
+                    self.progress.mark_failed(id, failures[id])
+                continue
+            with self.metrics.span('write', step='records', rows=len(records)):
+                self.sink.write_many(records)
+            with self._progress_lock:
+                self._awaiting_flush.add(id)
+                self._parsed_files.extend(paths)
+        return failures
+
+    def parse_leftover_spool(self):
+        """Parse the spool files that an interrupted run fetched but did not write to the output"""
+        stations = {}
+        for path in self.spool.files():
+            stations.setdefault(path.parent.name, []).append(path)
+        if not stations:
+            return
+        self.logger.info(f"Parsing the unparsed spool files of {len(stations)} stations")
+        for id, paths in stations.items():
+            self.submit_parse(id, paths)
+        self.finish_parsing()
+        self.sink.flush()
+
+    def close(self):
+        """Flush the output, release backends and close the progress database"""
         try:
-            element = WebDriverWait(driver, timeout).until(EC.element_to_be_clickable((By.XPATH, xpath)))
-            element.click()
-
-            time.sleep(2)
-
-            # Check if that direction button is click by checking onClick is "javascript:void(0)" - if so, exit
-            element = WebDriverWait(driver, timeout).until(EC.presence_of_element_located((By.XPATH, xpath))) #Webpage will refresh, so we will re-locate the element
-            onclick_value = element.get_attribute('onclick')
-            if onclick_value == "javascript:void(0)":
-                print(f"'{dir}' has been clicked")
-                return True
-        
-        except NoSuchElementException:
-            print(f"Element with direction value of '{dir}' not found")
-            self.logger.info(f"Element with direction value of '{dir}' not found")
-            return False
-    
-        return False
-
+            # Stations still being parsed keep unparsed spool files, which the next run parses
+            if self._parser is not None:
+                self._parser.shutdown(cancel_futures=True)
+                self._parser = None
+            # Closing the sink flushes it, which marks the last IDs completed
+            if self._sink is not None:
+                self._sink.close()
+                self._sink = None
+        finally:
+            try:
+                self.close_backends()
+            finally:
+                self.progress.close()
 
-    def scrape_aadt_data(self, tablediv_xpath = ".//tr[@class='FormRowLabel']/following-sibling::tr", timeout=20):
+    def scrape_station(self, id: str, raw: bool = False) -> dict:
         """
-        Extract AADT data page by page and export the AADT data to a CSV file
+        Scrape a station with the main backend, then with the fallback backend if that fails.
+        Each backend is retried up to max_retries times, after a jittered backoff. An AADT
+        table without data rows is a final answer: it is neither retried nor reported to the
+        rate controller (backends report throttled and malformed responses themselves).
+        Args:
+            raw: return the unparsed page HTML instead of AADT rows
         Returns:
-            Dictionary containing the scraped AADT data [{year: aadt}, ...]
+            {None: two-way AADT, "NB": AADT, ...}, empty if the station has no AADT
+        Raises:
+            The error of the last attempt if every backend failed
         """
-        
-        global driver
-        all_aadt = []
+        names = [self.backend_name]
+        if self.fallback_backend_name and self.fallback_backend_name != self.backend_name:
+            names.append(self.fallback_backend_name)
 
-        #Create check set to check for repetitive years. Sometimes the website is slow responding to next page button click, and we will get duplicated years in our outputs. 
-        seen_year = set()
-        
-        while True:
-            try:
-                # Wait for table to be present and visible
-                table_div = WebDriverWait(driver, timeout).until(
-                    EC.visibility_of_element_located((By.ID, "TCDS_TDETAIL_AADT_DIV"))
-                )
-                
-                #have to wait a few seconds before selenium be able to use the same element after page changes.
-                time.sleep(random.randrange(6,10)) 
-
-                # Get the data from current page
-                rows = WebDriverWait(driver,timeout).until(
-                    EC.visibility_of_all_elements_located((By.XPATH, tablediv_xpath))
-                    )
-                for row in rows:
-                    cells = row.find_elements(By.CLASS_NAME, "FormRow")
-                    if len(cells) >= 3:
-                        year = cells[1].get_attribute('innerHTML')
-                        aadt = re.sub(r'<sup>.*?</sup>', '', cells[2].get_attribute('innerHTML'))
-
-                        if year not in seen_year:
-                            seen_year.add(year)
-                            all_aadt.append({
-                                'year': year,
-                                'aadt': aadt
-                            })
-                
-                # Find and click next button
+        error = None
+        for name in names:
+            for attempt in range(self.max_retries + 1):
                 try:
-                    button = WebDriverWait(driver, timeout).until(
-                        EC.presence_of_element_located((By.XPATH, '//div[@id="TCDS_TDETAIL_AADT_DIV"]//input[@type="button" and @value=">" and @name="a_first"]'))
-                    )
-                    
-                    if not button.is_enabled():
-                        print("Reached last page")
-                        break
-                        
-                    button.click()
-
-                except TimeoutException as e:
-                    print("Next page button not found, might be the only AADT page")
-                    self.logger.info("Next page button not found, might be the only AADT page")
-                    return all_aadt
-                
+                    backend = self.get_backend(name)
+                    results = backend.fetch_pages(id) if raw else backend.scrape_station(id)
+                except CacheMiss:
+                    self.logger.info(f"ID {id} is not in the response cache")
+                    raise
                 except Exception as e:
-                    print(f"Error occurred: {e}. Exporting AADT data fetched so far.")
-                    self.logger.info(f"Error occurred: {e}. Exporting AADT data fetched so far.")
-                    return all_aadt
-                
-                
-            except TimeoutException as e:
-                print("Timeout waiting for elements")
-                self.logger.info("Timeout waiting for elements. ")
-                break
+                    error = e
+                    self.logger.error(f"Backend {name} failed for ID {id} (attempt {attempt + 1}/{self.max_retries + 1}): {e}")
+                else:
+                    if not results:
+                        self.logger.info(f"Station {id} has no AADT")
+                    return results
+                if attempt < self.max_retries:
+                    delay = self.rate_limiter.backoff_delay(attempt)
+                    self.logger.info(f"Retrying ID {id} in {delay:.1f} seconds")
+                    self.metrics.count('retries')
+                    with self.metrics.span('sleep', reason='backoff'):
+                        time.sleep(delay)
+        raise error
+
+    def process_batch_id(self, id: str, i: int, batch: List[str], batch_results: dict):
+        """Process one ID of a batch and record the outcome in progress and batch_results"""
+        with self._progress_lock:
+            if self.progress.is_completed(id) or id in self._in_progress_ids or id in self._awaiting_flush:
+                self.logger.info(f"Skipping already completed ID: {id}")
+                return
+            self._in_progress_ids.add(id)
+
+        try:
+            self.process_single_id(id)
+        except Exception as e:
+            with self._progress_lock:
+                self.progress.mark_failed(id, str(e) or type(e).__name__)
+                batch_results['failed'].append(id)
+            self.logger.error(f"Failed to retrieve ID:{id}")
+            return
+        finally:
+            with self._progress_lock:
+                self._in_progress_ids.discard(id)
+
+        with self._progress_lock:
+            if self.spool is None:
+                self._awaiting_flush.add(id)
+            elif not self.spool_parse:
+                # The raw responses are the output; they are parsed later with TCDS_Scraping_Tool.spool
+                self.progress.mark_completed(id)
+            # Otherwise it is completed once its spool files are parsed and written (finish_parsing)
+            batch_results['successful'].append(id)
+        self.logger.info(f"Completed {i+1}/{len(batch)}: {id}")
+
+    def run_batch_parallel(self, batch: List[str], batch_results: dict):
+        """
+        Process a batch with a pool of workers. Instead of sleeping between stations,
+        every request waits for the shared rate controller.
+        """
+        def work(i, id):
+            try:
+                self.process_batch_id(id, i, batch, batch_results)
             except Exception as e:
-                print(f"Error occurred: {e}")
-                self.logger.info(f"Error occurred: {e}")
-                break
-        
-        return all_aadt
+                self.logger.error(f"Error processing ID {id}: {str(e)}")
+                with self._progress_lock:
+                    self.progress.mark_failed(id, str(e))
+                    batch_results['failed'].append(id)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for i, id in enumerate(batch):
+                executor.submit(work, i, id)
 
     def process_batch(self, batch: List[str], batch_num: int) -> dict:
         self.logger.info(f"Starting batch {batch_num + 1} with {len(batch)} IDs")
@@ -235,44 +305,44 @@ class BatchScrapper:
         }
 
         try:
-            for i, id in enumerate(batch):
-                if id in self.progress['completed_ids']:
-                    self.logger.info(f"Skipping already completed ID: {id}")
-                    continue
-
-                single_id_result = self.process_single_id(id)
-
-                if single_id_result:
-                        self.progress['completed_ids'].append(id)
-                        batch_results['successful'].append(id)
-                        self.logger.info(f"Completed {i+1}/{len(batch)}: {id}")
-                else:
-                        self.progress['failed_ids'].append(id)
-                        batch_results['failed'].append(id)
-                        self.logger.error(f"Failed to retrieve ID:{id}")
-
-                # Random delay between requests (except for last item in batch)
-                if i < len(batch) - 1:
-                    delay = random.uniform(*self.delay_between_requests)
-                    self.logger.debug(f"Waiting {delay:.1f} seconds before next request")
-                    time.sleep(delay)
+            if self.workers > 1:
+                self.run_batch_parallel(batch, batch_results)
+            else:
+                # Requests are spaced out by the rate controller
+                for i, id in enumerate(batch):
+                    self.process_batch_id(id, i, batch, batch_results)
 
         except Exception as e:
             self.logger.error(f"Critical error in batch {batch_num + 1}: {str(e)}")
 
         
+        if self.spool is not None and self.spool_parse:
+            for id in self.finish_parsing():
+                if id in batch_results['successful']:
+                    batch_results['successful'].remove(id)
+                    batch_results['failed'].append(id)
+
         batch_results['end_time'] = datetime.now().isoformat()
-        self.progress['total_processed'] += len(batch)
-        self.progress['last_batch'] = batch_num
-        self.save_progress()
+        # Write out buffered records so that this batch's IDs are marked completed
+        if self.spool is None or self.spool_parse:
+            with self.metrics.span('write', step='flush'):
+                self.sink.flush()
+        self.save_progress(batch_num, len(batch))
 
         # Save batch results
         batch_file = f"batch_{batch_num + 1}_results.json"
         with open(batch_file, 'w') as f:
             json.dump(batch_results, f, indent=2)
+        self.write_metrics(batch_num)
 
         return batch_results
 
+    def write_metrics(self, batch_num: int):
+        """Dump this batch's spans with the run summary, next to the batch results"""
+        self.metrics.write_json(f"batch_{batch_num + 1}_metrics.json", spans=self.metrics.drain_spans(), batch_number=batch_num + 1)
+        if self.metrics_prom:
+            self.metrics.write_prometheus(self.metrics_prom)
+
     def process_file_in_batches(self, file_path, start_batch: int = 0):
         self.logger.info(f"Starting batch processing from file: {file_path}")
 
@@ -310,7 +380,8 @@ class BatchScrapper:
                     delay = random.uniform(*self.delay_between_batches)
                     next_time = datetime.now() + timedelta(seconds=delay)
                     self.logger.info(f"Waiting {delay/60:.1f} minutes until next batch (resume at {next_time.strftime('%H:%M:%S')})")
-                    time.sleep(delay)
+                    with self.metrics.span('sleep', reason='batch_delay'):
+                        time.sleep(delay)
                 
             except KeyboardInterrupt:
                 self.logger.info("Batch processing interrupted by user. Progress saved.")
@@ -320,6 +391,60 @@ class BatchScrapper:
                 continue
         
         self.logger.info("Batch processing completed!")
+        self.log_metrics()
+
+    def process_queue(self, queue: WorkQueue, worker: Optional[str] = None):
+        """
+        Work on a shared queue until every chunk is finished: claim a chunk of IDs, process it as a batch
+        while a background thread keeps the lease, then record the outcome of each ID.
+        Chunks still leased when the worker is interrupted are given back.
+        """
+        worker = worker or worker_name()
+        queue.register(worker, output=os.path.abspath(self.output_file))
+        self.logger.info(f"Worker {worker} processing queue {queue.path}")
+        try:
+            while True:
+                chunk = queue.claim(worker, wait=True)
+                if chunk is None:
+                    break
+                self.logger.info(f"Claimed chunk {chunk.chunk_id} with {len(chunk.ids)} IDs (attempt {chunk.attempts})")
+                with queue.keep_lease(worker, chunk.chunk_id):
+                    batch_results = self.process_batch(chunk.ids, chunk.chunk_id - 1)
+
+                # Records of successful IDs (parsed ones in pipeline mode) were flushed at the end of the batch
+                completed = [id for id in chunk.ids if id in batch_results['successful'] or self.progress.is_completed(id)]
+                reasons = self.progress.failed(batch_results['failed'])
+                failed = {id: reasons.get(id, {}).get('reason') or "unknown error"
+                          for id in batch_results['failed'] if id not in completed}
+                if not queue.finish_chunk(worker, chunk.chunk_id, completed, failed):
+                    self.logger.warning(f"Lease of chunk {chunk.chunk_id} expired while it was processed; another worker may repeat it")
+                self.logger.info(f"Chunk {chunk.chunk_id} done: {len(completed)} successful, {len(failed)} failed")
+        except KeyboardInterrupt:
+            self.logger.info("Queue processing interrupted by user. Chunks in progress are released.")
+        finally:
+            queue.release_worker(worker)
+
+        self.logger.info("Queue is empty!")
+        self.log_metrics()
+
+    def log_metrics(self):
+        """Log the run's throughput and the p50/p95 of each stage"""
+        summary = self.metrics.summary()
+        self.logger.info(f"Run metrics: {summary['stations_per_hour']} stations/hour, {summary['bytes_fetched']} bytes fetched, {summary['retries']} retries")
+        for stage, stats in summary['stages'].items():
+            self.logger.info(f"  {stage}: {stats['count']} spans, p50 {stats['p50_seconds']:.3f}s, p95 {stats['p95_seconds']:.3f}s, max {stats['max_seconds']:.3f}s")
+
+    def merge_into_dataset(self, dataset_dir: str):
+        """
+        Upsert the AADT records of the output file(s) into the partitioned Parquet dataset
+        Args:
+            dataset_dir: Dataset directory (see TCDS_Scraping_Tool.dataset)
+        """
+        from TCDS_Scraping_Tool.dataset import AADTDataset, load_files
+
+        files = [str(path) for path in output_files(self.output_file)]
+        _, written = load_files(AADTDataset(dataset_dir), aadt_files=files)
+        self.logger.info(f"Merged {len(files)} output files into {dataset_dir}: {written} new or changed AADT rows")
 
     def export_to_csv(self, id, aadt):
         """
@@ -330,97 +455,162 @@ class BatchScrapper:
         Output:
             AADT in csv format
         """
+        import pandas as pd
+
         # Create a DataFrame from the extracted data and save as a csv file
         df = pd.DataFrame(aadt).sort_values(by="year").reset_index(drop=True)
         df.to_csv(f'historical_aadt_{id}.csv', index=False)  
         print('Data saved as csv file')
 
-    def append_to_json(self, id, filename, aadt):
-        data = {}
-        if os.path.exists(filename):
-            with open(filename, 'a') as f:
-                f.write('\n' + json.dumps({"id": id, "aadt": aadt}))
-        else:
-            # Create new file if json file doesn't exists
-            with open(filename, 'w') as f:
-                json.dump({"id": id, "aadt": aadt}, f)
-        self.logger.info(f'Station {id} added to json file.')
+    def write_station(self, id: str, results: dict):
+        """
+        Write one output record per station, direction and year
+        Args:
+            id: The TCDS identifier
+            results: {None: two-way AADT, "NB": AADT, ...} as returned by scrape_station
+        """
+        records = station_records(id, results)
+        with self.metrics.span('write', step='records', rows=len(records)):
+            self.sink.write_many(records)
+        self.logger.info(f'Station {id} added to {self.output_file}.')
 
     def process_single_id(self, id: str) -> None:
         """
-        Process a single TCDS ID
+        Process a single TCDS ID; a station without AADT writes no records
         Args:
             id: The TCDS identifier
-            output_file: Path to the output CSV file
+        Raises:
+            The error of the last attempt if the station could not be scraped (see scrape_station)
         """
-        global driver
-
         print(f"Processing ID: {id}")
         self.logger.info(f"Processing ID: {id}")
 
-        self.open_tcds_detail_page(id)
-        aadt = self.scrape_aadt_data()
-        if aadt:
-            self.append_to_json(id, "output.json", aadt)
-        else:
-            self.logger.info(f"Failed to retrieve ID:{id}")
-            driver.quit()
-            return False
-        directions = self.check_dir()
-        if directions:
-            for dir in directions:
-                #click direction function
-                if self.click_dir_button(dir):
-                    aadt = self.scrape_aadt_data()
-                    self.append_to_json(id+"_"+dir, "output.json", aadt)
-                else:
-                    self.logger.info(f"Failed to retrieve Station {id} directional information")
-
+        with self.metrics.station(id):
+            try:
+                results = self.scrape_station(id, raw=self.spool is not None)
+            except Exception:
+                self.metrics.count('stations_failed')
+                raise
+
+            if not results:
+                self.metrics.count('stations_empty')
+            if self.spool is not None:
+                # Pipeline mode: keep the raw pages, they are parsed in a process pool
+                paths = []
+                if results:
+                    with self.metrics.span('write', step='spool'):
+                        paths = self.spool.write_station(id, results)
+                if self.spool_parse:
+                    self.submit_parse(id, paths)
+            elif results:
+                self.write_station(id, results)
+
+        self.metrics.count('stations_completed')
         # export_to_csv(id, aadt)
-        driver.quit()
-        return True
 
     def read_ids_from_file(self, file_path: str) -> List[str]:
         """
-        Read TCDS IDs from a file
+        Read TCDS IDs from a file, one per line (e.g. written by TCDS_Scraping_Tool.discovery)
         Args:
             file_path: Path to the input file
         Returns:
             List of TCDS IDs
         """
-        with open(file_path, 'r') as f:
+        with open(file_path, 'r', encoding='utf-8') as f:
             return [line.strip() for line in f if line.strip()]
 
-    def main(self):
-
+    def main(self, argv: Optional[List[str]] = None):
         parser = argparse.ArgumentParser(description='TCDS Data Scraper')
-        group = parser.add_mutually_exclusive_group(required=True)
-        group.add_argument('-i', '--id', help='Single TCDS ID to process')
-        group.add_argument('-f', '--file', help='File containing list of TCDS IDs')
-        parser.add_argument('--batch-size', type=int, default=25, help='Number of IDs per batch (default: 25)')
-        
-        # Parse arguments
-        args = parser.parse_args()
-
-        # Update instance variables based on arguments
+        add_arguments(parser)
+        args = parser.parse_args(argv)
+        if not (args.id or args.file or args.queue):
+            parser.error('one of the arguments -i/--id -f/--file --queue is required')
+        self.run(args)
+
+    def run(self, args: argparse.Namespace):
+        """Configure the scraper from parsed command-line arguments (see add_arguments) and run it"""
         self.batch_size = args.batch_size
-        # self.delay_between_requests = (args.min_delay, args.max_delay)
+        self.backend_name = args.backend
+        self.fallback_backend_name = None if args.fallback == 'none' else args.fallback
+        self.backend_options['selenium'] = {'pool_size': args.drivers, 'max_uses': args.driver_recycle, 'timeout': args.page_timeout}
+        self.workers = args.concurrency
+        self.rate_limiter = rate_controller(args)
+        self.max_retries = args.max_retries
+        self.metrics_prom = args.metrics_prom
+        self.output_file = args.output
+        self.output_options = sink_options(args)
+        if args.spool:
+            self.spool = Spool(args.spool)
+            self.spool_parse = not args.no_parse
+            self.parse_processes = args.parse_processes
+        if args.cache:
+            self.backend_options['http'] = {'cache': response_cache(args)}
+            if args.offline:
+                self.fallback_backend_name = None
         # self.delay_between_batches = (args.batch_delay_min, args.batch_delay_max)
-        # self.max_retries = args.max_retries
 
         
+        queue = None
+        if args.queue:
+            queue = WorkQueue(args.queue, lease_seconds=args.lease)
+            if args.file:
+                added = queue.add_ids(self.read_ids_from_file(args.file), self.batch_size)
+                self.logger.info(f"Queued {added} new IDs from {args.file}")
+            # Each worker writes its own output; merge them with python -m TCDS_Scraping_Tool.work_queue --merge
+            self.output_file = worker_output_path(self.output_file, worker_name())
+
         # Process based on input type
-        if args.id:
-            self.process_single_id(args.id)
-        else:
-            self.process_file_in_batches(args.file,0)
-            # ids = self.read_ids_from_file(args.file)
-            # print(f"Found {len(ids)} IDs to process")
-            # self.logger.info(f"Found {len(ids)} IDs to process")
-            # for id in ids:
-            #     self.process_single_id(id)
+        try:
+            if self.spool is not None and self.spool_parse:
+                self.parse_leftover_spool()
+            if queue is not None:
+                self.process_queue(queue)
+            elif args.id:
+                try:
+                    self.process_single_id(args.id)
+                except Exception as e:
+                    self.logger.error(f"Failed to retrieve ID:{args.id}: {e}")
+            else:
+                self.process_file_in_batches(args.file,0)
+                # ids = self.read_ids_from_file(args.file)
+                # print(f"Found {len(ids)} IDs to process")
+                # self.logger.info(f"Found {len(ids)} IDs to process")
+                # for id in ids:
+                #     self.process_single_id(id)
+            if self.spool is not None and self.spool_parse:
+                self.finish_parsing()
+        finally:
+            self.close()
+            if queue is not None:
+                queue.close()
+        if args.dataset:
+            self.merge_into_dataset(args.dataset)
         
 
+def add_arguments(parser: argparse.ArgumentParser):
+    """Options of the batch scraper; the shared rate, cache and output options come from TCDS_Scraping_Tool.config"""
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('-i', '--id', help='Single TCDS ID to process')
+    group.add_argument('-f', '--file', help='File containing list of TCDS IDs')
+    parser.add_argument('--queue', help='Shared work queue (SQLite on shared storage): claim chunks of IDs from it, with -f first adding the file to it')
+    parser.add_argument('--lease', type=float, default=300, help='Seconds a claimed chunk stays leased without heartbeats (default: 300)')
+    parser.add_argument('--batch-size', type=int, default=25, help='Number of IDs per batch (default: 25)')
+    parser.add_argument('--backend', choices=['http', 'selenium'], default='http', help='How to retrieve AADT tables (default: http)')
+    parser.add_argument('--fallback', choices=['http', 'selenium', 'none'], default='none', help='Backend to retry with when the main one fails, e.g. selenium (default: none)')
+    add_rate_arguments(parser)
+    parser.add_argument('--max-retries', type=int, default=3, help='Retries per ID and backend, after a jittered backoff (default: 3)')
+    add_output_arguments(parser)
+    parser.add_argument('--spool', help='Pipeline mode: save raw responses in this directory and parse them in a process pool')
+    parser.add_argument('--parse-processes', type=int, help='Number of parser processes in pipeline mode (default: number of CPUs)')
+    parser.add_argument('--no-parse', action='store_true', help='In pipeline mode, only fetch; parse later with python -m TCDS_Scraping_Tool.spool')
+    parser.add_argument('--dataset', help='Afterwards, upsert the output into this partitioned Parquet dataset')
+    add_cache_arguments(parser)
+    parser.add_argument('--drivers', type=int, default=1, help='Number of Chrome drivers in the Selenium pool (default: 1)')
+    parser.add_argument('--driver-recycle', type=int, default=50, help='Restart a Chrome driver after this many stations (default: 50)')
+    parser.add_argument('--metrics-prom', help='Also write the run metrics in the Prometheus text format to this file after each batch')
+    parser.add_argument('--page-timeout', type=float, default=20, help='Seconds to wait for an AADT table to load in Chrome (default: 20)')
+
+
 if __name__ == "__main__":
     scraper = BatchScrapper()
     scraper.main()
\ No newline at end of file
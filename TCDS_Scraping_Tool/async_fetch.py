@@ -0,0 +1,222 @@
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional
+
+from TCDS_Scraping_Tool.pagination import find_directions, has_data_rows, has_next_page, page_count, same_as_two_way
+
+TCDS_BASE_URL = 'https://txdot.public.ms2soft.com'
+SEARCH_PATH = '/tcds/tsearch.asp'
+AADT_PATH = '/tcds/ajax/tcds_tdetail_aadt.asp'
+
+HEADERS = {
+    'accept': '*/*',
+    'accept-language': 'en,zh;q=0.9,zh-CN;q=0.8,ja;q=0.7,zh-TW;q=0.6',
+    'referer': 'https://txdot.public.ms2soft.com/tcds/tdetail.asp?updatemap=&from_map=',
+    'sec-ch-ua': '"Not.A/Brand";v="8", "Chromium";v="114", "Google Chrome";v="114"',
+    'sec-ch-ua-mobile': '?0',
+    'sec-ch-ua-platform': '"macOS"',
+    'sec-fetch-dest': 'empty',
+    'sec-fetch-mode': 'cors',
+    'sec-fetch-site': 'same-origin',
+    'user-agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36',
+}
+
+logger = logging.getLogger(__name__)
+
+
+class HostRateLimiter:
+    """
+    Spaces out request starts so that at most `rate` requests per second go to the host.
+    A rate of 0 or None disables the limit.
+    """
+
+    def __init__(self, rate: Optional[float] = None):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class AsyncTCDSFetcher:
+    """
+    Fetch AADT pages for many stations over one keep-alive connection pool.
+
+    The cookie handshake against tsearch.asp is done once and the cookie jar is
+    reused for every station. Stations and their pages are fetched concurrently,
+    capped by `concurrency` in-flight requests and `rate_limit` requests/second.
+
+    Page 1 is fetched first to learn how many pages the station has; only the pages
+    that exist, up to `max_pages`, are fetched afterwards. Stations with more pages
+    than `max_pages` are logged and recorded in `truncated` as {data_id: total_pages}
+    (a lower bound when the page only has a next button and no page count).
+
+    fetch_station_directions() also reads the station's directions from its first page
+    and fetches the pages of every direction (passed as `direction_param`) concurrently
+    with the remaining two-way pages. A directional page identical to the two-way page is
+    logged, as the endpoint then ignored the direction parameter.
+
+    Usage:
+        async with AsyncTCDSFetcher(concurrency=10, rate_limit=5) as fetcher:
+            pages = await fetcher.fetch_station('31H228')
+            pages_by_direction = await fetcher.fetch_station_directions('31H228')
+    """
+
+    def __init__(self,
+                 base_url: str = TCDS_BASE_URL,
+                 agency_id: str = '97',
+                 max_pages: int = 20,
+                 concurrency: int = 10,
+                 rate_limit: Optional[float] = 5.0,
+                 timeout: float = 30,
+                 direction_param: str = 'dir'):
+
+        self.base_url = base_url.rstrip('/')
+        self.agency_id = agency_id
+        self.max_pages = max_pages
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.direction_param = direction_param
+        self.limiter = HostRateLimiter(rate_limit)
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self.truncated = {}
+        self._session = None
+
+    async def __aenter__(self):
+        # aiohttp is loaded only once a fetcher is used, so the site constants of this module are cheap to import
+        import aiohttp
+
+        connector = aiohttp.TCPConnector(limit=self.concurrency, limit_per_host=self.concurrency)
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            headers=HEADERS,
+            # unsafe=True keeps cookies set by a local stub server on a bare IP
+            cookie_jar=aiohttp.CookieJar(unsafe=True),
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+        )
+        # Perform an initial request to get cookies, shared by all stations
+        await self.get(SEARCH_PATH)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._session.close()
+        self._session = None
+
+    async def get(self, path: str, params: Optional[dict] = None) -> str:
+        async with self._semaphore:
+            await self.limiter.wait()
+            async with self._session.get(self.base_url + path, params=params) as response:
+                response.raise_for_status()
+                return await response.text()
+
+    def aadt_params(self, data_id: str, pg: int, dir: Optional[str] = None) -> dict:
+        params = {
+            'offset': '0',
+            'agency_id': self.agency_id,
+            'local_id': data_id,
+            'page_type': '',
+            'pg': str(pg),
+        }
+        if dir:
+            params[self.direction_param] = dir
+        return params
+
+    async def fetch_station(self, data_id: str, dir: Optional[str] = None, first: Optional[str] = None) -> List[str]:
+        """
+        Fetch all AADT pages of one station, pages after the first concurrently.
+        Args:
+            dir: direction ("NB", ...), None for the two-way table
+            first: first page, if already fetched
+        Returns:
+            List of page HTML in page order, as consumed by process_data
+        """
+        if first is None:
+            first = await self.get(AADT_PATH, self.aadt_params(data_id, 1, dir))
+        pages = [first]
+        if not has_data_rows(first):
+            return pages
+
+        total = page_count(first)
+        if total is not None:
+            # Page count is known, fetch the remaining pages in parallel
+            last = min(total, self.max_pages)
+            rest = await asyncio.gather(*(self.get(AADT_PATH, self.aadt_params(data_id, pg, dir)) for pg in range(2, last + 1)))
+            for html in rest:
+                if not has_data_rows(html):
+                    break
+                pages.append(html)
+        else:
+            # No page count in the pagination control, follow the next button
+            total = 1
+            while has_next_page(pages[-1]):
+                total += 1
+                if total > self.max_pages:
+                    break
+                html = await self.get(AADT_PATH, self.aadt_params(data_id, total, dir))
+                if not has_data_rows(html):
+                    break
+                pages.append(html)
+
+        if total > self.max_pages:
+            logger.warning(f"Station {data_id} {dir or 'two-way'} AADT history truncated: {total} pages, cap is {self.max_pages}")
+            self.truncated[data_id] = max(total, self.truncated.get(data_id, 0))
+        return pages
+
+    async def fetch_station_directions(self, data_id: str) -> Dict[Optional[str], List[str]]:
+        """
+        Fetch the two-way AADT pages of a station and those of every direction it has
+        Returns:
+            {None: two-way pages, "NB": pages, ...}; only None if the station has no directions
+        """
+        first = await self.get(AADT_PATH, self.aadt_params(data_id, 1))
+        directions = find_directions(first) if has_data_rows(first) else []
+        pages = await asyncio.gather(
+            self.fetch_station(data_id, first=first),
+            *(self.fetch_station(data_id, dir) for dir in directions),
+        )
+        for dir, dir_pages in zip(directions, pages[1:]):
+            if same_as_two_way(dir_pages[0], first):
+                logger.warning(f"Station {data_id} {dir} AADT page is identical to the two-way page: "
+                               f"the endpoint may be ignoring the '{self.direction_param}' direction parameter")
+        return dict(zip([None] + directions, pages))
+
+    async def fetch_stations(self, data_ids: List[str], directions: bool = False) -> Dict[str, Optional[List[str]]]:
+        """
+        Fetch many stations concurrently.
+        Args:
+            directions: also fetch every direction, see fetch_station_directions
+        Returns:
+            Dictionary {data_id: [page html, ...]}, or {data_id: {None: [page html, ...], "NB": ...}}
+            with directions; None for stations that failed
+        """
+        import aiohttp
+
+        fetch = self.fetch_station_directions if directions else self.fetch_station
+
+        async def fetch_one(data_id):
+            try:
+                return await fetch(data_id)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.error(f"Error fetching {data_id}: {e}")
+                return None
+
+        results = await asyncio.gather(*(fetch_one(data_id) for data_id in data_ids))
+        return dict(zip(data_ids, results))
+
+
+def fetch_stations(data_ids: List[str], directions: bool = False, **kwargs) -> Dict[str, Optional[List[str]]]:
+    """Synchronous wrapper around AsyncTCDSFetcher.fetch_stations"""
+    async def run():
+        async with AsyncTCDSFetcher(**kwargs) as fetcher:
+            return await fetcher.fetch_stations(data_ids, directions)
+
+    return asyncio.run(run())
@@ -0,0 +1,290 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import requests
+
+from TCDS_Scraping_Tool.aadt_parser import TWO_WAY, parse_aadt_pages
+from TCDS_Scraping_Tool.async_fetch import AADT_PATH, HEADERS, SEARCH_PATH, TCDS_BASE_URL
+from TCDS_Scraping_Tool.metrics import Metrics
+from TCDS_Scraping_Tool.pagination import (DIRECTIONS, collect_pages, find_directions, has_aadt_table, has_data_rows,
+                                           same_as_two_way)
+from TCDS_Scraping_Tool.rate_limit import AdaptiveRateController, retry_after_seconds
+from TCDS_Scraping_Tool.response_cache import ResponseCache, cache_key
+
+
+class MalformedPage(Exception):
+    """An AADT response without an AADT table, e.g. an error page served with status 200"""
+
+
+class ScrapeBackend:
+    """
+    Interface for the ways BatchScrapper can retrieve the AADT tables of a station.
+    Backends are created once and reused for every station, so they can keep
+    sessions or browsers open between stations until close() is called.
+    With a rate controller, every request to the server waits for it with throttle()
+    and reports how the server answered with report_success()/report_failure().
+    Stage timings and byte counts go to `metrics`.
+    """
+
+    name = ''
+
+    def __init__(self,
+                 logger: Optional[logging.Logger] = None,
+                 rate_controller: Optional[AdaptiveRateController] = None,
+                 metrics: Optional[Metrics] = None):
+        self.logger = logger or logging.getLogger(__name__)
+        self.rate_controller = rate_controller
+        self.metrics = metrics if metrics is not None else Metrics()
+
+    def throttle(self):
+        if self.rate_controller is not None:
+            with self.metrics.span('throttle'):
+                self.rate_controller.acquire()
+
+    def report_success(self, latency: float):
+        if self.rate_controller is not None:
+            self.rate_controller.record_success(latency)
+
+    def report_failure(self, retry_after: Optional[float] = None):
+        if self.rate_controller is not None:
+            delay = self.rate_controller.record_failure(retry_after)
+            self.logger.warning(f"Server is throttling or failing, backing off {delay:.1f}s (rate now {self.rate_controller.rate:.2f}/s)")
+
+    def fetch_first_page(self, id: str) -> Optional[str]:
+        """
+        Retrieve only the first two-way AADT page (the latest years) of a station,
+        None if the backend can only retrieve whole stations
+        """
+        return None
+
+    def fetch_pages(self, id: str, first_page: Optional[str] = None) -> Dict[Optional[str], List[str]]:
+        """
+        Retrieve the raw AADT table HTML of one station, without parsing it
+        Args:
+            id: station ID
+            first_page: first two-way page already returned by fetch_first_page, not requested again
+        Returns:
+            {None: two-way pages, "NB": pages, ...},
+            or an empty dictionary if the two-way table has no data rows (the station has no AADT)
+        Raises:
+            MalformedPage: the response has no AADT table
+        """
+        raise NotImplementedError
+
+    def scrape_station(self, id: str, first_page: Optional[str] = None) -> Dict[Optional[str], List[dict]]:
+        """
+        Retrieve the AADT history of one station
+        Args:
+            id: station ID
+            first_page: see fetch_pages
+        Returns:
+            {None: two-way AADT, "NB": AADT, ...} with AADT as typed rows [{'year': 2023, 'aadt': 12345, ...}, ...],
+            or an empty dictionary if the two-way table has no data rows
+        """
+        pages = self.fetch_pages(id, first_page)
+        with self.metrics.span('parse', backend=self.name):
+            results = {dir: parse_aadt_pages(dir_pages) for dir, dir_pages in pages.items()}
+        if not results.get(None):
+            return {}
+        return results
+
+    def close(self):
+        pass
+
+
+class HttpBackend(ScrapeBackend):
+    """
+    Call the tcds_tdetail_aadt.asp AJAX endpoint directly, as TxDOTTCDS_aadt.py does,
+    over one requests.Session per thread, kept for all stations.
+    The direction is passed to the endpoint as the `direction_param` query parameter; a
+    directional page identical to the two-way page is logged, as the endpoint then ignored it.
+    The directions of a station are read from its first two-way page, then the remaining
+    two-way pages and every direction's pages are fetched concurrently, on up to
+    `direction_workers` helper threads shared by all callers (0 fetches them one by one).
+    With a ResponseCache, pages are served from the cache and only stale ones are requested.
+    With a rate controller, a throttled or failed request (429, 5xx, timeout, or a response
+    without an AADT table) is repeated up to `throttle_retries` times once the controller's
+    backoff has passed. A response that still has no AADT table raises MalformedPage and is
+    not cached.
+    """
+
+    name = 'http'
+
+    def __init__(self,
+                 logger: Optional[logging.Logger] = None,
+                 base_url: str = TCDS_BASE_URL,
+                 agency_id: str = '97',
+                 max_pages: int = 20,
+                 timeout: float = 30,
+                 direction_param: str = 'dir',
+                 cache: Optional[ResponseCache] = None,
+                 rate_controller: Optional[AdaptiveRateController] = None,
+                 throttle_retries: int = 2,
+                 metrics: Optional[Metrics] = None,
+                 direction_workers: int = len(DIRECTIONS)):
+
+        super().__init__(logger, rate_controller, metrics)
+        self.cache = cache
+        self.throttle_retries = throttle_retries
+        self.base_url = base_url.rstrip('/')
+        self.agency_id = agency_id
+        self.max_pages = max_pages
+        self.timeout = timeout
+        self.direction_param = direction_param
+        self._local = threading.local()
+        self._sessions = []
+        self._lock = threading.Lock()
+        self.direction_workers = direction_workers
+        self._direction_pool = None
+
+    @property
+    def session(self) -> requests.Session:
+        """The calling thread's session, started with an initial request to get cookies"""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.headers.update(HEADERS)
+            with self.metrics.span('connect', backend=self.name):
+                response = session.get(self.base_url + SEARCH_PATH, timeout=self.timeout)
+            response.raise_for_status()
+            self._local.session = session
+            with self._lock:
+                self._sessions.append(session)
+        return session
+
+    def get_page(self, id: str, pg: int, dir: Optional[str] = None) -> str:
+        params = {
+            'offset': '0',
+            'agency_id': self.agency_id,
+            'local_id': id,
+            'page_type': '',
+            'pg': str(pg),
+        }
+        if dir:
+            params[self.direction_param] = dir
+
+        def fetch(conditional_headers=None):
+            session = self.session
+            for attempt in range(self.throttle_retries + 1):
+                self.throttle()
+                started = time.monotonic()
+                try:
+                    with self.metrics.span('fetch', backend=self.name, page=pg, direction=dir):
+                        response = session.get(self.base_url + AADT_PATH, params=params, headers=conditional_headers, timeout=self.timeout)
+                    self.metrics.count('requests')
+                    self.metrics.count('bytes_fetched', len(response.content))
+                except (requests.Timeout, requests.ConnectionError):
+                    self.metrics.count('request_errors')
+                    self.report_failure()
+                    if attempt == self.throttle_retries or self.rate_controller is None:
+                        raise
+                    continue
+                malformed = response.status_code == 200 and not has_aadt_table(response.text)
+                if response.status_code != 429 and response.status_code < 500 and not malformed:
+                    self.report_success(time.monotonic() - started)
+                    break
+                self.metrics.count('malformed_responses' if malformed else 'throttled_responses')
+                self.report_failure(retry_after_seconds(response.headers.get('Retry-After')))
+                # With a rate controller the next attempt waits out its backoff
+                if self.rate_controller is None:
+                    break
+            if response.status_code != 304:
+                response.raise_for_status()
+            if malformed:
+                raise MalformedPage(f"AADT page {pg} of station {id} {dir or 'two-way'} has no AADT table")
+            return response.status_code, response.text, response.headers
+
+        if self.cache is None:
+            return fetch()[1]
+        key = cache_key('tcds_tdetail_aadt.asp', self.agency_id, id, pg, dir)
+        # The first page holds the latest years, older pages are historical
+        return self.cache.get_or_fetch(key, fetch, current=(pg == 1))
+
+    def scrape_pages(self, id: str, dir: Optional[str] = None, first_page: Optional[str] = None) -> List[str]:
+        def get_page(pg):
+            if pg == 1 and first_page is not None:
+                return first_page
+            return self.get_page(id, pg, dir)
+
+        pages, truncated = collect_pages(get_page, self.max_pages)
+        if truncated:
+            self.logger.warning(f"Station {id} {dir or 'two-way'} has more than {self.max_pages} AADT pages, output is truncated")
+        return pages
+
+    def fetch_first_page(self, id: str) -> Optional[str]:
+        return self.get_page(id, 1)
+
+    @property
+    def direction_pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._direction_pool is None:
+                self._direction_pool = ThreadPoolExecutor(max_workers=self.direction_workers, thread_name_prefix='tcds-direction')
+            return self._direction_pool
+
+    def scrape_direction(self, id: str, dir: str, station: Optional[str]) -> List[str]:
+        # Runs on a helper thread: attribute its spans to the caller's station
+        with self.metrics.tag(station):
+            return self.scrape_pages(id, dir)
+
+    def check_directions(self, id: str, results: Dict[Optional[str], List[str]]):
+        for dir, pages in results.items():
+            if dir is not None and pages and same_as_two_way(pages[0], results[None][0]):
+                self.metrics.count('direction_param_ignored')
+                self.logger.warning(f"Station {id} {dir} AADT page is identical to the two-way page: "
+                                    f"the endpoint may be ignoring the '{self.direction_param}' direction parameter")
+
+    def fetch_pages(self, id: str, first_page: Optional[str] = None) -> Dict[Optional[str], List[str]]:
+        if first_page is None:
+            first_page = self.get_page(id, 1)
+        if not has_data_rows(first_page):
+            return {}
+
+        directions = find_directions(first_page)
+        if directions:
+            self.logger.info(f"Getting directions {', '.join(directions)} of station {id}")
+        if not directions or not self.direction_workers:
+            results = {None: self.scrape_pages(id, first_page=first_page)}
+            for dir in directions:
+                results[dir] = self.scrape_pages(id, dir)
+            self.check_directions(id, results)
+            return results
+
+        station = self.metrics.current_station()
+        futures = {dir: self.direction_pool.submit(self.scrape_direction, id, dir, station) for dir in directions}
+        try:
+            results = {None: self.scrape_pages(id, first_page=first_page)}
+            for dir, future in futures.items():
+                results[dir] = future.result()
+        finally:
+            for future in futures.values():
+                future.cancel()
+        self.check_directions(id, results)
+        return results
+
+    def close(self):
+        with self._lock:
+            pool, self._direction_pool = self._direction_pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+        with self._lock:
+            for session in self._sessions:
+                session.close()
+            self._sessions = []
+        self._local = threading.local()
+
+
+def get_backend(name: str, logger: Optional[logging.Logger] = None, **options) -> ScrapeBackend:
+    """
+    Create a backend by name. Selenium is imported only when it is requested.
+    Args:
+        options: keyword arguments for the backend class
+    """
+    if name == 'http':
+        return HttpBackend(logger, **options)
+    if name == 'selenium':
+        from TCDS_Scraping_Tool.selenium_backend import SeleniumBackend
+        return SeleniumBackend(logger, **options)
+    raise ValueError(f"Unknown backend: {name}")
@@ -0,0 +1,249 @@
+import argparse
+import importlib
+import importlib.util
+import json
+import logging
+import os
+import sys
+from typing import Callable, List, Optional
+
+from TCDS_Scraping_Tool.config import (CONFIG_ENV, add_cache_arguments, add_output_arguments, add_rate_arguments,
+                                       apply_config, load_config, rate_controller, read_ids, response_cache,
+                                       setup_logging, sink_options)
+
+PROG = 'python -m TCDS_Scraping_Tool'
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CRAWLER_PATH = os.path.join(REPO_DIR, 'C4A Tools', 'dynamic_scrape_utilities.py')
+
+logger = logging.getLogger(__name__)
+
+
+class Command:
+    """
+    A subcommand sharing the config options: `add_arguments(parser)` adds its options and
+    `run(args, parser)` runs it, returning an exit code or None. Both import what the command
+    needs when they are called, so only the chosen command's dependencies are loaded.
+    """
+
+    def __init__(self, help: str, add_arguments: Callable, run: Callable):
+        self.help = help
+        self.add_arguments = add_arguments
+        self.run = run
+
+
+def add_id_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument('ids', nargs='*', help='Station IDs')
+    parser.add_argument('-f', '--file', help='File of station IDs, one per line (e.g. from discover)')
+
+
+def fetch_arguments(parser: argparse.ArgumentParser):
+    from TCDS_Scraping_Tool.async_fetch import TCDS_BASE_URL
+
+    add_id_arguments(parser)
+    parser.add_argument('--two-way-only', action='store_true', help='Only the two-way AADT table, not the directional ones')
+    parser.add_argument('--base-url', default=TCDS_BASE_URL, help='TCDS site, or a local stub server')
+    add_rate_arguments(parser, concurrency=4, rate=2.0)
+    add_cache_arguments(parser)
+    add_output_arguments(parser, output=None)
+
+
+def run_fetch(args, parser):
+    """Records of the stations to the output file, or as JSON lines to stdout without one"""
+    from concurrent.futures import ThreadPoolExecutor
+
+    from TCDS_Scraping_Tool.aadt_parser import parse_aadt_pages, station_records
+    from TCDS_Scraping_Tool.backends import get_backend
+    from TCDS_Scraping_Tool.sinks import open_sink
+
+    ids = read_ids(args.ids, args.file)
+    if not ids:
+        parser.error('no station IDs given')
+    backend = get_backend('http', logger, base_url=args.base_url, cache=response_cache(args), rate_controller=rate_controller(args))
+
+    def scrape(id):
+        try:
+            if args.two_way_only:
+                rows = parse_aadt_pages(backend.scrape_pages(id))
+                return id, {None: rows} if rows else {}
+            return id, backend.scrape_station(id)
+        except Exception as e:
+            logger.error(f"Error fetching {id}: {e}")
+            return id, {}
+
+    sink = open_sink(args.output, **sink_options(args)) if args.output else None
+    failed = []
+    try:
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            for id, results in pool.map(scrape, ids):
+                if not results:
+                    failed.append(id)
+                    continue
+                records = station_records(id, results)
+                if sink is not None:
+                    sink.write_many(records)
+                else:
+                    sys.stdout.write(''.join(json.dumps(record) + '\n' for record in records))
+    finally:
+        backend.close()
+        if sink is not None:
+            sink.close()
+    if failed:
+        print(f"No AADT data retrieved for {len(failed)} of {len(ids)} stations: {', '.join(failed)}", file=sys.stderr)
+        return 1
+
+
+def batch_arguments(parser: argparse.ArgumentParser):
+    from TCDS_Scraping_Tool.aadt_scraping import add_arguments
+
+    add_arguments(parser)
+
+
+def run_batch(args, parser):
+    from TCDS_Scraping_Tool.aadt_scraping import BatchScrapper
+
+    if not (args.id or args.file or args.queue):
+        parser.error('one of the arguments -i/--id -f/--file --queue is required')
+    BatchScrapper().run(args)
+
+
+def crawl_arguments(parser: argparse.ArgumentParser):
+    add_id_arguments(parser)
+    parser.add_argument('--concurrency', type=int, default=1, help='Number of browser sessions (default: 1)')
+    parser.add_argument('--timeout', type=float, default=90, help='Seconds per station and attempt (default: 90)')
+    parser.add_argument('--retries', type=int, default=2, help='Retries per station (default: 2)')
+    parser.add_argument('--show-browser', action='store_true', help='Run Chrome with a window instead of headless')
+    add_cache_arguments(parser)
+    parser.add_argument('-o', '--output', default='output.json', help='Output file, .json, or .jsonl written as stations finish (default: output.json)')
+
+
+def run_crawl(args, parser):
+    import asyncio
+
+    ids = read_ids(args.ids, args.file)
+    if not ids:
+        parser.error('no station IDs given')
+    # C4A Tools is a directory of scripts, not a package
+    spec = importlib.util.spec_from_file_location('dynamic_scrape_utilities', CRAWLER_PATH)
+    crawler = importlib.util.module_from_spec(spec)
+    try:
+        spec.loader.exec_module(crawler)
+    except ImportError as e:
+        sys.exit(f"crawl needs crawl4ai: {e}")
+    results = asyncio.run(crawler.crawl_stations(
+        ids, headless=not args.show_browser, output_file=os.path.abspath(args.output), cache=response_cache(args),
+        concurrency=args.concurrency, timeout=args.timeout, retries=args.retries,
+    ))
+    if len(results) < len(ids):
+        print(f"{len(ids) - len(results)} of {len(ids)} stations could not be crawled", file=sys.stderr)
+        return 1
+
+
+def refresh_arguments(parser: argparse.ArgumentParser):
+    from TCDS_Scraping_Tool.refresh import add_arguments
+
+    add_arguments(parser)
+
+
+def run_refresh(args, parser):
+    from TCDS_Scraping_Tool.refresh import run
+
+    run(args)
+
+
+def export_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument('dataset', help='Dataset directory (see TCDS_Scraping_Tool.dataset)')
+    parser.add_argument('--district', help='Only this district')
+    parser.add_argument('--county', help='Only this county')
+    parser.add_argument('--station', action='append', default=[], help='Only this station, repeatable')
+    parser.add_argument('-f', '--file', help='Only the stations in this file, one ID per line')
+    parser.add_argument('--since', type=int, help='Only this year and later')
+    parser.add_argument('--two-way-only', action='store_true', help='Leave out the directional tables')
+    parser.add_argument('--raw', action='store_true', help='Export the stored rows without normalizing them (see validate)')
+    add_output_arguments(parser, output='aadt.csv')
+
+
+def run_export(args, parser):
+    """AADT records of the dataset, in the format of the scraper outputs"""
+    from TCDS_Scraping_Tool.aadt_parser import TWO_WAY
+    from TCDS_Scraping_Tool.dataset import AADT_FACT_COLUMNS, AADTDataset
+    from TCDS_Scraping_Tool.sinks import open_sink
+    from TCDS_Scraping_Tool.validation import normalize_aadt
+
+    partition_filter = {column: value for column, value in (('district', args.district), ('county', args.county)) if value}
+    records = AADTDataset(args.dataset).read_aadt(**partition_filter)
+    stations = read_ids(args.station, args.file)
+    if stations:
+        records = records[records['station_id'].isin(stations)]
+    if args.since:
+        records = records[records['year'] >= args.since]
+    if args.two_way_only:
+        records = records[records['direction'] == TWO_WAY]
+    if args.raw:
+        records = records[AADT_FACT_COLUMNS]
+    else:
+        records, _ = normalize_aadt(records)
+
+    records = records.astype(object).where(records.notna(), None)
+    sink = open_sink(args.output, **sink_options(args))
+    try:
+        sink.write_many(records.to_dict('records'))
+    finally:
+        sink.close()
+    print(f"Exported {len(records)} AADT records to {sink.current_path}")
+
+
+COMMANDS = {
+    'fetch': Command('Fetch the AADT of a few stations over HTTP, e.g. from cron', fetch_arguments, run_fetch),
+    'batch': Command('Scrape an ID file or a shared queue in batches, with progress and retries', batch_arguments, run_batch),
+    'crawl': Command('Crawl station detail pages with crawl4ai', crawl_arguments, run_crawl),
+    'refresh': Command('Re-scrape the stations of a dataset that may have new AADT', refresh_arguments, run_refresh),
+    'export': Command('Write the AADT records of a dataset to a .jsonl, .csv or .parquet file', export_arguments, run_export),
+}
+# Tools with options of their own, run by their module's main() with the rest of the command line
+TOOLS = {
+    'discover': ('TCDS_Scraping_Tool.discovery', 'Discover stations and write sharded ID files'),
+    'dataset': ('TCDS_Scraping_Tool.dataset', 'Merge scraper outputs into the Parquet dataset'),
+    'validate': ('TCDS_Scraping_Tool.validation', 'Normalize and check AADT records'),
+    'queue': ('TCDS_Scraping_Tool.work_queue', 'Manage the shared work queue of batch --queue'),
+    'spool': ('TCDS_Scraping_Tool.spool', 'Parse spooled responses of batch --spool'),
+}
+
+
+def command_list() -> str:
+    lines = ['commands:']
+    lines += [f"  {name:<10}{command.help}" for name, command in COMMANDS.items()]
+    lines += ['', 'tools:']
+    lines += [f"  {name:<10}{help}" for name, (_, help) in TOOLS.items()]
+    lines += ['', f"Run '{PROG} <command> --help' for the options of a command."]
+    return '\n'.join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog=PROG,
+        description='TCDS AADT scraping tools',
+        epilog=command_list(),
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument('command', choices=list(COMMANDS) + list(TOOLS), metavar='command', help='see below')
+    parser.add_argument('args', nargs=argparse.REMAINDER, help=argparse.SUPPRESS)
+    top = parser.parse_args(argv)
+
+    if top.command in TOOLS:
+        module, _ = TOOLS[top.command]
+        # The tool's parser names itself after sys.argv[0]
+        sys.argv[0] = f"{PROG} {top.command}"
+        return importlib.import_module(module).main(top.args) or 0
+
+    command = COMMANDS[top.command]
+    command_parser = argparse.ArgumentParser(prog=f"{PROG} {top.command}", description=command.help)
+    command_parser.add_argument('--config', help=f'JSON file of option defaults, shared by the commands (default: ${CONFIG_ENV})')
+    command.add_arguments(command_parser)
+    config_parser = argparse.ArgumentParser(add_help=False)
+    config_parser.add_argument('--config')
+    config_path = config_parser.parse_known_args(top.args)[0].config
+    apply_config(command_parser, load_config(config_path), top.command)
+    args = command_parser.parse_args(top.args)
+
+    setup_logging()
+    return command.run(args, command_parser) or 0
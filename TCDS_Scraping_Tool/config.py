@@ -0,0 +1,104 @@
+import argparse
+import json
+import logging
+import os
+import sys
+from typing import Optional
+
+from TCDS_Scraping_Tool.rate_limit import AdaptiveRateController
+from TCDS_Scraping_Tool.response_cache import ResponseCache
+
+# Config file used when --config isn't given, e.g. set in a crontab
+CONFIG_ENV = 'TCDS_CONFIG'
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+
+def setup_logging(log_file: Optional[str] = None):
+    """
+    Log INFO messages to stderr, and also to `log_file` if given. Only the first call configures
+    the stderr handler; a later call still adds its log file, e.g. the batch scraper's
+    scraping.log when the command line has already set up logging.
+    """
+    root = logging.getLogger()
+    if not root.handlers:
+        logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
+    if log_file:
+        path = os.path.abspath(log_file)
+        if not any(isinstance(handler, logging.FileHandler) and handler.baseFilename == path for handler in root.handlers):
+            handler = logging.FileHandler(path)
+            handler.setFormatter(logging.Formatter(LOG_FORMAT))
+            root.addHandler(handler)
+
+
+def load_config(path: Optional[str] = None) -> dict:
+    """
+    Option defaults from a JSON config file (`path`, else the file named by $TCDS_CONFIG):
+    top-level keys apply to every command that has the option, a section named after a
+    command overrides them for that command. Keys are option names with dashes as underscores.
+        {"rate": 1.0, "cache": "cache/", "batch": {"concurrency": 4, "output": "out.parquet"}}
+    """
+    path = path or os.environ.get(CONFIG_ENV)
+    if not path:
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def apply_config(parser: argparse.ArgumentParser, config: dict, command: str):
+    """Use the config values as defaults of the parser's options; command-line values still win"""
+    known = {action.dest for action in parser._actions}
+    section = config.get(command) or {}
+    unknown = sorted(set(section) - known)
+    if unknown:
+        print(f"Ignoring unknown options in the {command} section of the config: {', '.join(unknown)}", file=sys.stderr)
+    shared = {key: value for key, value in config.items() if not isinstance(value, dict)}
+    parser.set_defaults(**{key: value for key, value in {**shared, **section}.items() if key in known})
+
+
+def add_rate_arguments(parser: argparse.ArgumentParser, concurrency: int = 1, rate: float = 0.5):
+    """Concurrency and the adaptive request rate, shared by every command that talks to the site"""
+    parser.add_argument('--concurrency', '--workers', type=int, default=concurrency, dest='concurrency',
+                        help=f'Number of stations processed at once (default: {concurrency})')
+    parser.add_argument('--rate', type=float, default=rate, help=f'Initial requests per second, adapted to server responses (default: {rate})')
+    parser.add_argument('--min-rate', type=float, default=0.05, help='Lowest requests per second after backing off (default: 0.05)')
+    parser.add_argument('--max-rate', type=float, default=2.0, help='Highest requests per second while the server responds well (default: 2)')
+
+
+def add_cache_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument('--cache', help='Directory of the response cache')
+    parser.add_argument('--cache-ttl', type=float, default=24, help='Hours before the latest AADT page is revalidated (default: 24)')
+    parser.add_argument('--offline', action='store_true', help='Serve everything from the response cache, never fetch')
+
+
+def add_output_arguments(parser: argparse.ArgumentParser, output: Optional[str] = 'output.jsonl'):
+    default = f" (default: {output})" if output else ""
+    parser.add_argument('-o', '--output', default=output, help=f'Output file, .jsonl, .csv or .parquet{default}')
+    parser.add_argument('--flush-every', type=int, default=500, help='Number of AADT records buffered before writing (default: 500)')
+    parser.add_argument('--rotate-mb', type=float, help='Start a new numbered output file after this many MB')
+
+
+def rate_controller(args) -> AdaptiveRateController:
+    return AdaptiveRateController(args.rate, args.min_rate, args.max_rate, burst=args.concurrency)
+
+
+def response_cache(args) -> Optional[ResponseCache]:
+    """The ResponseCache of --cache, None without one"""
+    if not args.cache:
+        return None
+    return ResponseCache(args.cache, ttl=args.cache_ttl * 3600, offline=args.offline)
+
+
+def sink_options(args) -> dict:
+    return {
+        'flush_every': args.flush_every,
+        'max_bytes': int(args.rotate_mb * 1024 * 1024) if args.rotate_mb else None,
+    }
+
+
+def read_ids(ids, file: Optional[str] = None):
+    """Station IDs given on the command line followed by those of an ID file, without repeats"""
+    ids = list(ids or [])
+    if file:
+        with open(file, 'r', encoding='utf-8') as f:
+            ids += [line.strip() for line in f if line.strip()]
+    return list(dict.fromkeys(ids))
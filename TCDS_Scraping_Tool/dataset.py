@@ -0,0 +1,395 @@
+import argparse
+import glob
+import json
+import os
+import re
+import uuid
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+
+from TCDS_Scraping_Tool.aadt_parser import AADT_COLUMNS, AADT_TYPES, NUMBER_RE, TWO_WAY
+
+# Text fields of C4A Tools/tcds_extraction_schema.json, except the AADT table
+STATION_COLUMNS = [
+    'station_id', 'location_id', 'mpo_id', 'type', 'hpms_id', 'sf_group', 'route_type', 'af_group',
+    'route', 'gf_group', 'active', 'class_dist_grp', 'category', 'seas_clss_grp', 'wim_group',
+    'qc_group', 'functional_class', 'located_on', 'loc_on_alias', 'county', 'fips_county_code',
+    'community', 'num_lanes', 'surface_type', 'district', 'count_cycle', 'control_section',
+    'ctrl_section_mp', 'perm_station', 'dot_id', 'wim_station', 'latitude', 'virtual', 'longitude',
+    'mega_site', 'speed_limit', 'mpo', 'ltpp', 'state_owned', 'owner_id', 'rural_urban',
+    'count_schedule_group', 'prefix', 'site_id', 'suffix', 'state_county_code', 'area_type',
+    'long_term_station', 'district_number', 'days_since_last_count_check', 'collection_type',
+    'operation_status',
+]
+AADT_KEY = ['station_id', 'direction', 'year']
+AADT_FACT_COLUMNS = ['station_id', 'direction'] + AADT_COLUMNS
+PARTITION_COLUMNS = ['district', 'county']
+UNKNOWN_PARTITION = 'unknown'
+
+HISTORICAL_CSV_RE = re.compile(r'historical_aadt_(.+)\.csv$')
+# <sup> footnote markers and other markup in cells read from innerHTML
+MARKUP_RE = r'<sup\b[^>]*>.*?</sup>|<[^>]+>|&nbsp;'
+PLAIN_NUMBER_RE = r'-?\d+(?:\.\d+)?'
+FIRST_NUMBER_RE = rf'(?s)^.*?({NUMBER_RE.pattern}).*$'
+
+
+def arrow_schema(columns: List[str], types: Dict[str, type]):
+    import pyarrow as pa
+
+    arrow_types = {int: pa.int64(), float: pa.float64(), str: pa.string()}
+    fields = [(column, arrow_types[types.get(column, str)]) for column in columns]
+    return pa.schema(fields + [('updated', pa.timestamp('us'))])
+
+
+class ParquetTable:
+    """
+    Parquet table under `path` whose rows are identified by `key` columns.
+
+    Files are never rewritten by upsert(): rows that are new or differ from the stored version
+    are appended as a new part file, and read() keeps the latest version of each key (by the
+    `updated` column). With `partition_by`, parts are written to hive-style directories such as
+    district=Austin/county=Travis, and readers can filter on those columns. compact() rewrites
+    the table as one part per partition, and delete() rewrites one partition without some rows.
+    Upserts must not run concurrently.
+    """
+
+    def __init__(self, path, key: List[str], columns: List[str], types: Dict[str, type] = None,
+                 partition_by: List[str] = ()):
+        self.path = Path(path)
+        self.key = key
+        self.columns = columns
+        self.partition_by = list(partition_by)
+        self.schema = arrow_schema(columns, types or {})
+
+    def part_files(self, partition: Optional[Tuple[str, ...]] = None) -> List[str]:
+        directory = self.path.joinpath(*self.partition_dirs(partition)) if partition else self.path
+        return sorted(glob.glob(str(directory / '**' / 'part-*.parquet'), recursive=True))
+
+    def partition_dirs(self, values: Tuple[str, ...]) -> List[str]:
+        return [f"{column}={quote(str(value), safe='')}" for column, value in zip(self.partition_by, values)]
+
+    def read_files(self, files: List[str]) -> pd.DataFrame:
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+
+        columns = self.columns + self.partition_by + ['updated']
+        if not files:
+            return pd.DataFrame(columns=columns)
+        partitioning = None
+        if self.partition_by:
+            partitioning = ds.partitioning(pa.schema([(column, pa.string()) for column in self.partition_by]), flavor='hive')
+        dataset = ds.dataset(files, format='parquet', partitioning=partitioning, partition_base_dir=str(self.path))
+        df = dataset.to_table().to_pandas()
+        return (
+            df.sort_values('updated', kind='stable')
+            .drop_duplicates(self.key, keep='last')
+            .reset_index(drop=True)[columns]
+        )
+
+    def read(self, **partition_filter) -> pd.DataFrame:
+        """
+        Latest version of every row, optionally only in the partitions matching
+        e.g. district="Austin" (partitions are directories, so the rest is not read)
+        """
+        files = self.part_files()
+        for column, value in partition_filter.items():
+            directory = f"{column}={quote(str(value), safe='')}"
+            files = [path for path in files if directory in Path(path).relative_to(self.path).parts]
+        return self.read_files(files)
+
+    def normalize(self, df: pd.DataFrame):
+        """Incoming rows converted to the table schema, as a pyarrow table"""
+        import pyarrow as pa
+
+        df = df.reindex(columns=self.columns)
+        df = df.astype(object).where(df.notna(), None)
+        return pa.Table.from_pandas(df, schema=self.schema.remove(len(self.columns)), preserve_index=False)
+
+    def changed_rows(self, incoming: pd.DataFrame, current: pd.DataFrame) -> pd.DataFrame:
+        if current.empty:
+            return incoming
+        values = [column for column in self.columns if column not in self.key]
+        merged = incoming.merge(current[self.key + values], on=self.key, how='left', suffixes=('', '_old'), indicator=True)
+        changed = merged['_merge'] == 'left_only'
+        for column in values:
+            new, old = merged[column], merged[f'{column}_old']
+            changed |= ~((new == old) | (new.isna() & old.isna()))
+        return incoming[changed.to_numpy()]
+
+    def upsert(self, df: pd.DataFrame) -> int:
+        """
+        Store the rows of `df` that are new or changed
+        Args:
+            df: rows with the table columns, plus the partition columns when partitioned
+        Returns:
+            Number of rows written
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if df.empty:
+            return 0
+        df = df.drop_duplicates(self.key, keep='last')
+        groups = df.groupby(self.partition_by, sort=False, dropna=False) if self.partition_by else [((), df)]
+        updated = pd.Timestamp.now()
+        written = 0
+        for partition, rows in groups:
+            partition = partition if isinstance(partition, tuple) else (partition,)
+            incoming = self.normalize(rows).to_pandas()
+            current = self.read_files(self.part_files(partition) if partition else self.part_files())
+            changed = self.changed_rows(incoming, current)
+            if changed.empty:
+                continue
+            table = pa.Table.from_pandas(changed.assign(updated=updated), schema=self.schema, preserve_index=False)
+            directory = self.path.joinpath(*self.partition_dirs(partition))
+            directory.mkdir(parents=True, exist_ok=True)
+            pq.write_table(table, str(directory / f"part-{updated:%Y%m%d%H%M%S}-{uuid.uuid4().hex[:8]}.parquet"))
+            written += len(changed)
+        return written
+
+    def delete(self, keys: pd.DataFrame, partition: Optional[Tuple[str, ...]] = None) -> int:
+        """
+        Remove the rows with these keys from a partition (or the unpartitioned table) by
+        rewriting it as one part without them
+        Returns:
+            Number of rows removed
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        old_files = self.part_files(partition) if partition else self.part_files()
+        current = self.read_files(old_files)
+        removed = current[self.key].merge(keys[self.key].drop_duplicates(), on=self.key, how='left', indicator=True)['_merge'] == 'both'
+        if not removed.any():
+            return 0
+        kept = current[~removed.to_numpy()]
+        if not kept.empty:
+            directory = self.path.joinpath(*self.partition_dirs(partition)) if partition else self.path
+            table = pa.Table.from_pandas(kept[self.columns + ['updated']], schema=self.schema, preserve_index=False)
+            pq.write_table(table, str(directory / f"part-compacted-{uuid.uuid4().hex[:8]}.parquet"))
+        for path in old_files:
+            os.remove(path)
+        return int(removed.sum())
+
+    def compact(self):
+        """Rewrite the table as one part per partition, dropping superseded row versions"""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        old_files = self.part_files()
+        df = self.read_files(old_files)
+        groups = df.groupby(self.partition_by, sort=False) if self.partition_by else [((), df)]
+        for partition, rows in groups:
+            partition = partition if isinstance(partition, tuple) else (partition,)
+            directory = self.path.joinpath(*self.partition_dirs(partition))
+            directory.mkdir(parents=True, exist_ok=True)
+            table = pa.Table.from_pandas(rows[self.columns + ['updated']], schema=self.schema, preserve_index=False)
+            pq.write_table(table, str(directory / f"part-compacted-{uuid.uuid4().hex[:8]}.parquet"))
+        for path in old_files:
+            os.remove(path)
+
+
+class AADTDataset:
+    """
+    Consolidated store of scraped TCDS data:
+        {root}/stations/              station dimension, one row per station_id
+        {root}/aadt/district=../county=../   AADT facts, one row per (station_id, direction, year)
+    AADT rows are partitioned by the district and county of their station; stations without
+    metadata go to district=unknown/county=unknown until their metadata is loaded. When a
+    station's district or county changes, its AADT rows move to the new partition.
+    """
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+        self.stations = ParquetTable(self.root / 'stations', ['station_id'], STATION_COLUMNS)
+        self.aadt = ParquetTable(self.root / 'aadt', AADT_KEY, AADT_FACT_COLUMNS, AADT_TYPES, PARTITION_COLUMNS)
+
+    def upsert_stations(self, stations: pd.DataFrame) -> int:
+        before = self.station_partitions()
+        written = self.stations.upsert(stations)
+        if written:
+            self.move_aadt(before)
+        return written
+
+    def station_partitions(self) -> pd.DataFrame:
+        stations = self.stations.read()[['station_id'] + PARTITION_COLUMNS]
+        return stations.mask(stations == '')
+
+    def move_aadt(self, before: pd.DataFrame) -> int:
+        """
+        Move the AADT rows of stations whose partition changed since `before` (station_partitions()
+        before an upsert): they are written to the new partition, then the old one is rewritten
+        without them. AADT rows stored before their station had metadata are in the unknown partition.
+        Returns:
+            Number of rows moved
+        """
+        old_columns = [f'{column}_before' for column in PARTITION_COLUMNS]
+        stations = self.station_partitions().merge(before, on='station_id', how='left', suffixes=('', '_before'))
+        stations = stations.fillna(UNKNOWN_PARTITION)
+        moved = stations[(stations[PARTITION_COLUMNS].to_numpy() != stations[old_columns].to_numpy()).any(axis=1)]
+        count = 0
+        for partition, ids in moved.groupby(old_columns)['station_id']:
+            rows = self.aadt.read_files(self.aadt.part_files(partition))
+            rows = rows[rows['station_id'].isin(ids)]
+            if rows.empty:
+                continue
+            self.upsert_aadt(rows)
+            count += self.aadt.delete(rows, partition)
+        return count
+
+    def upsert_aadt(self, records: pd.DataFrame) -> int:
+        """Store new or changed AADT records, partitioned by the district/county of their station"""
+        if records.empty:
+            return 0
+        records = records.drop(columns=PARTITION_COLUMNS, errors='ignore')
+        records = records.merge(self.station_partitions(), on='station_id', how='left')
+        records[PARTITION_COLUMNS] = records[PARTITION_COLUMNS].fillna(UNKNOWN_PARTITION)
+        return self.aadt.upsert(records)
+
+    def read_aadt(self, **partition_filter) -> pd.DataFrame:
+        return self.aadt.read(**partition_filter)
+
+    def compact(self):
+        self.stations.compact()
+        self.aadt.compact()
+
+
+def read_aadt_records(path: str) -> pd.DataFrame:
+    """
+    AADT records from a BatchScrapper output file (.jsonl, .csv or .parquet)
+    or a historical_aadt_{id}.csv written by TxDOTTCDS_aadt.py
+    """
+    suffix = os.path.splitext(path)[1].lower()
+    if suffix == '.parquet':
+        df = pd.read_parquet(path)
+    elif suffix == '.jsonl':
+        df = pd.read_json(path, lines=True, dtype=False)
+    elif suffix == '.csv':
+        df = pd.read_csv(path, dtype=str, keep_default_na=False)
+    else:
+        raise ValueError(f"Unsupported AADT file: {path}")
+
+    match = HISTORICAL_CSV_RE.search(os.path.basename(path))
+    if 'station_id' not in df.columns and match:
+        df['station_id'] = match.group(1)
+    if 'direction' not in df.columns:
+        df['direction'] = TWO_WAY
+    df['direction'] = df['direction'].fillna(TWO_WAY).replace('', TWO_WAY)
+    return typed_aadt(df)
+
+
+def typed_aadt(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convert AADT columns read as text (CSV, crawl4ai innerHTML) to nullable typed columns,
+    column by column: Int64 for counts and years, Float64 for percentages, string for src
+    """
+    df = df.reindex(columns=AADT_FACT_COLUMNS)
+    for column in AADT_COLUMNS:
+        kind = AADT_TYPES[column]
+        if kind is str:
+            df[column] = text_column(df[column])
+            continue
+        numbers = numeric_column(df[column])
+        df[column] = np.trunc(numbers).astype('Int64') if kind is int else numbers
+    df['station_id'] = df['station_id'].astype(str)
+    return df[df['year'].notna()].reset_index(drop=True)
+
+
+def text_column(values: pd.Series) -> pd.Series:
+    text = values.astype('string')
+    markup = text.str.contains('[<&]', regex=True).to_numpy(dtype=bool, na_value=False)
+    if markup.any():
+        text[markup] = text[markup].str.replace(MARKUP_RE, '', regex=True)
+    text = text.str.strip()
+    return text.mask(text == '')
+
+
+def numeric_column(values: pd.Series) -> pd.Series:
+    """
+    Numbers of a column of cells. Text is read like parse_int/parse_float (its first number,
+    commas removed) once <sup> footnotes and other markup left by innerHTML are dropped;
+    plain numbers, the usual case, skip the regular expressions. With pyarrow installed
+    the string operations run as Arrow compute kernels.
+    """
+    if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        return values.astype('Float64')
+    text = values.astype('string').str.strip()
+    numbers = text.str.replace(',', '', regex=False)
+    plain = numbers.str.fullmatch(PLAIN_NUMBER_RE).to_numpy(dtype=bool, na_value=False)
+    if not plain.all():
+        found = (text[~plain].str.replace(MARKUP_RE, '', regex=True)
+                 .str.replace(FIRST_NUMBER_RE, r'\1', regex=True)
+                 .str.replace(',', '', regex=False))
+        numbers[~plain] = found.where(found.str.fullmatch(PLAIN_NUMBER_RE).to_numpy(dtype=bool, na_value=False))
+    return numbers.astype('Float64')
+
+
+def read_crawl_output(path: str) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Station metadata and AADT records from crawl_stations output in C4A Tools:
+    a .json dict {station_id: [item]} or .jsonl lines {"station_id", "data": [item]}
+    Returns:
+        (stations, aadt records)
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith('.jsonl'):
+            crawled = {}
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    crawled[entry['station_id']] = entry['data']
+        else:
+            crawled = json.load(f)
+
+    stations, records = [], []
+    for station_id, items in crawled.items():
+        for item in items or []:
+            stations.append({**{column: item.get(column) for column in STATION_COLUMNS}, 'station_id': station_id})
+            for row in item.get('aadt_data', []):
+                records.append({'station_id': station_id, 'direction': TWO_WAY, **row})
+    return pd.DataFrame(stations, columns=STATION_COLUMNS), typed_aadt(pd.DataFrame(records))
+
+
+def load_files(dataset: AADTDataset, aadt_files: Iterable[str] = (), crawl_files: Iterable[str] = ()) -> Tuple[int, int]:
+    """
+    Merge scraper outputs into the dataset; station metadata is loaded first so AADT rows
+    land in their district/county partition
+    Returns:
+        (station rows written, AADT rows written)
+    """
+    stations_written, aadt_written = 0, 0
+    crawl_records = []
+    for path in crawl_files:
+        stations, records = read_crawl_output(path)
+        stations_written += dataset.upsert_stations(stations)
+        crawl_records.append(records)
+    for records in crawl_records:
+        aadt_written += dataset.upsert_aadt(records)
+    for path in aadt_files:
+        aadt_written += dataset.upsert_aadt(read_aadt_records(path))
+    return stations_written, aadt_written
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='Merge TCDS scraper outputs into a partitioned Parquet dataset')
+    parser.add_argument('dataset', help='Dataset directory')
+    parser.add_argument('--aadt', nargs='*', default=[], help='AADT files: BatchScrapper output (.jsonl/.csv/.parquet) or historical_aadt_{id}.csv')
+    parser.add_argument('--crawl', nargs='*', default=[], help='crawl_stations output with station metadata (.json or .jsonl)')
+    parser.add_argument('--compact', action='store_true', help='Rewrite the dataset as one file per partition')
+    args = parser.parse_args(argv)
+
+    dataset = AADTDataset(args.dataset)
+    aadt_files = [path for pattern in args.aadt for path in sorted(glob.glob(pattern)) or [pattern]]
+    stations_written, aadt_written = load_files(dataset, aadt_files, args.crawl)
+    print(f"Upserted {stations_written} station rows and {aadt_written} AADT rows into {args.dataset}")
+    if args.compact:
+        dataset.compact()
+        print("Dataset compacted")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+import json
+import re
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional
+
+import lxml.html
+
+# table.frmDtl tr:has(th:contains('Location ID')) td.lt:last-child
+LABEL_FIELD_RE = re.compile(
+    r"^(?P<table>table(?:\.[\w-]+|#[\w-]+))\s+tr:has\(th:contains\('(?P<label>(?:[^'\\]|\\.)*)'\)\)\s+(?P<pick>\S+)$"
+)
+PICK_RE = re.compile(r"^td(?P<lt>\.lt)?(?P<pseudo>:last-child|:first-of-type|:nth-child\((?P<n>\d+)\))?$")
+CSS_ESCAPE_RE = re.compile(r"\\(.)")
+
+
+def element_text(element) -> str:
+    """Text of an element with every text node stripped, like BeautifulSoup's get_text(strip=True)"""
+    return ''.join(text.strip() for text in element.itertext())
+
+
+def drop_missing(item: dict) -> dict:
+    """crawl4ai leaves fields that are not on the page out of the item"""
+    return {name: value for name, value in item.items() if value is not None}
+
+
+def element_children(element) -> list:
+    return [child for child in element if isinstance(child.tag, str)]
+
+
+def compile_pick(pick: str) -> Optional[Callable]:
+    """
+    Predicate for the cell part of a label selector (td, td.lt, with :last-child,
+    :first-of-type or :nth-child(n)), None if the selector is not of that form
+    """
+    match = PICK_RE.match(pick)
+    if not match:
+        return None
+    need_lt = bool(match.group('lt'))
+    pseudo = match.group('pseudo')
+    n = int(match.group('n')) if match.group('n') else None
+
+    def matches(td) -> bool:
+        if need_lt and 'lt' not in (td.get('class') or '').split():
+            return False
+        if pseudo is None:
+            return True
+        siblings = element_children(td.getparent())
+        if pseudo == ':last-child':
+            return siblings[-1] is td
+        if pseudo == ':first-of-type':
+            return next(sibling for sibling in siblings if sibling.tag == 'td') is td
+        return len(siblings) >= n and siblings[n - 1] is td
+
+    return matches
+
+
+def compile_table_anchor(table: str) -> Callable:
+    """Predicate for `table.class` or `table#id`"""
+    name = table[6:]
+    if table[5] == '#':
+        return lambda element: element.get('id') == name
+    return lambda element: name in (element.get('class') or '').split()
+
+
+class LabelField:
+    """Field read from the first table row whose <th> text contains `label`"""
+
+    def __init__(self, name: str, label: str, pick: Callable):
+        self.name = name
+        self.label = label
+        self.pick = pick
+
+
+class SelectorField:
+    """Any other field, evaluated with a precompiled lxml CSS selector"""
+
+    def __init__(self, name: str, selector: str, kind: str, attribute: Optional[str] = None,
+                 fields: Optional[List['SelectorField']] = None, default=None):
+        from lxml.cssselect import CSSSelector
+
+        self.name = name
+        self.select = CSSSelector(selector, translator='html')
+        self.kind = kind
+        self.attribute = attribute
+        self.fields = fields or []
+        self.default = default
+
+    def value(self, element):
+        if self.kind == 'nested_list':
+            return [drop_missing({field.name: field.value(item) for field in self.fields}) for item in self.select(element)]
+        selected = self.select(element)
+        if not selected:
+            return self.default
+        if self.kind == 'attribute':
+            return selected[0].get(self.attribute, self.default)
+        if self.kind == 'html':
+            return lxml.html.tostring(selected[0], encoding='unicode')
+        return element_text(selected[0])
+
+
+def compile_selector_field(field: dict) -> SelectorField:
+    kind = field.get('type', 'text')
+    if kind not in ('text', 'attribute', 'html', 'nested_list'):
+        raise ValueError(f"Unsupported field type {kind!r} for {field['name']}")
+    nested = [compile_selector_field(sub_field) for sub_field in field.get('fields', [])]
+    return SelectorField(field['name'], field['selector'], kind, field.get('attribute'), nested, field.get('default'))
+
+
+class CompiledSchema:
+    """
+    A JsonCssExtractionStrategy schema compiled for repeated use.
+
+    Text fields of the form `table.frmDtl tr:has(th:contains('Label')) td.lt` are grouped by
+    their anchor table and resolved together in one pass over the table rows: the <th> texts of
+    each row are read once and every field still unresolved takes the first matching cell, which
+    is the element select_one() would return. Other fields (the AADT nested list) use lxml CSS
+    selectors compiled here once. extract() returns the same structure as the crawl4ai strategy:
+    one dictionary per base element, leaving out fields that are not on the page.
+    """
+
+    def __init__(self, schema: dict):
+        from lxml.cssselect import CSSSelector
+
+        self.name = schema.get('name')
+        self.select_base = CSSSelector(schema.get('baseSelector', 'body'), translator='html')
+        self.field_names = []
+        self.anchors = {}  # table selector -> (predicate, [LabelField])
+        self.selector_fields = []
+        for field in schema['fields']:
+            self.field_names.append(field['name'])
+            match = LABEL_FIELD_RE.match(field['selector']) if field.get('type', 'text') == 'text' else None
+            pick = compile_pick(match.group('pick')) if match else None
+            if pick is None:
+                self.selector_fields.append(compile_selector_field(field))
+                continue
+            table = match.group('table')
+            if table not in self.anchors:
+                self.anchors[table] = (compile_table_anchor(table), [])
+            label = CSS_ESCAPE_RE.sub(r'\1', match.group('label'))
+            self.anchors[table][1].append(LabelField(field['name'], label, pick))
+
+    def label_values(self, element) -> Dict[str, str]:
+        values = {}
+        tables = list(element.iter('table'))
+        for is_anchor, fields in self.anchors.values():
+            pending = list(fields)
+            seen_rows = set()
+            for table in tables:
+                if not is_anchor(table):
+                    continue
+                for tr in table.iter('tr'):
+                    if not pending:
+                        break
+                    if tr in seen_rows:
+                        continue
+                    seen_rows.add(tr)
+                    headers = [element_text(th) for th in tr.iter('th')]
+                    if not headers:
+                        continue
+                    cells = None
+                    for field in list(pending):
+                        if not any(field.label in header for header in headers):
+                            continue
+                        if cells is None:
+                            cells = list(tr.iter('td'))
+                        cell = next((td for td in cells if field.pick(td)), None)
+                        if cell is not None:
+                            values[field.name] = element_text(cell)
+                            pending.remove(field)
+        return values
+
+    def extract(self, html: str) -> List[dict]:
+        if not html:
+            return []
+        root = lxml.html.document_fromstring(html)
+        items = []
+        for element in self.select_base(root):
+            values = self.label_values(element)
+            for field in self.selector_fields:
+                values[field.name] = field.value(element)
+            item = drop_missing({name: values.get(name) for name in self.field_names})
+            if item:
+                items.append(item)
+        return items
+
+
+def compile_schema(schema: dict) -> CompiledSchema:
+    return CompiledSchema(schema)
+
+
+@lru_cache(maxsize=None)
+def load_schema(path: str) -> CompiledSchema:
+    """Compiled schema of a JSON schema file, read once per process"""
+    with open(path, 'r') as f:
+        return compile_schema(json.load(f))
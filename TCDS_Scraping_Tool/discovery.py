@@ -0,0 +1,265 @@
+import argparse
+import asyncio
+import logging
+import os
+import re
+import zlib
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import lxml.html
+import pandas as pd
+
+from TCDS_Scraping_Tool.async_fetch import TCDS_BASE_URL, AsyncTCDSFetcher
+from TCDS_Scraping_Tool.config import setup_logging
+from TCDS_Scraping_Tool.detail_extractor import element_text
+from TCDS_Scraping_Tool.pagination import has_next_page, page_count
+
+# AJAX grid behind the location list of tsearch.asp
+LIST_PATH = '/tcds/ajax/tcds_tsearch_list.asp'
+INDEX_COLUMNS = ['station_id', 'district', 'county', 'active', 'last_count_date', 'listed']
+# Column of the station list -> texts its header may contain (lowercase)
+LIST_HEADERS = {
+    'station_id': ('loc id', 'location id', 'local id'),
+    'district': ('district',),
+    'county': ('county',),
+    'active': ('active',),
+    'last_count_date': ('last count',),
+}
+TRUE_TEXTS = {'yes', 'y', 'true', '1', 'active', 'x'}
+FALSE_TEXTS = {'no', 'n', 'false', '0', 'inactive'}
+DATE_FORMATS = ['%m/%d/%Y', '%Y-%m-%d', '%m/%d/%y', '%m/%d/%Y %I:%M:%S %p']
+SHARD_NAME_RE = re.compile(r'[^\w-]+')
+
+logger = logging.getLogger(__name__)
+
+
+def parse_active(text: str) -> Optional[bool]:
+    text = text.strip().lower()
+    if text in TRUE_TEXTS:
+        return True
+    if text in FALSE_TEXTS:
+        return False
+    return None
+
+
+def parse_date(text: str) -> Optional[str]:
+    """ISO date of a list date cell, None if it is empty or not a date"""
+    text = text.strip()
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, date_format).date().isoformat()
+        except ValueError:
+            continue
+    return None
+
+
+def header_columns(headers: List[str]) -> Dict[int, str]:
+    """Position -> index column of the header cells that name one"""
+    columns = {}
+    for position, header in enumerate(headers):
+        header = header.lower()
+        for column, texts in LIST_HEADERS.items():
+            if column not in columns.values() and any(text in header for text in texts):
+                columns[position] = column
+                break
+    return columns
+
+
+def parse_station_list(html: str) -> List[dict]:
+    """
+    Stations of one page of the location list.
+    The list table is found by its header row (a "Loc ID" column), columns are read by
+    header text, and rows with fewer cells than the header (the pagination row) are skipped.
+    Returns:
+        [{'station_id': '31H228', 'district': ..., 'county': ..., 'active': True, 'last_count_date': '2023-05-02'}, ...]
+    """
+    if not html:
+        return []
+    stations = []
+    for table in lxml.html.fromstring(html).iter('table'):
+        rows = table.findall('.//tr')
+        columns = {}
+        for tr in rows:
+            cells = [cell for cell in tr if cell.tag in ('th', 'td')]
+            if not columns:
+                columns = header_columns([element_text(cell) for cell in cells])
+                if 'station_id' not in columns.values():
+                    columns = {}
+                continue
+            if len(cells) <= max(columns):
+                continue
+            station = {column: element_text(cells[position]) for position, column in columns.items()}
+            if not station['station_id']:
+                continue
+            if 'active' in station:
+                station['active'] = parse_active(station['active'])
+            if 'last_count_date' in station:
+                station['last_count_date'] = parse_date(station['last_count_date'])
+            stations.append(station)
+        if columns:
+            break
+    return stations
+
+
+def list_params(agency_id: str, pg: int, filters: Dict[str, str]) -> dict:
+    return {'agency_id': agency_id, 'pg': str(pg), **filters}
+
+
+async def discover_stations(fetcher: AsyncTCDSFetcher, list_path: str = LIST_PATH, max_pages: int = 5000,
+                            **filters) -> List[dict]:
+    """
+    Read every page of the location list. The number of pages is read from the first page
+    and the remaining pages are requested concurrently, within the fetcher's limits; without
+    a page count, the next button is followed.
+    Args:
+        filters: extra query parameters of the list, e.g. a district to discover
+    """
+    first = await fetcher.get(list_path, list_params(fetcher.agency_id, 1, filters))
+    pages = [first]
+    total = page_count(first)
+    if total is not None:
+        last = min(total, max_pages)
+        pages += await asyncio.gather(*(fetcher.get(list_path, list_params(fetcher.agency_id, pg, filters)) for pg in range(2, last + 1)))
+    else:
+        while has_next_page(pages[-1]) and len(pages) < max_pages:
+            pages.append(await fetcher.get(list_path, list_params(fetcher.agency_id, len(pages) + 1, filters)))
+    if (total or 0) > max_pages or (total is None and has_next_page(pages[-1])):
+        logger.warning(f"Station list truncated at {max_pages} pages")
+
+    stations = {}
+    for html in pages:
+        for station in parse_station_list(html):
+            stations.setdefault(station['station_id'], station)
+    logger.info(f"Discovered {len(stations)} stations on {len(pages)} list pages")
+    return list(stations.values())
+
+
+def discover(base_url: str = TCDS_BASE_URL, concurrency: int = 4, rate_limit: Optional[float] = 2.0,
+             list_path: str = LIST_PATH, max_pages: int = 5000, **filters) -> pd.DataFrame:
+    """Synchronous wrapper around discover_stations, returning the stations as an index table"""
+    async def run():
+        async with AsyncTCDSFetcher(base_url=base_url, concurrency=concurrency, rate_limit=rate_limit) as fetcher:
+            return await discover_stations(fetcher, list_path, max_pages, **filters)
+
+    stations = pd.DataFrame(asyncio.run(run()), columns=INDEX_COLUMNS[:-1])
+    stations['listed'] = datetime.now().isoformat(timespec='seconds')
+    return stations
+
+
+def read_index(path: str) -> pd.DataFrame:
+    """Station index saved by write_index (.csv or .parquet), empty if it doesn't exist"""
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=INDEX_COLUMNS)
+    if path.endswith('.parquet'):
+        index = pd.read_parquet(path)
+    else:
+        index = pd.read_csv(path, dtype={'station_id': str, 'district': str, 'county': str, 'last_count_date': str, 'listed': str})
+        index['active'] = index['active'].map({True: True, False: False, 'True': True, 'False': False})
+    return index.reindex(columns=INDEX_COLUMNS)
+
+
+def write_index(index: pd.DataFrame, path: str):
+    tmp_path = f"{path}.tmp"
+    if path.endswith('.parquet'):
+        index.to_parquet(tmp_path, index=False)
+    else:
+        index.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def update_index(path: str, discovered: pd.DataFrame) -> pd.DataFrame:
+    """
+    Merge newly discovered stations into the index file. Listed stations replace their old
+    entry; stations no longer listed are kept with their old `listed` time.
+    """
+    index = pd.concat([read_index(path), discovered.reindex(columns=INDEX_COLUMNS)], ignore_index=True)
+    index = index.drop_duplicates('station_id', keep='last').sort_values('station_id').reset_index(drop=True)
+    write_index(index, path)
+    return index
+
+
+def select_stations(index: pd.DataFrame, active_only: bool = False, counted_since: Optional[str] = None,
+                    districts: Optional[List[str]] = None, counties: Optional[List[str]] = None) -> pd.DataFrame:
+    selected = index
+    if active_only:
+        selected = selected[selected['active'].fillna(True).astype(bool)]
+    if counted_since:
+        selected = selected[pd.to_datetime(selected['last_count_date'], errors='coerce') >= pd.Timestamp(counted_since)]
+    if districts:
+        selected = selected[selected['district'].isin(districts)]
+    if counties:
+        selected = selected[selected['county'].isin(counties)]
+    return selected
+
+
+def shard_stations(stations: pd.DataFrame, by: Optional[str] = None, shards: int = 1) -> Dict[str, List[str]]:
+    """
+    Split stations into work queues: one per `by` value (district or county), each split
+    again into `shards` parts by a stable hash of the station ID
+    Returns:
+        {shard name: [station_id, ...]}
+    """
+    groups = stations.groupby(stations[by].fillna('unknown')) if by else [('all', stations)]
+    queues = {}
+    for value, group in groups:
+        name = SHARD_NAME_RE.sub('_', str(value)).strip('_') or 'unknown'
+        ids = sorted(group['station_id'])
+        if shards <= 1:
+            queues[name] = ids
+            continue
+        for id in ids:
+            part = zlib.crc32(id.encode()) % shards
+            queues.setdefault(f"{name}_{part:02d}", []).append(id)
+    return dict(sorted(queues.items()))
+
+
+def write_shards(queues: Dict[str, List[str]], out_dir: str) -> List[str]:
+    """Write each queue as an ID file, as read by BatchScrapper -f"""
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for name, ids in queues.items():
+        path = os.path.join(out_dir, f"{name}.txt")
+        with open(path, 'w') as f:
+            f.write('\n'.join(ids) + '\n')
+        paths.append(path)
+    return paths
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='Discover TCDS stations, keep a local station index and split it into ID files')
+    parser.add_argument('index', help='Station index file, .csv or .parquet (updated in place)')
+    parser.add_argument('--no-discover', action='store_true', help='Only shard the existing index')
+    parser.add_argument('--base-url', default=TCDS_BASE_URL, help='TCDS site, or a local stub server')
+    parser.add_argument('--list-path', default=LIST_PATH, help=f'Path of the location list (default: {LIST_PATH})')
+    parser.add_argument('--filter', action='append', default=[], metavar='NAME=VALUE', help='Extra query parameter of the list, repeatable')
+    parser.add_argument('--concurrency', type=int, default=4, help='List pages requested at once (default: 4)')
+    parser.add_argument('--rate', type=float, default=2.0, help='Requests per second (default: 2)')
+    parser.add_argument('--out', help='Directory to write the sharded ID files to')
+    parser.add_argument('--shard-by', choices=['district', 'county'], help='One ID file per district or county')
+    parser.add_argument('--shards', type=int, default=1, help='Split each ID file into this many parts (default: 1)')
+    parser.add_argument('--active-only', action='store_true', help='Leave out stations listed as inactive')
+    parser.add_argument('--counted-since', help='Only stations with a count on or after this date (YYYY-MM-DD)')
+    parser.add_argument('--district', action='append', help='Only stations of this district, repeatable')
+    parser.add_argument('--county', action='append', help='Only stations of this county, repeatable')
+    args = parser.parse_args(argv)
+
+    setup_logging()
+
+    if args.no_discover:
+        index = read_index(args.index)
+    else:
+        filters = dict(item.split('=', 1) for item in args.filter)
+        discovered = discover(args.base_url, args.concurrency, args.rate, args.list_path, **filters)
+        index = update_index(args.index, discovered)
+        print(f"{len(discovered)} stations listed, {len(index)} in {args.index}")
+
+    if args.out:
+        stations = select_stations(index, args.active_only, args.counted_since, args.district, args.county)
+        queues = shard_stations(stations, args.shard_by, args.shards)
+        paths = write_shards(queues, args.out)
+        print(f"Wrote {len(stations)} station IDs to {len(paths)} files in {args.out}")
+
+
+if __name__ == "__main__":
+    main()
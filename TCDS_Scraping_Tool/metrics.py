@@ -0,0 +1,169 @@
+import json
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile of `values` (q between 0 and 100), None if there are none"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, int(round(q / 100 * len(ordered) + 0.5)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+class StageStats:
+    """
+    Durations of one stage: exact count, total and max, and a uniform sample of at most
+    `sample_size` durations for percentiles, so long runs use constant memory
+    """
+
+    def __init__(self, sample_size: int = 10000):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.sample_size = sample_size
+        self.sample = []
+
+    def add(self, duration: float):
+        self.count += 1
+        self.total += duration
+        self.max = max(self.max, duration)
+        if len(self.sample) < self.sample_size:
+            self.sample.append(duration)
+        else:
+            i = random.randrange(self.count)
+            if i < self.sample_size:
+                self.sample[i] = duration
+
+    def summary(self) -> dict:
+        return {
+            'count': self.count,
+            'total_seconds': round(self.total, 4),
+            'p50_seconds': percentile(self.sample, 50),
+            'p95_seconds': percentile(self.sample, 95),
+            'max_seconds': self.max,
+        }
+
+
+class Metrics:
+    """
+    Timing spans and counters of a scrape run, shared by all workers and backends.
+
+    `with metrics.station(id):` tags every span recorded by the calling thread with the
+    station; `with metrics.span('fetch', page=2):` times one stage. Spans are kept until
+    drain_spans() (e.g. once per batch), stage durations and counters for the whole run.
+    Stages used by the scraper: connect, throttle, fetch, parse, direction, write, sleep
+    and station (a whole station, retries included).
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self.stages: Dict[str, StageStats] = {}
+        self.counters: Dict[str, float] = {}
+        self.spans = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def station(self, station_id: str):
+        with self.tag(station_id), self.span('station'):
+            yield
+
+    @contextmanager
+    def tag(self, station_id: Optional[str]):
+        """Attribute the calling thread's spans to a station without timing it, e.g. on a helper thread"""
+        previous = getattr(self._local, 'station', None)
+        self._local.station = station_id
+        try:
+            yield
+        finally:
+            self._local.station = previous
+
+    def current_station(self) -> Optional[str]:
+        return getattr(self._local, 'station', None)
+
+    @contextmanager
+    def span(self, stage: str, **labels):
+        start = time.time()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - started, start, **labels)
+
+    def record(self, stage: str, duration: float, start: Optional[float] = None, **labels):
+        span = {
+            'station_id': self.current_station(),
+            'stage': stage,
+            'start': round(start if start is not None else time.time() - duration, 6),
+            'seconds': round(duration, 6),
+            **labels,
+        }
+        with self._lock:
+            self.spans.append(span)
+            if stage not in self.stages:
+                self.stages[stage] = StageStats()
+            self.stages[stage].add(duration)
+
+    def count(self, name: str, value: float = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def drain_spans(self) -> List[dict]:
+        with self._lock:
+            spans, self.spans = self.spans, []
+        return spans
+
+    def summary(self) -> dict:
+        """Run aggregates: stage latencies, stations/hour, bytes fetched, retries and other counters"""
+        with self._lock:
+            elapsed = time.time() - self.started
+            stages = {stage: stats.summary() for stage, stats in self.stages.items()}
+            counters = dict(self.counters)
+        completed = counters.get('stations_completed', 0)
+        return {
+            'elapsed_seconds': round(elapsed, 3),
+            'stations_per_hour': round(completed / elapsed * 3600, 2) if elapsed > 0 else None,
+            'bytes_fetched': counters.get('bytes_fetched', 0),
+            'retries': counters.get('retries', 0),
+            'counters': counters,
+            'stages': stages,
+        }
+
+    def write_json(self, path: str, spans: Optional[List[dict]] = None, **extra):
+        with open(path, 'w') as f:
+            json.dump({**extra, 'summary': self.summary(), 'spans': spans or []}, f, indent=2)
+
+    def prometheus_text(self, prefix: str = 'tcds_scrape') -> str:
+        summary = self.summary()
+        lines = [
+            f"# HELP {prefix}_stage_seconds Duration of scrape stages",
+            f"# TYPE {prefix}_stage_seconds summary",
+        ]
+        for stage, stats in sorted(summary['stages'].items()):
+            for quantile, key in (('0.5', 'p50_seconds'), ('0.95', 'p95_seconds')):
+                if stats[key] is not None:
+                    lines.append(f'{prefix}_stage_seconds{{stage="{stage}",quantile="{quantile}"}} {stats[key]}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {stats["total_seconds"]}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {stats["count"]}')
+        for name, value in sorted(summary['counters'].items()):
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.append(f"{prefix}_{name}_total {value}")
+        lines.append(f"# TYPE {prefix}_stations_per_hour gauge")
+        lines.append(f"{prefix}_stations_per_hour {summary['stations_per_hour'] or 0}")
+        lines.append(f"# TYPE {prefix}_elapsed_seconds gauge")
+        lines.append(f"{prefix}_elapsed_seconds {summary['elapsed_seconds']}")
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path: str):
+        """Write the aggregates in the Prometheus text format, e.g. for node_exporter's textfile collector"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(self.prometheus_text())
+        # Replace atomically so the collector never reads a partial file
+        os.replace(tmp_path, path)
@@ -0,0 +1,98 @@
+import math
+import re
+from typing import Callable, List, Optional, Tuple
+
+ROW_RE = re.compile(r'<tr[^>]*class="FormRowLabel"[^>]*>(.*?)</tr>', re.S | re.I)
+TD_RE = re.compile(r'<td[\s>]', re.I)
+PAGE_OF_RE = re.compile(r'Page\s*(\d+)\s*of\s*(\d+)', re.I)
+RECORDS_OF_RE = re.compile(r'(\d+)\s*-\s*(\d+)\s*of\s*(\d+)', re.I)
+# The button's value attribute is ">", so quoted attribute values are matched as a whole
+NEXT_BUTTON_RE = re.compile(r'<input(?:[^>"]|"[^"]*")*name="a_first"(?:[^>"]|"[^"]*")*>', re.I)
+DIRECTIONS = ["NB", "SB", "EB", "WB"]
+DIR_INPUT_RE = re.compile(r'<input[^>]*value="(NB|SB|EB|WB)"', re.I)
+
+
+def has_aadt_table(html: str) -> bool:
+    """Check whether a response holds an AADT table at all, with or without data rows"""
+    return ROW_RE.search(html) is not None
+
+
+def has_data_rows(html: str) -> bool:
+    """
+    Check whether an AADT page has any data rows.
+    The first FormRowLabel row holds the column names, data rows have more than one cell
+    and the pagination row has a single cell.
+    """
+    rows = ROW_RE.findall(html)
+    return any(len(TD_RE.findall(row)) > 1 for row in rows[1:])
+
+
+def find_directions(html: str) -> List[str]:
+    """
+    Read the available directions from the DIR_BUTTONS_DIV of an AADT response
+    Returns:
+        A list of available directions ["NB", "SB"], empty for "two-way" only
+    """
+    start = html.find('id="DIR_BUTTONS_DIV"')
+    if start < 0:
+        return []
+    values = DIR_INPUT_RE.findall(html, start)
+    return [dir for dir in DIRECTIONS if dir in values]
+
+
+def same_as_two_way(direction_page: str, two_way_page: str) -> bool:
+    """
+    Check whether a directional first page is byte-identical to the two-way first page.
+    The site marks the selected direction's button, so an identical page means the
+    endpoint ignored the direction parameter and served the two-way table.
+    """
+    return direction_page == two_way_page
+
+
+def page_count(html: str) -> Optional[int]:
+    """
+    Read the total number of AADT pages from the pagination control.
+    Understands "Page 1 of 3" and "1 - 10 of 25" (records) labels.
+    Returns:
+        Number of pages, or None if the page has no such label
+    """
+    match = PAGE_OF_RE.search(html)
+    if match:
+        return int(match.group(2))
+    match = RECORDS_OF_RE.search(html)
+    if match:
+        first, last, total = (int(g) for g in match.groups())
+        per_page = last - first + 1
+        if per_page > 0:
+            return math.ceil(total / per_page)
+    return None
+
+
+def has_next_page(html: str) -> bool:
+    """Check if the ">" (a_first) button on the page is present and enabled"""
+    match = NEXT_BUTTON_RE.search(html)
+    return bool(match) and 'disabled' not in match.group(0).lower()
+
+
+def collect_pages(get_page: Callable[[int], str], max_pages: int) -> Tuple[List[str], bool]:
+    """
+    Fetch AADT pages one after another, using the first page's pagination control to
+    decide how many exist, and stop at the first page without data rows.
+    Args:
+        get_page: function returning the HTML of page `pg`
+        max_pages: most pages to fetch
+    Returns:
+        (list of page HTML, True if the station has more than max_pages pages)
+    """
+    pages = [get_page(1)]
+    total = page_count(pages[0])
+    pg = 1
+    while has_data_rows(pages[-1]) and (pg < total if total else has_next_page(pages[-1])):
+        pg += 1
+        if pg > max_pages:
+            return pages, True
+        page = get_page(pg)
+        if not has_data_rows(page):
+            break
+        pages.append(page)
+    return pages, False
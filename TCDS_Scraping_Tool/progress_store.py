@@ -0,0 +1,133 @@
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS station_progress (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    reason TEXT,
+    updated TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS run_state (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class ProgressStore:
+    """
+    SQLite-backed scraping progress.
+
+    Every completed or failed ID is committed on its own, so a crash loses at most the
+    station being processed. Completed IDs are also kept in a set for O(1) membership.
+    A legacy scraping_progress.json next to the database is imported the first time.
+    """
+
+    def __init__(self, path: str = "scraping_progress.sqlite", legacy_json: Optional[str] = None):
+        self.path = path
+        is_new = not os.path.exists(path)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.completed = {row[0] for row in self.conn.execute("SELECT id FROM station_progress WHERE status = 'completed'")}
+
+        if is_new and legacy_json and os.path.exists(legacy_json):
+            self.import_json(legacy_json)
+
+    def import_json(self, json_file: str):
+        """Import the completed_ids/failed_ids lists of the old JSON progress file"""
+        with open(json_file, 'r') as f:
+            progress = json.load(f)
+        now = datetime.now().isoformat()
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO station_progress (id, status, attempts, updated) VALUES (?, 'completed', 1, ?)",
+                ((id, now) for id in progress.get('completed_ids', []))
+            )
+            for id in progress.get('failed_ids', []):
+                self.conn.execute(
+                    "INSERT INTO station_progress (id, status, attempts, reason, updated) VALUES (?, 'failed', 1, 'imported', ?) "
+                    "ON CONFLICT(id) DO UPDATE SET attempts = attempts + 1 WHERE status = 'failed'",
+                    (id, now)
+                )
+            for key in ('last_batch', 'total_processed'):
+                if key in progress:
+                    self._set_state(key, progress[key])
+        self.completed.update(progress.get('completed_ids', []))
+
+    def is_completed(self, id: str) -> bool:
+        return id in self.completed
+
+    def mark_completed(self, id: str):
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO station_progress (id, status, attempts, reason, updated) VALUES (?, 'completed', 1, NULL, ?) "
+                "ON CONFLICT(id) DO UPDATE SET status = 'completed', attempts = attempts + 1, reason = NULL, updated = excluded.updated",
+                (id, datetime.now().isoformat())
+            )
+            self.completed.add(id)
+
+    def mark_failed(self, id: str, reason: str):
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO station_progress (id, status, attempts, reason, updated) VALUES (?, 'failed', 1, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET status = 'failed', attempts = attempts + 1, reason = excluded.reason, updated = excluded.updated",
+                (id, reason, datetime.now().isoformat())
+            )
+
+    def failed(self, ids: Optional[Iterable[str]] = None) -> Dict[str, dict]:
+        """
+        Args:
+            ids: only look up these IDs (default: all)
+        Returns:
+            {id: {'reason': reason, 'attempts': attempts}} for IDs whose last attempt failed
+        """
+        query = "SELECT id, reason, attempts FROM station_progress WHERE status = 'failed'"
+        params = []
+        if ids is not None:
+            params = list(ids)
+            query += f" AND id IN ({', '.join('?' * len(params))})"
+        with self._lock:
+            rows = self.conn.execute(query, params).fetchall()
+        return {id: {'reason': reason, 'attempts': attempts} for id, reason, attempts in rows}
+
+    def completed_at(self) -> Dict[str, str]:
+        """
+        Returns:
+            {id: ISO time of its last successful attempt} for completed IDs
+        """
+        with self._lock:
+            rows = self.conn.execute("SELECT id, updated FROM station_progress WHERE status = 'completed'").fetchall()
+        return dict(rows)
+
+    def pending(self, all_ids: Iterable[str]) -> List[str]:
+        """IDs that haven't been completed yet, in input order"""
+        completed = self.completed
+        return [id for id in all_ids if id not in completed]
+
+    def _set_state(self, key: str, value):
+        self.conn.execute(
+            "INSERT INTO run_state (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, json.dumps(value))
+        )
+
+    def get_state(self, key: str, default=None):
+        with self._lock:
+            row = self.conn.execute("SELECT value FROM run_state WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set_state(self, **values):
+        with self._lock, self.conn:
+            for key, value in values.items():
+                self._set_state(key, value)
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,127 @@
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket shared by all workers.
+    Tokens refill at `rate` per second up to `burst`; acquire() blocks until a token is available.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self) -> float:
+        """
+        Take one token, waiting for it if needed.
+        Returns:
+            Seconds spent waiting
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+
+def retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delay in seconds or HTTP date), None if absent or invalid"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+class AdaptiveRateController(TokenBucket):
+    """
+    Token bucket whose rate adapts to how the server responds (AIMD), shared by every
+    backend and worker.
+
+    Each healthy response raises the rate so that it grows by up to `increase` requests/s
+    per second of traffic, until `max_rate`. Responses slower than `slow_latency` seconds
+    hold the rate. A failure (429, 5xx, timeout, a page without an AADT table) multiplies
+    the rate by `decrease`, down to `min_rate`, and pauses every caller for the server's
+    Retry-After or an exponential backoff with jitter that grows with consecutive failures.
+    """
+
+    def __init__(self,
+                 rate: float = 0.5,
+                 min_rate: float = 0.05,
+                 max_rate: float = 5.0,
+                 burst: int = 1,
+                 increase: float = 0.1,
+                 decrease: float = 0.5,
+                 slow_latency: float = 10.0,
+                 backoff: float = 5.0,
+                 max_backoff: float = 300.0):
+
+        super().__init__(min(max(rate, min_rate), max_rate), burst)
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.slow_latency = slow_latency
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.failures = 0
+        self.paused_until = 0.0
+
+    def acquire(self) -> float:
+        waited = 0.0
+        while True:
+            with self._lock:
+                pause = self.paused_until - time.monotonic()
+            if pause <= 0:
+                return waited + super().acquire()
+            time.sleep(pause)
+            waited += pause
+
+    def backoff_delay(self, attempt: int) -> float:
+        """Exponential backoff for the given attempt (0-based), half of it randomized"""
+        delay = min(self.max_backoff, self.backoff * 2 ** attempt)
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def record_success(self, latency: Optional[float] = None):
+        with self._lock:
+            self.failures = 0
+            if latency is not None and latency > self.slow_latency:
+                return
+            self.rate = min(self.max_rate, self.rate + self.increase / max(self.rate, 1.0))
+
+    def record_failure(self, retry_after: Optional[float] = None) -> float:
+        """
+        Back off after a throttled or failed request
+        Returns:
+            Seconds every caller is paused
+        """
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            delay = retry_after if retry_after is not None else self.backoff_delay(self.failures)
+            self.failures += 1
+            self.tokens = min(self.tokens, 0.0)
+            self.paused_until = max(self.paused_until, time.monotonic() + delay)
+            return delay
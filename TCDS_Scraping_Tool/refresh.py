@@ -0,0 +1,211 @@
+import argparse
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from TCDS_Scraping_Tool.aadt_parser import TWO_WAY, parse_aadt_page, parse_int, station_records
+from TCDS_Scraping_Tool.backends import ScrapeBackend, get_backend
+from TCDS_Scraping_Tool.config import (add_cache_arguments, add_rate_arguments, rate_controller, read_ids, response_cache,
+                                       setup_logging)
+from TCDS_Scraping_Tool.dataset import AADTDataset
+from TCDS_Scraping_Tool.progress_store import ProgressStore
+
+# Refresh reasons, most urgent first
+MISSING = 'missing'        # no AADT in the dataset yet
+NEW_COUNT = 'new_count'    # counted in a year after its latest AADT year
+STALE = 'stale'            # latest AADT year older than the newest published year
+CURRENT = 'current'
+REASONS = [MISSING, NEW_COUNT, STALE, CURRENT]
+
+
+def plan_refresh(dataset: AADTDataset,
+                 station_ids: Optional[List[str]] = None,
+                 last_checked: Optional[Dict[str, str]] = None,
+                 latest_year: Optional[int] = None,
+                 recheck_days: float = 30,
+                 include_current: bool = False) -> pd.DataFrame:
+    """
+    Decide which stations to re-scrape and in which order
+    Args:
+        station_ids: stations to consider (default: every station in the dataset)
+        last_checked: {station_id: ISO time} of earlier refreshes that found nothing new (or no AADT at all)
+        latest_year: newest published AADT year (default: the newest year in the dataset)
+        recheck_days: stations checked or changed more recently than this are skipped, including
+                      stations without AADT
+        include_current: also plan stations that look up to date
+    Returns:
+        One row per station to refresh, most urgent first, with columns station_id, reason,
+        latest_year, years_behind, last_count_check and last_checked
+    """
+    aadt = dataset.read_aadt()
+    two_way = aadt[aadt['direction'] == TWO_WAY]
+    per_station = two_way.groupby('station_id').agg(latest_year=('year', 'max'), last_changed=('updated', 'max'))
+    if latest_year is None:
+        latest_year = int(per_station['latest_year'].max()) if not per_station.empty else None
+
+    stations = dataset.stations.read().set_index('station_id')
+    days_since_check = stations['days_since_last_count_check'].map(lambda value: parse_int(value) if isinstance(value, str) else None)
+    last_count_check = pd.to_datetime(stations['updated']) - pd.to_timedelta(days_since_check.astype(float), unit='D')
+
+    ids = list(dict.fromkeys(station_ids)) if station_ids is not None else sorted(set(per_station.index) | set(stations.index))
+    plan = pd.DataFrame({'station_id': ids}).set_index('station_id')
+    plan = plan.join(per_station).join(last_count_check.rename('last_count_check'))
+    checked = pd.to_datetime(pd.Series(last_checked or {}, dtype=object)).rename('refreshed')
+    plan = plan.join(checked)
+    # Object dtype when no station has AADT yet
+    plan['last_changed'] = pd.to_datetime(plan['last_changed'])
+    plan['last_checked'] = plan[['last_changed', 'refreshed']].max(axis=1)
+    plan['years_behind'] = (latest_year - plan['latest_year']) if latest_year is not None else 0
+
+    due = ~(plan['last_checked'] > pd.Timestamp.now() - pd.Timedelta(days=recheck_days))
+    plan['reason'] = CURRENT
+    plan.loc[due & (plan['years_behind'] > 0), 'reason'] = STALE
+    plan.loc[due & (plan['last_count_check'].dt.year > plan['latest_year']), 'reason'] = NEW_COUNT
+    plan.loc[due & plan['latest_year'].isna(), 'reason'] = MISSING
+    if not include_current:
+        plan = plan[plan['reason'] != CURRENT]
+
+    plan['rank'] = plan['reason'].map(REASONS.index)
+    plan = plan.sort_values(['rank', 'years_behind', 'last_checked'], ascending=[True, False, True], na_position='first')
+    return plan.reset_index()[['station_id', 'reason', 'latest_year', 'years_behind', 'last_count_check', 'last_checked']]
+
+
+class Refresher:
+    """
+    Re-scrape planned stations into the dataset. For stations already in the dataset only
+    the first two-way AADT page is requested; the remaining pages and directions are fetched
+    only when that page shows a new year or a revised value. Stations are checked by
+    `workers` threads, paced by the backend's rate controller, and their records are upserted every
+    `upsert_every` stations. Checked stations, including those whose AADT table is empty,
+    are recorded in the progress store, so plan_refresh doesn't plan them again before
+    `recheck_days`; failed stations stay due.
+    """
+
+    def __init__(self,
+                 dataset: AADTDataset,
+                 backend: ScrapeBackend,
+                 progress: ProgressStore,
+                 workers: int = 1,
+                 upsert_every: int = 200,
+                 logger: Optional[logging.Logger] = None):
+
+        self.dataset = dataset
+        self.backend = backend
+        self.progress = progress
+        self.workers = workers
+        self.upsert_every = upsert_every
+        self.logger = logger or logging.getLogger(__name__)
+        self.known = {}
+
+    def first_page_changed(self, id: str, first_page: str) -> bool:
+        known = self.known.get(id)
+        rows = parse_aadt_page(first_page)
+        if known is None or not rows:
+            return True
+        incoming = pd.DataFrame([{'station_id': id, 'direction': TWO_WAY, **row} for row in rows])
+        incoming = self.dataset.aadt.normalize(incoming).to_pandas()
+        return not self.dataset.aadt.changed_rows(incoming, known).empty
+
+    def refresh_station(self, id: str) -> Tuple[str, List[dict]]:
+        """
+        Returns:
+            ('unchanged' | 'updated' | 'empty', records to upsert)
+        Raises:
+            The backend's error if the station could not be scraped
+        """
+        first_page = self.backend.fetch_first_page(id) if id in self.known else None
+        if first_page is not None and not self.first_page_changed(id, first_page):
+            return 'unchanged', []
+        results = self.backend.scrape_station(id, first_page)
+        if not results:
+            return 'empty', []
+        return 'updated', station_records(id, results)
+
+    def run(self, plan: pd.DataFrame) -> Dict[str, int]:
+        """
+        Refresh the stations of a plan from plan_refresh, in order
+        Returns:
+            Number of stations per outcome, and of AADT rows written
+        """
+        ids = list(plan['station_id'])
+        aadt = self.dataset.read_aadt()
+        aadt = aadt[aadt['station_id'].isin(ids) & (aadt['direction'] == TWO_WAY)]
+        self.known = {id: rows for id, rows in aadt.groupby('station_id')}
+
+        counts = {'unchanged': 0, 'updated': 0, 'empty': 0, 'failed': 0, 'rows_written': 0}
+        pending_records = []
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {executor.submit(self.refresh_station, id): id for id in ids}
+            for done, future in enumerate(as_completed(futures), 1):
+                id = futures[future]
+                try:
+                    status, records = future.result()
+                except Exception as e:
+                    status, records = 'failed', []
+                    self.logger.error(f"Error refreshing ID {id}: {str(e)}")
+                    self.progress.mark_failed(id, str(e) or type(e).__name__)
+                else:
+                    self.progress.mark_completed(id)
+                counts[status] += 1
+                pending_records.extend(records)
+                self.logger.info(f"[{done}/{len(ids)}] {id}: {status}")
+                if done % self.upsert_every == 0 and pending_records:
+                    counts['rows_written'] += self.dataset.upsert_aadt(pd.DataFrame(pending_records))
+                    pending_records = []
+
+        if pending_records:
+            counts['rows_written'] += self.dataset.upsert_aadt(pd.DataFrame(pending_records))
+        return counts
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument('dataset', help='Dataset directory (see TCDS_Scraping_Tool.dataset)')
+    parser.add_argument('-f', '--file', help='Only consider the station IDs in this file (default: all stations in the dataset)')
+    parser.add_argument('--latest-year', type=int, help='Newest published AADT year (default: newest year in the dataset)')
+    parser.add_argument('--recheck-days', type=float, default=30, help='Skip stations checked within this many days (default: 30)')
+    parser.add_argument('--all', action='store_true', help='Also check stations that look up to date')
+    parser.add_argument('--limit', type=int, help='Refresh at most this many stations, most urgent first')
+    parser.add_argument('--plan-only', action='store_true', help='Print the refresh plan without scraping')
+    add_rate_arguments(parser)
+    add_cache_arguments(parser)
+
+
+def run(args: argparse.Namespace):
+    setup_logging()
+    logger = logging.getLogger('refresh')
+
+    dataset = AADTDataset(args.dataset)
+    progress = ProgressStore(os.path.join(args.dataset, 'refresh_progress.sqlite'))
+    station_ids = read_ids([], args.file) if args.file else None
+
+    plan = plan_refresh(dataset, station_ids, progress.completed_at(), args.latest_year, args.recheck_days, args.all)
+    if args.limit:
+        plan = plan.head(args.limit)
+    print(f"{len(plan)} stations to refresh: " + ", ".join(f"{count} {reason}" for reason, count in plan['reason'].value_counts().items()))
+    if args.plan_only:
+        print(plan.to_string(index=False, max_rows=50))
+        progress.close()
+        return
+
+    backend = get_backend('http', logger, cache=response_cache(args), rate_controller=rate_controller(args))
+    try:
+        counts = Refresher(dataset, backend, progress, args.concurrency, logger=logger).run(plan)
+    finally:
+        backend.close()
+        progress.close()
+    print(f"Refresh done: {counts['updated']} updated, {counts['unchanged']} unchanged, {counts['empty']} without AADT, {counts['failed']} failed, "
+          f"{counts['rows_written']} AADT rows written")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='Re-scrape the stations of a dataset that may have new AADT')
+    add_arguments(parser)
+    run(parser.parse_args(argv))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Callable, NamedTuple, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    digest TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    stored_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    first_page_digest TEXT
+);
+CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at);
+"""
+
+
+class CacheMiss(Exception):
+    """Raised in offline mode when a response is not in the cache"""
+
+
+class CachedResponse(NamedTuple):
+    body: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    stored_at: float
+    first_page_digest: Optional[str]
+
+
+def cache_key(endpoint: str, agency_id: str, local_id: str, pg: Optional[int] = None, direction: Optional[str] = None) -> str:
+    return json.dumps([endpoint, str(agency_id), local_id, pg, direction])
+
+
+def first_page_key(key: str) -> Optional[str]:
+    """Key of the first page of the same station and direction for a later page, None otherwise"""
+    endpoint, agency_id, local_id, pg, direction = json.loads(key)
+    if not pg or pg <= 1:
+        return None
+    return cache_key(endpoint, agency_id, local_id, 1, direction)
+
+
+class ResponseCache:
+    """
+    On-disk cache of TCDS responses.
+
+    Bodies are stored once per content hash under objects/, and an SQLite index maps each
+    (endpoint, agency_id, local_id, pg, direction) key to its body. Historical AADT rarely
+    changes, so only "current" responses (the first AADT page, which holds the latest year,
+    and station detail pages) expire after `ttl` seconds and are revalidated, with
+    If-None-Match/If-Modified-Since when the server sent validators. Older pages are kept
+    for `history_ttl` seconds (None: until evicted), but only as long as the first page of
+    their station and direction is unchanged: pages list the newest year first, so a new
+    year shifts every row toward later pages (the page count is part of the first page).
+    A later page stored with another first page is revalidated. When the cache grows past
+    `max_bytes` the least recently used responses are evicted; the size is kept as a running
+    total and only summed from the index when it crosses `max_bytes`, since other processes
+    may share the cache. With `offline=True` nothing is fetched and missing responses raise
+    CacheMiss.
+    """
+
+    def __init__(self,
+                 root: str = ".tcds_cache",
+                 ttl: Optional[float] = 24 * 3600,
+                 history_ttl: Optional[float] = None,
+                 max_bytes: Optional[int] = 2 * 1024 ** 3,
+                 offline: bool = False):
+
+        self.root = Path(root)
+        self.objects = self.root / "objects"
+        self.objects.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.history_ttl = history_ttl
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.root / "index.sqlite"), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(responses)")}
+        if 'first_page_digest' not in columns:
+            # Caches written before later pages were tied to their first page are revalidated
+            self.conn.execute("ALTER TABLE responses ADD COLUMN first_page_digest TEXT")
+            self.conn.commit()
+        self.total_bytes = self.stored_bytes()
+
+    def object_path(self, digest: str) -> Path:
+        return self.objects / digest[:2] / digest
+
+    def stored_bytes(self) -> int:
+        """Size of the bodies in the index, each shared body counted once"""
+        return self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT digest, size FROM responses)").fetchone()[0]
+
+    def _release(self, digest: str, size: int):
+        """Delete a body no key refers to any more. Call with the lock held."""
+        if not self.conn.execute("SELECT 1 FROM responses WHERE digest = ? LIMIT 1", (digest,)).fetchone():
+            self.object_path(digest).unlink(missing_ok=True)
+            self.total_bytes -= size
+
+    def first_page_digest(self, key: str) -> Optional[str]:
+        """Digest of the cached first page that a later page `key` belongs to, None if there is none"""
+        first_key = first_page_key(key)
+        if first_key is None:
+            return None
+        with self._lock:
+            row = self.conn.execute("SELECT digest FROM responses WHERE key = ?", (first_key,)).fetchone()
+        return row[0] if row else None
+
+    def lookup(self, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT digest, size, etag, last_modified, stored_at, first_page_digest FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            digest, size, etag, last_modified, stored_at, first_page_digest = row
+            path = self.object_path(digest)
+            if not path.exists():
+                with self.conn:
+                    self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._release(digest, size)
+                return None
+            with self.conn:
+                self.conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        return CachedResponse(path.read_text(encoding='utf-8'), etag, last_modified, stored_at, first_page_digest)
+
+    def store(self, key: str, body: str, etag: Optional[str] = None, last_modified: Optional[str] = None):
+        data = body.encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.object_path(digest)
+        if not path.exists():
+            path.parent.mkdir(exist_ok=True)
+            tmp_path = path.with_name(f"{digest}.tmp{os.getpid()}.{threading.get_ident()}")
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, path)
+        first_page_digest = self.first_page_digest(key)
+        now = time.time()
+        with self._lock, self.conn:
+            previous = self.conn.execute("SELECT digest, size FROM responses WHERE key = ?", (key,)).fetchone()
+            if not self.conn.execute("SELECT 1 FROM responses WHERE digest = ? LIMIT 1", (digest,)).fetchone():
+                self.total_bytes += len(data)
+            self.conn.execute(
+                "INSERT INTO responses (key, digest, size, etag, last_modified, stored_at, accessed_at, first_page_digest) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET digest = excluded.digest, size = excluded.size, etag = excluded.etag, "
+                "last_modified = excluded.last_modified, stored_at = excluded.stored_at, accessed_at = excluded.accessed_at, "
+                "first_page_digest = excluded.first_page_digest",
+                (key, digest, len(data), etag, last_modified, now, now, first_page_digest)
+            )
+            if previous and previous[0] != digest:
+                self._release(*previous)
+        if self.max_bytes and self.total_bytes > self.max_bytes:
+            self.evict()
+
+    def touch(self, key: str):
+        """Mark a revalidated response as fresh again, for the current first page of its station"""
+        first_page_digest = self.first_page_digest(key)
+        now = time.time()
+        with self._lock, self.conn:
+            self.conn.execute("UPDATE responses SET stored_at = ?, accessed_at = ?, first_page_digest = ? WHERE key = ?",
+                              (now, now, first_page_digest, key))
+
+    def is_fresh(self, key: str, entry: CachedResponse, current: bool) -> bool:
+        ttl = self.ttl if current else self.history_ttl
+        if ttl is not None and time.time() - entry.stored_at >= ttl:
+            return False
+        # A later page is only valid next to the cached first page it was fetched with
+        if first_page_key(key) is None:
+            return True
+        return entry.first_page_digest is not None and entry.first_page_digest == self.first_page_digest(key)
+
+    def evict(self):
+        """Drop least recently used responses until the cache fits in max_bytes"""
+        if not self.max_bytes:
+            return
+        with self._lock:
+            # Other processes sharing the cache may have stored or evicted responses
+            self.total_bytes = self.stored_bytes()
+            if self.total_bytes <= self.max_bytes:
+                return
+            rows = self.conn.execute("SELECT key, digest, size FROM responses ORDER BY accessed_at").fetchall()
+            with self.conn:
+                for key, digest, size in rows:
+                    if self.total_bytes <= self.max_bytes:
+                        break
+                    self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._release(digest, size)
+
+    def get_fresh(self, key: str, current: bool = False) -> Optional[str]:
+        """
+        Cached body of `key` if it can be used without fetching, None if it has to be fetched.
+        For callers that fetch with their own client (e.g. a browser) and then call store().
+        """
+        entry = self.lookup(key)
+        if entry is not None and (self.offline or self.is_fresh(key, entry, current)):
+            self.hits += 1
+            return entry.body
+        if self.offline:
+            raise CacheMiss(key)
+        self.misses += 1
+        return None
+
+    def get_or_fetch(self, key: str, fetch: Callable[[dict], Tuple[int, str, dict]], current: bool = False) -> str:
+        """
+        Return the cached body of `key`, calling fetch(conditional_headers) when it is missing or stale
+        Args:
+            fetch: performs the request and returns (status code, body, response headers)
+            current: the response holds the latest data and follows `ttl` instead of `history_ttl`
+        """
+        entry = self.lookup(key)
+        if entry is not None and (self.offline or self.is_fresh(key, entry, current)):
+            self.hits += 1
+            return entry.body
+        if self.offline:
+            raise CacheMiss(key)
+
+        self.misses += 1
+        conditional = {}
+        if entry is not None:
+            if entry.etag:
+                conditional['If-None-Match'] = entry.etag
+            if entry.last_modified:
+                conditional['If-Modified-Since'] = entry.last_modified
+
+        status, body, headers = fetch(conditional)
+        if status == 304 and entry is not None:
+            self.touch(key)
+            return entry.body
+        if 200 <= status < 300:
+            self.store(key, body, headers.get('ETag'), headers.get('Last-Modified'))
+        return body
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,332 @@
+from selenium import webdriver
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException, ElementClickInterceptedException, NoSuchElementException, StaleElementReferenceException, WebDriverException
+import random
+import time
+import logging
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from TCDS_Scraping_Tool.backends import MalformedPage, ScrapeBackend
+from TCDS_Scraping_Tool.metrics import Metrics
+from TCDS_Scraping_Tool.rate_limit import AdaptiveRateController
+from TCDS_Scraping_Tool.pagination import has_data_rows
+
+
+USER_AGENTS = [
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36",
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36"
+]
+
+
+class DriverPool:
+    """
+    Bounded pool of reusable headless Chrome drivers.
+
+    At most `size` drivers exist at once; a caller borrows one with `with pool.driver() as driver:`
+    and owns it until the block exits. A driver is quit and replaced after `max_uses` stations,
+    or straight away if the browser crashed or disconnected. Browser start-ups are timed as
+    'connect' spans.
+    """
+
+    def __init__(self, size: int = 1, max_uses: int = 50, headless: bool = True, metrics: Optional[Metrics] = None):
+        self.size = size
+        self.max_uses = max_uses
+        self.headless = headless
+        self.metrics = metrics if metrics is not None else Metrics()
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._uses = {}
+        self._lock = threading.Lock()
+
+    def create_driver(self):
+        """Setup a chromedriver with the scraping options"""
+        options = webdriver.ChromeOptions()
+        if self.headless:
+            options.add_argument('--headless')
+        options.add_argument('--no-sandbox')
+        options.add_argument('--disable-dev-shm-usage')
+        options.add_argument('--disable-gpu')
+        options.add_argument('--window-size=1920,1080')
+        options.add_argument(f'--user-agent={random.choice(USER_AGENTS)}')
+        return webdriver.Chrome(options=options)
+
+    def is_alive(self, driver) -> bool:
+        try:
+            driver.current_url
+            return True
+        except WebDriverException:
+            return False
+
+    def discard(self, driver):
+        with self._lock:
+            self._uses.pop(driver, None)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    @contextmanager
+    def driver(self):
+        self._slots.acquire()
+        try:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                with self.metrics.span('connect', backend='selenium'):
+                    driver = self.create_driver()
+                with self._lock:
+                    self._uses[driver] = 0
+
+            try:
+                yield driver
+            finally:
+                # scraping swallows most errors, so ask the browser whether it survived
+                crashed = not self.is_alive(driver)
+                with self._lock:
+                    self._uses[driver] += 1
+                    worn_out = self._uses[driver] >= self.max_uses
+                if crashed or worn_out:
+                    self.discard(driver)
+                else:
+                    self._idle.put(driver)
+        finally:
+            self._slots.release()
+
+    def close(self):
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self.discard(driver)
+
+
+AADT_DIV_ID = "TCDS_TDETAIL_AADT_DIV"
+# Year cell of the first data row; it is replaced whenever the AJAX table reloads
+FIRST_YEAR_XPATH = f"//div[@id='{AADT_DIV_ID}']//tr[@class='FormRowLabel'][2]/td[2]"
+NEXT_BUTTON_XPATH = f'//div[@id="{AADT_DIV_ID}"]//input[@type="button" and @value=">" and @name="a_first"]'
+
+
+def first_year_cell(driver):
+    """The first year cell of the AADT table and its text, (None, None) if the table has no rows"""
+    try:
+        cell = driver.find_element(By.XPATH, FIRST_YEAR_XPATH)
+        return cell, cell.text
+    except (NoSuchElementException, StaleElementReferenceException):
+        return None, None
+
+
+def table_replaced(old_cell, old_text):
+    """
+    Expected condition: the AADT table was reloaded since `old_cell` was read,
+    i.e. that cell went stale or the first year cell now shows another year
+    """
+    def condition(driver):
+        if old_cell is not None:
+            try:
+                old_cell.tag_name
+            except StaleElementReferenceException:
+                return True
+        _, text = first_year_cell(driver)
+        return text is not None and text != old_text
+
+    return condition
+
+
+class SeleniumBackend(ScrapeBackend):
+    """
+    Scrape the AADT tables by driving Chrome through the TCDS detail page.
+    Drivers come from a DriverPool, so each concurrent caller works with its own browser.
+    Instead of sleeping a fixed time, every step waits for the page to change (the AADT table
+    appearing or being replaced) for at most `timeout` seconds. Page loads and clicks are
+    paced by the rate controller; a table that doesn't load in time counts as a failure.
+    """
+
+    name = 'selenium'
+
+    def __init__(self,
+                 logger: Optional[logging.Logger] = None,
+                 pool_size: int = 1,
+                 max_uses: int = 50,
+                 timeout: float = 20,
+                 rate_controller: Optional[AdaptiveRateController] = None,
+                 metrics: Optional[Metrics] = None):
+        super().__init__(logger, rate_controller, metrics)
+        self.pool = DriverPool(size=pool_size, max_uses=max_uses, metrics=self.metrics)
+        self.timeout = timeout
+
+    def open_tcds_detail_page(self, driver, id: str):
+        """
+        Open the TCDS detail page and wait until its AADT table is loaded.
+        Args:
+            driver: the WebDriver to use
+            id: station ID
+        """
+        self.throttle()
+        started = time.monotonic()
+        try:
+            with self.metrics.span('fetch', backend=self.name, page=1, direction=None):
+                driver.get(
+                    f'https://txdot.public.ms2soft.com/tcds/tsearch.asp?loc=Txdot&mod=tcds&local_id={id}'
+                    )
+                WebDriverWait(driver, self.timeout).until(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, f"#{AADT_DIV_ID} table#tblTable4"))
+                )
+            self.metrics.count('requests')
+            self.report_success(time.monotonic() - started)
+        except TimeoutException:
+            self.logger.warning(f"AADT table of station {id} did not load within {self.timeout} seconds")
+            self.report_failure()
+
+        return
+
+    def check_dir(self, driver):
+        """
+        Check if there are multiple directions in AADT page.
+        If it is only two-way, proceed with just one scraping process.
+        If there are different directions, after finishing the two-way, scrape each direction.
+
+        Returns:
+            A list of available directions ["NB", "SB"] or None for "two-way" only
+        """
+
+        # One-way or Two-way X-Path: //*[@id="DIR_BUTTONS_DIV"]/span/div[2]/input
+        input_elements = driver.find_elements(By.XPATH, "//div[@id='DIR_BUTTONS_DIV']//input")
+        values = [element.get_attribute('value') for element in input_elements if element.get_attribute('value') in ["NB", "SB", "EB", "WB"]]
+        return values
+
+    def click_dir_button(self, driver, dir: str, timeout = None):
+        timeout = timeout or self.timeout
+        xpath = f"//div[@id='DIR_BUTTONS_DIV']//input[@value='{dir}']"
+        self.logger.debug(f"Getting Direction {dir} direction")
+
+        def direction_selected(driver):
+            # The clicked direction button is disabled with onClick "javascript:void(0)" once its table is shown
+            try:
+                element = driver.find_element(By.XPATH, xpath)
+                return element.get_attribute('onclick') == "javascript:void(0)"
+            except (NoSuchElementException, StaleElementReferenceException):
+                return False
+
+        try:
+            old_cell, old_text = first_year_cell(driver)
+            element = WebDriverWait(driver, timeout).until(EC.element_to_be_clickable((By.XPATH, xpath)))
+            self.throttle()
+            started = time.monotonic()
+            with self.metrics.span('direction', backend=self.name, direction=dir):
+                element.click()
+
+                # Webpage will refresh: wait for the new table, then for the button to show as selected
+                WebDriverWait(driver, timeout).until(table_replaced(old_cell, old_text))
+                self.report_success(time.monotonic() - started)
+                WebDriverWait(driver, timeout).until(direction_selected)
+            self.metrics.count('requests')
+            self.logger.debug(f"'{dir}' has been clicked")
+            return True
+
+        except NoSuchElementException:
+            self.logger.warning(f"Element with direction value of '{dir}' not found")
+        except TimeoutException:
+            self.logger.warning(f"Direction '{dir}' table did not load within {timeout} seconds")
+            self.report_failure()
+
+        return False
+
+
+    def scrape_aadt_pages(self, driver, tablediv_xpath = ".//tr[@class='FormRowLabel']/following-sibling::tr", timeout=None, direction=None):
+        """
+        Collect the AADT table HTML page by page; parsing is left to aadt_parser so the
+        browser is only held for navigation. After clicking the next button, the next page
+        is read as soon as the table has been replaced.
+        Args:
+            direction: direction shown, only used to label the fetch spans
+        Returns:
+            List of the TCDS_TDETAIL_AADT_DIV HTML of each page
+        """
+        timeout = timeout or self.timeout
+        pages = []
+
+        while True:
+            try:
+                # Wait for table to be present and visible
+                table_div = WebDriverWait(driver, timeout).until(
+                    EC.visibility_of_element_located((By.ID, AADT_DIV_ID))
+                )
+
+                # Get the data from current page
+                WebDriverWait(driver,timeout).until(
+                    EC.visibility_of_all_elements_located((By.XPATH, tablediv_xpath))
+                    )
+                pages.append(table_div.get_attribute('outerHTML'))
+                self.metrics.count('bytes_fetched', len(pages[-1]))
+                old_cell, old_text = first_year_cell(driver)
+
+                # Find and click next button
+                try:
+                    button = WebDriverWait(driver, timeout).until(
+                        EC.presence_of_element_located((By.XPATH, NEXT_BUTTON_XPATH))
+                    )
+
+                    if not button.is_enabled():
+                        self.logger.debug("Reached last page")
+                        break
+
+                    self.throttle()
+                    started = time.monotonic()
+                    button.click()
+
+                except TimeoutException as e:
+                    self.logger.info("Next page button not found, might be the only AADT page")
+                    return pages
+
+                except Exception as e:
+                    self.logger.warning(f"Error occurred: {e}. Exporting AADT data fetched so far.")
+                    return pages
+
+                # Don't read the next page before the table has actually changed
+                try:
+                    with self.metrics.span('fetch', backend=self.name, page=len(pages) + 1, direction=direction):
+                        WebDriverWait(driver, timeout).until(table_replaced(old_cell, old_text))
+                except TimeoutException:
+                    self.report_failure()
+                    raise
+                self.metrics.count('requests')
+                self.report_success(time.monotonic() - started)
+
+            except TimeoutException as e:
+                self.logger.warning("Timeout waiting for elements")
+                break
+            except Exception as e:
+                self.logger.error(f"Error occurred: {e}")
+                break
+
+        return pages
+
+    def fetch_pages(self, id: str, first_page: Optional[str] = None) -> Dict[Optional[str], List[str]]:
+        # Pages are read from the browser, fetch_first_page is not supported
+        with self.pool.driver() as driver:
+            self.open_tcds_detail_page(driver, id)
+            pages = self.scrape_aadt_pages(driver)
+            if not pages:
+                raise MalformedPage(f"AADT table of station {id} did not load")
+            if not has_data_rows(pages[0]):
+                return {}
+            results = {None: pages}
+
+            directions = self.check_dir(driver)
+            for dir in directions:
+                #click direction function
+                if self.click_dir_button(driver, dir):
+                    results[dir] = self.scrape_aadt_pages(driver, direction=dir)
+                else:
+                    self.logger.info(f"Failed to retrieve Station {id} directional information")
+            return results
+
+    def close(self):
+        self.pool.close()
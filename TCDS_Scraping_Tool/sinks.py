@@ -0,0 +1,204 @@
+import csv
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Callable, Iterable, List, Optional
+
+from TCDS_Scraping_Tool.aadt_parser import AADT_COLUMNS, AADT_TYPES
+
+AADT_FIELDS = ['station_id', 'direction'] + AADT_COLUMNS
+
+
+class RecordSink:
+    """
+    Buffered writer for flat AADT records (dictionaries).
+
+    Records are kept in memory and written every `flush_every` records, on flush() and on close().
+    With `max_bytes` set, output rotates to a new numbered part once a part reaches that size:
+    output.jsonl -> output.00000.jsonl, output.00001.jsonl, ...
+    `on_flush` is called after each flush, once the buffered records are in the file.
+    """
+
+    suffix = ''
+
+    def __init__(self,
+                 path: str,
+                 fields: List[str] = AADT_FIELDS,
+                 flush_every: int = 500,
+                 max_bytes: Optional[int] = None,
+                 on_flush: Optional[Callable[[], None]] = None):
+
+        self.path = Path(path)
+        self.fields = fields
+        self.flush_every = flush_every
+        self.max_bytes = max_bytes
+        self.on_flush = on_flush
+        self.buffer = []
+        self.part = 0
+        self._lock = threading.RLock()
+        if max_bytes:
+            # Continue after the parts written by earlier runs
+            while self.part_path(self.part).exists() and self.part_path(self.part).stat().st_size >= max_bytes:
+                self.part += 1
+
+    def part_path(self, part: int) -> Path:
+        if not self.max_bytes:
+            return self.path
+        return self.path.with_name(f"{self.path.stem}.{part:05d}{self.path.suffix}")
+
+    @property
+    def current_path(self) -> Path:
+        return self.part_path(self.part)
+
+    def write(self, record: dict):
+        self.write_many([record])
+
+    def write_many(self, records: Iterable[dict]):
+        with self._lock:
+            self.buffer.extend(records)
+            if len(self.buffer) >= self.flush_every:
+                self.flush()
+
+    def flush(self):
+        with self._lock:
+            if self.buffer:
+                records, self.buffer = self.buffer, []
+                self.write_records(records)
+                if self.max_bytes and self.current_size() >= self.max_bytes:
+                    self.rotate()
+            if self.on_flush:
+                self.on_flush()
+
+    def current_size(self) -> int:
+        path = self.current_path
+        return path.stat().st_size if path.exists() else 0
+
+    def rotate(self):
+        self.close_file()
+        self.part += 1
+
+    def write_records(self, records: List[dict]):
+        raise NotImplementedError
+
+    def close_file(self):
+        pass
+
+    def close(self):
+        with self._lock:
+            self.flush()
+            self.close_file()
+
+
+class JsonlSink(RecordSink):
+    """One JSON object per line"""
+
+    suffix = '.jsonl'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.file = None
+
+    def write_records(self, records: List[dict]):
+        if self.file is None:
+            self.file = open(self.current_path, 'a', encoding='utf-8')
+        self.file.write(''.join(json.dumps(record) + '\n' for record in records))
+        self.file.flush()
+
+    def close_file(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class CsvSink(RecordSink):
+    """CSV with a header row and `fields` as columns; other record keys are dropped"""
+
+    suffix = '.csv'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.file = None
+        self.writer = None
+
+    def write_records(self, records: List[dict]):
+        if self.file is None:
+            path = self.current_path
+            is_new = not path.exists() or path.stat().st_size == 0
+            self.file = open(path, 'a', newline='', encoding='utf-8')
+            self.writer = csv.DictWriter(self.file, fieldnames=self.fields, extrasaction='ignore')
+            if is_new:
+                self.writer.writeheader()
+        self.writer.writerows(records)
+        self.file.flush()
+
+    def close_file(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+            self.writer = None
+
+
+class ParquetSink(RecordSink):
+    """
+    Parquet with one row group per flush; requires pyarrow.
+    Parquet files can't be appended to, so every run starts a new part after existing ones.
+    AADT columns get their parsed types, any other column is written as a string.
+    """
+
+    suffix = '.parquet'
+
+    def __init__(self, path: str, *args, **kwargs):
+        import pyarrow as pa
+
+        super().__init__(path, *args, **kwargs)
+        arrow_types = {int: pa.int64(), float: pa.float64(), str: pa.string()}
+        self.types = {field: AADT_TYPES.get(field, str) for field in self.fields}
+        self.schema = pa.schema([(field, arrow_types[self.types[field]]) for field in self.fields])
+        self.writer = None
+        self.written_bytes = 0
+        if self.max_bytes is None:
+            self.max_bytes = 1 << 40  # always use numbered parts so runs don't overwrite each other
+        while self.current_path.exists():
+            self.part += 1
+
+    def write_records(self, records: List[dict]):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(str(self.current_path), self.schema)
+            self.written_bytes = 0
+        columns = {
+            field: [None if record.get(field) is None else self.types[field](record.get(field)) for record in records]
+            for field in self.fields
+        }
+        table = pa.table(columns, schema=self.schema)
+        self.writer.write_table(table)
+        self.written_bytes += table.nbytes
+
+    def current_size(self) -> int:
+        return self.written_bytes
+
+    def close_file(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+
+SINKS = {sink.suffix: sink for sink in (JsonlSink, CsvSink, ParquetSink)}
+
+
+def output_files(path: str) -> List[Path]:
+    """Existing files written by a sink opened on `path`: the file itself and its numbered parts"""
+    path = Path(path)
+    parts = sorted(path.parent.glob(f"{path.stem}.[0-9][0-9][0-9][0-9][0-9]{path.suffix}"))
+    return ([path] if path.exists() else []) + parts
+
+
+def open_sink(path: str, **kwargs) -> RecordSink:
+    """Create the sink matching the file extension of `path` (.jsonl, .csv or .parquet)"""
+    suffix = os.path.splitext(path)[1].lower()
+    if suffix not in SINKS:
+        raise ValueError(f"Unsupported output format: {path} (use .jsonl, .csv or .parquet)")
+    return SINKS[suffix](path, **kwargs)
@@ -0,0 +1,129 @@
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+from TCDS_Scraping_Tool.aadt_parser import TWO_WAY, parse_aadt_pages
+from TCDS_Scraping_Tool.sinks import RecordSink, open_sink
+
+PARSED_SUFFIX = '.parsed'
+
+
+class Spool:
+    """
+    Directory of raw AADT responses, one JSON file per station and direction:
+        {root}/{station_id}/{direction}.json -> {"station_id", "direction", "fetched", "pages": [html, ...]}
+    Files are written to a temporary name and renamed, so readers never see a partial file.
+    Once its records are in an output file, a file is renamed to {direction}.json.parsed, so
+    an interrupted run or the offline parser only parses what is left.
+    """
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def path(self, station_id: str, direction: str) -> Path:
+        return self.root / station_id / f"{direction}.json"
+
+    def write(self, station_id: str, direction: Optional[str], pages: List[str]) -> Path:
+        direction = direction or TWO_WAY
+        path = self.path(station_id, direction)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".tmp{os.getpid()}")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'station_id': station_id,
+                'direction': direction,
+                'fetched': datetime.now().isoformat(),
+                'pages': pages,
+            }, f)
+        os.replace(tmp_path, path)
+        return path
+
+    def write_station(self, station_id: str, pages: Dict[Optional[str], List[str]]) -> List[Path]:
+        """Spool every direction returned by ScrapeBackend.fetch_pages"""
+        return [self.write(station_id, dir, dir_pages) for dir, dir_pages in pages.items()]
+
+    def files(self, parsed: bool = False) -> List[Path]:
+        """Spool files not parsed yet; with parsed=True, also those already parsed"""
+        files = list(self.root.glob('*/*.json'))
+        if parsed:
+            files += self.root.glob(f'*/*.json{PARSED_SUFFIX}')
+        return sorted(files)
+
+    def mark_parsed(self, paths: Iterable):
+        """Mark spool files whose records have been written out, so they are not parsed again"""
+        for path in paths:
+            path = Path(path)
+            if path.suffix == '.json':
+                os.replace(path, path.with_name(path.name + PARSED_SUFFIX))
+
+
+def parse_spool_file(path) -> List[dict]:
+    """Output records of one spooled station direction; runs in the worker processes"""
+    with open(path, 'r', encoding='utf-8') as f:
+        entry = json.load(f)
+    return [
+        {'station_id': entry['station_id'], 'direction': entry['direction'], **row}
+        for row in parse_aadt_pages(entry['pages'])
+    ]
+
+
+def parse_spool_files(paths: List[str]) -> List[dict]:
+    """Output records of the spooled directions of one station; runs in the worker processes"""
+    return [record for path in paths for record in parse_spool_file(path)]
+
+
+def parse_spool(paths: Iterable, sink: RecordSink, processes: Optional[int] = None, chunksize: int = 16,
+                on_written: Optional[Callable[[str], None]] = None) -> int:
+    """
+    Parse spooled responses across a process pool and write the records to the sink
+    Args:
+        paths: spool files to parse
+        processes: number of parser processes (default: number of CPUs)
+        on_written: called with each file once its records have been handed to the sink
+    Returns:
+        Number of records written
+    """
+    paths = [str(path) for path in paths]
+    written = 0
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        for path, records in zip(paths, executor.map(parse_spool_file, paths, chunksize=chunksize)):
+            sink.write_many(records)
+            written += len(records)
+            if on_written:
+                on_written(path)
+    sink.flush()
+    return written
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='Parse spooled TCDS AADT responses offline')
+    parser.add_argument('spool', help='Spool directory written by aadt_scraping --spool')
+    parser.add_argument('-o', '--output', default='output.jsonl', help='Output file, .jsonl, .csv or .parquet (default: output.jsonl)')
+    parser.add_argument('-p', '--processes', type=int, help='Number of parser processes (default: number of CPUs)')
+    parser.add_argument('--all', action='store_true', help='Also parse the files already parsed, e.g. into a new output file')
+    args = parser.parse_args(argv)
+
+    spool = Spool(args.spool)
+    files = spool.files(parsed=args.all)
+    # Files are marked parsed once their records are flushed, so a rerun after a crash doesn't repeat them
+    written_files = []
+
+    def mark_flushed():
+        spool.mark_parsed(written_files)
+        written_files.clear()
+
+    sink = open_sink(args.output, on_flush=mark_flushed)
+    try:
+        written = parse_spool(files, sink, args.processes, on_written=written_files.append)
+    finally:
+        sink.close()
+    print(f"Parsed {len(files)} spool files into {written} records in {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+import argparse
+import glob
+import os
+import time
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from TCDS_Scraping_Tool.aadt_parser import TWO_WAY
+from TCDS_Scraping_Tool.dataset import AADT_KEY, AADTDataset, read_aadt_records, typed_aadt
+
+# Issue types of validate_aadt
+INVALID = 'invalid_value'       # AADT missing or not positive, K/D percent outside 0-100
+DIRECTION_SUM = 'direction_sum'  # directional AADT don't add up to the two-way AADT of the year
+YOY_CHANGE = 'yoy_change'        # AADT changed more than max_change since the previous year
+ISSUE_COLUMNS = ['station_id', 'direction', 'year', 'issue', 'aadt', 'expected', 'deviation']
+
+
+def drop_direction_copies(records: pd.DataFrame) -> Tuple[pd.DataFrame, int]:
+    """
+    Drop directional tables that repeat the two-way table of their station year for year
+    (what the site serves for a direction without counts of its own)
+    Returns:
+        (records, number of rows dropped)
+    """
+    two_way = records.loc[records['direction'] == TWO_WAY, ['station_id', 'year', 'aadt']]
+    directional = records.loc[records['direction'] != TWO_WAY, ['station_id', 'direction', 'year', 'aadt']]
+    if two_way.empty or directional.empty:
+        return records, 0
+    matched = directional.merge(two_way, on=['station_id', 'year'], how='left', suffixes=('', '_two_way'))
+    matched['same'] = (matched['aadt'] == matched['aadt_two_way']).fillna(False).astype(bool)
+    tables = matched.groupby(['station_id', 'direction'], sort=False).agg(rows=('same', 'size'), same=('same', 'sum'))
+    two_way_rows = two_way.groupby('station_id').size().rename('two_way_rows')
+    tables = tables.join(two_way_rows, on='station_id')
+    copies = tables.index[(tables['same'] == tables['rows']) & (tables['rows'] == tables['two_way_rows'])]
+    if copies.empty:
+        return records, 0
+    is_copy = pd.MultiIndex.from_frame(records[['station_id', 'direction']]).isin(copies)
+    return records[~is_copy].reset_index(drop=True), int(is_copy.sum())
+
+
+def normalize_aadt(records: pd.DataFrame) -> Tuple[pd.DataFrame, dict]:
+    """
+    Typed AADT records with one row per station, direction and year. Of rows repeated across
+    pages the first is kept (scrapers emit the newest page first), and directional copies of
+    the two-way table are dropped.
+    Returns:
+        (records, {'rows': ..., 'duplicates': ..., 'direction_copies': ...})
+    """
+    rows = len(records)
+    records = typed_aadt(records)
+    records['direction'] = records['direction'].fillna(TWO_WAY)
+    unique = records.drop_duplicates(AADT_KEY, keep='first')
+    duplicates = len(records) - len(unique)
+    unique, copies = drop_direction_copies(unique.reset_index(drop=True))
+    unique = unique.sort_values(AADT_KEY, kind='stable').reset_index(drop=True)
+    return unique, {'rows': rows, 'duplicates': duplicates, 'direction_copies': copies}
+
+
+def invalid_values(records: pd.DataFrame) -> pd.DataFrame:
+    aadt = records['aadt']
+    percents = records[['k_percent', 'd_percent']]
+    invalid = (aadt.isna() | (aadt <= 0) | ((percents < 0) | (percents > 100)).any(axis=1)).fillna(False).astype(bool)
+    return records.loc[invalid, ['station_id', 'direction', 'year', 'aadt']].assign(issue=INVALID)
+
+
+def direction_sums(records: pd.DataFrame, tolerance: float = 0.1) -> pd.DataFrame:
+    """
+    Years in which at least two directional AADT of a station are known and their sum differs
+    from the two-way AADT by more than `tolerance` (a share of the two-way AADT)
+    """
+    directional = records[(records['direction'] != TWO_WAY) & records['aadt'].notna()]
+    sums = directional.groupby(['station_id', 'year']).agg(expected=('aadt', 'sum'), directions=('aadt', 'size'))
+    sums = sums[sums['directions'] >= 2].reset_index()
+    two_way = records.loc[(records['direction'] == TWO_WAY) & records['aadt'].notna(), ['station_id', 'direction', 'year', 'aadt']]
+    checked = two_way.merge(sums, on=['station_id', 'year'])
+    checked['deviation'] = (checked['expected'] - checked['aadt']) / checked['aadt']
+    mismatch = (checked['deviation'].abs() > tolerance).fillna(False).astype(bool)
+    return checked.loc[mismatch, ['station_id', 'direction', 'year', 'aadt', 'expected', 'deviation']].assign(issue=DIRECTION_SUM)
+
+
+def yoy_changes(records: pd.DataFrame, max_change: float = 1.0) -> pd.DataFrame:
+    """
+    Rows whose AADT grew by more than `max_change` (1.0: doubled) or shrank by the same factor
+    (halved) since the previous year with an AADT of the same station and direction
+    """
+    counted = records[records['aadt'].notna() & (records['aadt'] > 0)].sort_values(AADT_KEY)
+    previous = counted.groupby(['station_id', 'direction'], sort=False)['aadt'].shift()
+    current = counted['aadt'].astype('float64').to_numpy()
+    previous = previous.astype('float64').to_numpy()
+    with np.errstate(invalid='ignore'):
+        outlier = np.abs(np.log(current / previous)) > np.log1p(max_change)
+    flagged = counted.loc[outlier, ['station_id', 'direction', 'year', 'aadt']]
+    expected = previous[outlier]
+    return flagged.assign(expected=expected, deviation=(flagged['aadt'].to_numpy() - expected) / expected, issue=YOY_CHANGE)
+
+
+def validate_aadt(records: pd.DataFrame, tolerance: float = 0.1, max_change: float = 1.0) -> pd.DataFrame:
+    """
+    Check normalized AADT records (see normalize_aadt)
+    Returns:
+        One row per issue: station_id, direction, year, issue, aadt, expected (sum of the
+        directions, or the previous year's AADT) and deviation (relative to aadt or expected)
+    """
+    issues = pd.concat(
+        [invalid_values(records), direction_sums(records, tolerance), yoy_changes(records, max_change)],
+        ignore_index=True,
+    )
+    return issues.reindex(columns=ISSUE_COLUMNS).sort_values(['station_id', 'direction', 'year'], kind='stable').reset_index(drop=True)
+
+
+def write_table(df: pd.DataFrame, path: str):
+    tmp_path = f"{path}.tmp"
+    if path.endswith('.parquet'):
+        df.to_parquet(tmp_path, index=False)
+    else:
+        df.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='Normalize and check AADT records of scraper outputs or a dataset')
+    parser.add_argument('--dataset', help='Dataset directory (see TCDS_Scraping_Tool.dataset)')
+    parser.add_argument('--district', help='With --dataset, only this district partition')
+    parser.add_argument('--aadt', nargs='*', default=[], help='AADT files: BatchScrapper output (.jsonl/.csv/.parquet) or historical_aadt_{id}.csv')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='Allowed difference of the directional sum from the two-way AADT (default: 0.1)')
+    parser.add_argument('--max-change', type=float, default=1.0, help='Year-over-year change flagged as an outlier, 1.0 = doubled or halved (default: 1.0)')
+    parser.add_argument('--report', help='Write the issues to this file (.csv or .parquet)')
+    parser.add_argument('--clean', help='Write the normalized records to this file (.csv or .parquet)')
+    args = parser.parse_args(argv)
+    if not (args.dataset or args.aadt):
+        parser.error('one of the arguments --dataset --aadt is required')
+
+    frames = []
+    if args.dataset:
+        filters = {'district': args.district} if args.district else {}
+        frames.append(AADTDataset(args.dataset).read_aadt(**filters))
+    files = [path for pattern in args.aadt for path in sorted(glob.glob(pattern)) or [pattern]]
+    frames += [read_aadt_records(path) for path in files]
+
+    start = time.perf_counter()
+    records, counts = normalize_aadt(pd.concat(frames, ignore_index=True))
+    issues = validate_aadt(records, args.tolerance, args.max_change)
+    seconds = time.perf_counter() - start
+
+    print(f"{counts['rows']} rows: {counts['duplicates']} duplicate years and {counts['direction_copies']} "
+          f"directional copies of two-way tables dropped, {len(records)} left ({counts['rows'] / max(seconds, 1e-9):,.0f} rows/sec)")
+    for issue, count in issues['issue'].value_counts().sort_index().items():
+        print(f"  {issue}: {count}")
+    if args.report:
+        write_table(issues, args.report)
+        print(f"Wrote {len(issues)} issues to {args.report}")
+    if args.clean:
+        write_table(records, args.clean)
+        print(f"Wrote {len(records)} records to {args.clean}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+import argparse
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunks (
+    chunk_id INTEGER PRIMARY KEY,
+    status TEXT NOT NULL,
+    worker TEXT,
+    lease_until REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    updated TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS chunk_ids (
+    id TEXT PRIMARY KEY,
+    chunk_id INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    worker TEXT,
+    reason TEXT,
+    updated TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS chunk_ids_chunk ON chunk_ids (chunk_id);
+CREATE TABLE IF NOT EXISTS workers (
+    worker TEXT PRIMARY KEY,
+    output TEXT,
+    started TEXT NOT NULL,
+    heartbeat TEXT NOT NULL
+);
+"""
+
+# Chunk and ID statuses
+PENDING = 'pending'
+LEASED = 'leased'
+DONE = 'done'
+FAILED = 'failed'
+COMPLETED = 'completed'
+
+
+def worker_name() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def worker_output_path(output_file: str, worker: str) -> str:
+    """Output file of one worker: output.jsonl -> output.{worker}.jsonl"""
+    root, suffix = os.path.splitext(output_file)
+    return f"{root}.{worker}{suffix}"
+
+
+class Chunk:
+    def __init__(self, chunk_id: int, ids: List[str], attempts: int):
+        self.chunk_id = chunk_id
+        self.ids = ids
+        self.attempts = attempts
+
+
+class WorkQueue:
+    """
+    Lease-based queue of station IDs in one SQLite file, shared by scrapers on several nodes.
+
+    IDs are added in chunks. A worker claims a pending chunk, or one whose lease expired,
+    and owns it for `lease_seconds`; keep_lease() renews the lease on a background thread
+    while the chunk is processed. When a worker crashes its heartbeats stop, the lease
+    expires and the next claim hands the chunk to another worker; a chunk claimed
+    `max_attempts` times without finishing is marked failed. Per-ID outcomes are recorded
+    by finish_chunk(), and workers register their output file so merge_outputs() can
+    combine them.
+
+    Every write is a short IMMEDIATE transaction with the default rollback journal, which
+    works on shared storage with working POSIX file locks (not WAL, which needs shared memory).
+    """
+
+    def __init__(self, path: str, lease_seconds: float = 300, max_attempts: int = 5):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+
+    @contextmanager
+    def transaction(self):
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self.conn
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+
+    def add_ids(self, ids: Iterable[str], chunk_size: int = 25) -> int:
+        """
+        Queue IDs that aren't in the queue yet, in chunks of `chunk_size`
+        Returns:
+            Number of IDs added
+        """
+        now = datetime.now().isoformat()
+        with self.transaction() as conn:
+            known = {row[0] for row in conn.execute("SELECT id FROM chunk_ids")}
+            new_ids = [id for id in dict.fromkeys(ids) if id not in known]
+            next_chunk = (conn.execute("SELECT MAX(chunk_id) FROM chunks").fetchone()[0] or 0) + 1
+            for start in range(0, len(new_ids), chunk_size):
+                chunk_id = next_chunk + start // chunk_size
+                conn.execute("INSERT INTO chunks (chunk_id, status, updated) VALUES (?, ?, ?)", (chunk_id, PENDING, now))
+                conn.executemany(
+                    "INSERT INTO chunk_ids (id, chunk_id, status, updated) VALUES (?, ?, ?, ?)",
+                    ((id, chunk_id, PENDING, now) for id in new_ids[start:start + chunk_size])
+                )
+        return len(new_ids)
+
+    def register(self, worker: str, output: Optional[str] = None):
+        now = datetime.now().isoformat()
+        with self.transaction() as conn:
+            conn.execute(
+                "INSERT INTO workers (worker, output, started, heartbeat) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(worker) DO UPDATE SET output = excluded.output, heartbeat = excluded.heartbeat",
+                (worker, output, now, now)
+            )
+
+    def claim(self, worker: str, wait: bool = False, poll: float = 10) -> Optional[Chunk]:
+        """
+        Lease the next pending or expired chunk to `worker`
+        Args:
+            wait: while other workers hold leases, wait (checking every `poll` seconds at most)
+                  until they finish or their lease expires instead of returning None
+        Returns:
+            The chunk with its unfinished IDs, None when no chunk is available
+        """
+        while True:
+            now = time.time()
+            delay = None
+            with self.transaction() as conn:
+                row = conn.execute(
+                    "SELECT chunk_id, attempts FROM chunks WHERE status = ? OR (status = ? AND lease_until < ?) "
+                    "ORDER BY chunk_id LIMIT 1",
+                    (PENDING, LEASED, now)
+                ).fetchone()
+                if row is None:
+                    next_expiry = conn.execute("SELECT MIN(lease_until) FROM chunks WHERE status = ?", (LEASED,)).fetchone()[0]
+                    if not wait or next_expiry is None:
+                        return None
+                    delay = min(max(next_expiry - now, 0.1), poll)
+                else:
+                    chunk_id, attempts = row
+                    if attempts >= self.max_attempts:
+                        # Every worker that took this chunk died or lost it: stop handing it out
+                        conn.execute("UPDATE chunks SET status = ?, worker = NULL, updated = ? WHERE chunk_id = ?",
+                                     (FAILED, datetime.now().isoformat(), chunk_id))
+                        continue
+                    conn.execute(
+                        "UPDATE chunks SET status = ?, worker = ?, lease_until = ?, attempts = attempts + 1, updated = ? WHERE chunk_id = ?",
+                        (LEASED, worker, now + self.lease_seconds, datetime.now().isoformat(), chunk_id)
+                    )
+                    ids = [id for id, in conn.execute(
+                        "SELECT id FROM chunk_ids WHERE chunk_id = ? AND status = ? ORDER BY rowid", (chunk_id, PENDING)
+                    )]
+                    return Chunk(chunk_id, ids, attempts + 1)
+            time.sleep(delay)
+
+    def heartbeat(self, worker: str, chunk_id: int) -> bool:
+        """
+        Extend the worker's lease on a chunk
+        Returns:
+            False if the lease was lost (it expired and another worker claimed the chunk)
+        """
+        with self.transaction() as conn:
+            renewed = conn.execute(
+                "UPDATE chunks SET lease_until = ? WHERE chunk_id = ? AND worker = ? AND status = ?",
+                (time.time() + self.lease_seconds, chunk_id, worker, LEASED)
+            ).rowcount
+            conn.execute("UPDATE workers SET heartbeat = ? WHERE worker = ?", (datetime.now().isoformat(), worker))
+        return bool(renewed)
+
+    @contextmanager
+    def keep_lease(self, worker: str, chunk_id: int, interval: Optional[float] = None):
+        """Renew the lease every `interval` seconds (default: a third of the lease) while the block runs"""
+        interval = interval or self.lease_seconds / 3
+        stop = threading.Event()
+
+        def renew():
+            while not stop.wait(interval):
+                if not self.heartbeat(worker, chunk_id):
+                    return
+
+        thread = threading.Thread(target=renew, name=f'lease-{chunk_id}', daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            thread.join()
+
+    def finish_chunk(self, worker: str, chunk_id: int, completed: Iterable[str] = (),
+                     failed: Optional[Dict[str, str]] = None) -> bool:
+        """
+        Record the outcome of a chunk's IDs and release it. IDs without an outcome send the
+        chunk back to the queue.
+        Args:
+            failed: {id: reason}
+        Returns:
+            False if the worker no longer held the lease; the outcomes are recorded anyway
+        """
+        now = datetime.now().isoformat()
+        with self.transaction() as conn:
+            conn.executemany(
+                "UPDATE chunk_ids SET status = ?, worker = ?, reason = NULL, updated = ? WHERE id = ? AND chunk_id = ?",
+                ((COMPLETED, worker, now, id, chunk_id) for id in completed)
+            )
+            conn.executemany(
+                "UPDATE chunk_ids SET status = ?, worker = ?, reason = ?, updated = ? WHERE id = ? AND chunk_id = ? AND status != ?",
+                ((FAILED, worker, reason, now, id, chunk_id, COMPLETED) for id, reason in (failed or {}).items())
+            )
+            unfinished = conn.execute("SELECT COUNT(*) FROM chunk_ids WHERE chunk_id = ? AND status = ?",
+                                      (chunk_id, PENDING)).fetchone()[0]
+            return bool(conn.execute(
+                "UPDATE chunks SET status = ?, worker = NULL, lease_until = NULL, updated = ? WHERE chunk_id = ? AND worker = ?",
+                (PENDING if unfinished else DONE, now, chunk_id, worker)
+            ).rowcount)
+
+    def release_worker(self, worker: str) -> int:
+        """Give back every chunk leased by `worker`, e.g. when it is stopped"""
+        with self.transaction() as conn:
+            return conn.execute(
+                "UPDATE chunks SET status = ?, worker = NULL, lease_until = NULL, updated = ? WHERE worker = ? AND status = ?",
+                (PENDING, datetime.now().isoformat(), worker, LEASED)
+            ).rowcount
+
+    def requeue_failed(self) -> int:
+        """Queue failed IDs (and chunks given up on) again"""
+        now = datetime.now().isoformat()
+        with self.transaction() as conn:
+            chunks = {chunk_id for chunk_id, in conn.execute("SELECT DISTINCT chunk_id FROM chunk_ids WHERE status = ?", (FAILED,))}
+            chunks |= {chunk_id for chunk_id, in conn.execute("SELECT chunk_id FROM chunks WHERE status = ?", (FAILED,))}
+            ids = conn.execute("UPDATE chunk_ids SET status = ?, reason = NULL, updated = ? WHERE status = ?", (PENDING, now, FAILED)).rowcount
+            conn.executemany("UPDATE chunks SET status = ?, attempts = 0, updated = ? WHERE chunk_id = ? AND status != ?",
+                             ((PENDING, now, chunk_id, LEASED) for chunk_id in chunks))
+        return ids
+
+    def counts(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            chunks = dict(self.conn.execute("SELECT status, COUNT(*) FROM chunks GROUP BY status").fetchall())
+            ids = dict(self.conn.execute("SELECT status, COUNT(*) FROM chunk_ids GROUP BY status").fetchall())
+        return {'chunks': chunks, 'ids': ids}
+
+    def outputs(self) -> Dict[str, str]:
+        """{worker: output file} of the registered workers"""
+        with self._lock:
+            return dict(self.conn.execute("SELECT worker, output FROM workers WHERE output IS NOT NULL").fetchall())
+
+    def close(self):
+        self.conn.close()
+
+
+def merge_outputs(queue: WorkQueue, output_file: str) -> int:
+    """
+    Combine the output files of all workers into one file, keeping one record per
+    station, direction and year (a chunk re-run after a lost lease may repeat records)
+    Returns:
+        Number of records written
+    """
+    import pandas as pd
+    from TCDS_Scraping_Tool.dataset import AADT_KEY, read_aadt_records
+    from TCDS_Scraping_Tool.sinks import open_sink, output_files
+
+    frames = [
+        read_aadt_records(str(path))
+        for output in queue.outputs().values()
+        for path in output_files(output)
+    ]
+    if not frames:
+        return 0
+    records = pd.concat(frames, ignore_index=True).drop_duplicates(AADT_KEY, keep='last')
+    records = records.astype(object).where(records.notna(), None)
+    sink = open_sink(output_file)
+    try:
+        sink.write_many(records.to_dict('records'))
+    finally:
+        sink.close()
+    return len(records)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='Shared work queue of a scrape job; workers run aadt_scraping --queue')
+    parser.add_argument('queue', help='Queue database on storage shared by the workers')
+    parser.add_argument('--add', metavar='FILE', help='Queue the station IDs of this file (one per line)')
+    parser.add_argument('--chunk-size', type=int, default=25, help='IDs per chunk claimed by a worker (default: 25)')
+    parser.add_argument('--requeue-failed', action='store_true', help='Queue failed IDs again')
+    parser.add_argument('--merge', metavar='OUTPUT', help='Combine the output files of all workers into this file')
+    args = parser.parse_args(argv)
+
+    queue = WorkQueue(args.queue)
+    try:
+        if args.add:
+            with open(args.add, 'r', encoding='utf-8') as f:
+                added = queue.add_ids((line.strip() for line in f if line.strip()), args.chunk_size)
+            print(f"Queued {added} new IDs")
+        if args.requeue_failed:
+            print(f"Queued {queue.requeue_failed()} failed IDs again")
+        if args.merge:
+            print(f"Wrote {merge_outputs(queue, args.merge)} records to {args.merge}")
+        counts = queue.counts()
+        print("Chunks: " + ", ".join(f"{count} {status}" for status, count in sorted(counts['chunks'].items())))
+        print("IDs: " + ", ".join(f"{count} {status}" for status, count in sorted(counts['ids'].items())))
+    finally:
+        queue.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,19 @@
+import argparse
+import time
 import requests
-from bs4 import BeautifulSoup
-import pandas as pd
+from TCDS_Scraping_Tool.aadt_parser import parse_aadt_pages, station_records
+from TCDS_Scraping_Tool.async_fetch import AADT_PATH, SEARCH_PATH, TCDS_BASE_URL, fetch_stations
+from TCDS_Scraping_Tool.pagination import collect_pages
+from TCDS_Scraping_Tool.rate_limit import retry_after_seconds
+from TCDS_Scraping_Tool.response_cache import cache_key
 
-def scrape_traffic_data(data_id):
+def scrape_traffic_data(data_id, max_pages=20, cache=None, rate_controller=None, base_url=TCDS_BASE_URL):
+    """
+    Fetch the two-way AADT pages of one station from `base_url` (the TCDS site, or a local stub server).
+    See scrape_traffic_data_many for the directional tables.
+    With a ResponseCache, cached pages are reused and only stale ones are requested.
+    With an AdaptiveRateController, requests wait for it and report the server's responses to it.
+    """
     session = requests.Session()
     headers = {
         'authority': 'txdot.public.ms2soft.com',
@@ -17,14 +28,18 @@ def scrape_traffic_data(data_id):
         'sec-fetch-site': 'same-origin',
         'user-agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36',
     }
-    response_list = []
+    cks = None
 
     try:
-        # Perform an initial request to get cookies
-        home_response = session.get('https://txdot.public.ms2soft.com/tcds/tsearch.asp', headers=headers)
-        cks = home_response.cookies
+        def get_cookies():
+            # Perform an initial request to get cookies, only once something has to be downloaded
+            nonlocal cks
+            if cks is None:
+                home_response = session.get(base_url + SEARCH_PATH, headers=headers)
+                cks = home_response.cookies
+            return cks
 
-        for pg in range(1, 6):  # Assuming there are at most 5 pages
+        def get_page(pg):
             params = {
                 'offset': '0',
                 'agency_id': '97',
@@ -33,14 +48,40 @@ def scrape_traffic_data(data_id):
                 'pg': str(pg),
             }
 
-            response = session.get(
-                'https://txdot.public.ms2soft.com/tcds/ajax/tcds_tdetail_aadt.asp',
-                params=params,
-                headers=headers,
-                cookies=cks
-            )
+            def fetch(conditional_headers=None):
+                cookies = get_cookies()
+                if rate_controller:
+                    rate_controller.acquire()
+                started = time.monotonic()
+                try:
+                    response = session.get(
+                        base_url + AADT_PATH,
+                        params=params,
+                        headers={**headers, **(conditional_headers or {})},
+                        cookies=cookies
+                    )
+                except requests.RequestException:
+                    if rate_controller:
+                        rate_controller.record_failure()
+                    raise
+                if rate_controller and (response.status_code == 429 or response.status_code >= 500):
+                    rate_controller.record_failure(retry_after_seconds(response.headers.get('Retry-After')))
+                elif rate_controller:
+                    rate_controller.record_success(time.monotonic() - started)
+                if response.status_code != 304:
+                    response.raise_for_status()
+                return response.status_code, response.text, response.headers
 
-            response_list.append(response.text)
+            if cache is None:
+                return fetch()[1]
+            key = cache_key('tcds_tdetail_aadt.asp', '97', data_id, pg)
+            # The first page holds the latest years, older pages are historical
+            return cache.get_or_fetch(key, fetch, current=(pg == 1))
+
+        # Read the number of pages from the first page, or follow the next button if there is no count
+        response_list, truncated = collect_pages(get_page, max_pages)
+        if truncated:
+            print(f"Warning: station {data_id} has more than {max_pages} AADT pages, output is truncated")
 
         return response_list
 
@@ -48,7 +89,18 @@ def scrape_traffic_data(data_id):
         print(f"Error: {e}")
         return None
 
+def scrape_traffic_data_many(data_ids, concurrency=10, rate_limit=5.0, max_pages=20, base_url=TCDS_BASE_URL, directions=False):
+    """
+    Fetch the AADT pages of many stations concurrently over one shared session.
+    Returns a dictionary {data_id: response_list}, with None for failed stations.
+    With directions, the pages of every direction of a station are fetched concurrently with its
+    two-way pages and response_list becomes {None: two-way pages, "NB": pages, ...}.
+    """
+    return fetch_stations(data_ids, directions, base_url=base_url, concurrency=concurrency, rate_limit=rate_limit, max_pages=max_pages)
+
 def process_data(response_list):
+    from bs4 import BeautifulSoup
+
     col_names = []
     row_data = []
     for response in response_list:
@@ -71,16 +123,29 @@ def process_data(response_list):
     
 
 def main():
-    data_id = '31H228'  # You can change this to any desired data_id
-    response_list = scrape_traffic_data(data_id)
+    parser = argparse.ArgumentParser(description='Fetch the AADT history of TCDS stations into historical_aadt_{id}.csv files')
+    parser.add_argument('ids', nargs='*', default=['31H228'], help='Station IDs (default: 31H228)')
+    parser.add_argument('-f', '--file', help='File of station IDs, one per line (e.g. from TCDS_Scraping_Tool.discovery)')
+    args = parser.parse_args()
+    import pandas as pd
+
+    data_ids = list(args.ids)
+    if args.file:
+        with open(args.file, 'r', encoding='utf-8') as f:
+            data_ids = [line.strip() for line in f if line.strip()]
+    responses = scrape_traffic_data_many(data_ids, directions=True)
 
-    if response_list:
-        col_names, row_data = process_data(response_list)
+    for data_id, pages_by_direction in responses.items():
+        if not pages_by_direction:
+            continue
+        rows = station_records(data_id, {dir: parse_aadt_pages(pages) for dir, pages in pages_by_direction.items()})
+        if not rows:
+            continue
 
-    # Create a DataFrame from the extracted data and save as a csv file
-    df = pd.DataFrame(row_data, columns = col_names).sort_values(by="Year").reset_index(drop=True)
-    df.to_csv(f'historical_aadt_{data_id}.csv', index=False)  
-    print('Data saved as csv file')
+        # Create a DataFrame from the extracted data (one row per direction and year) and save as a csv file
+        df = pd.DataFrame(rows).sort_values(by=["direction", "year"]).reset_index(drop=True)
+        df.to_csv(f'historical_aadt_{data_id}.csv', index=False)  
+        print(f'Data for {data_id} saved as csv file')
         
         
 
@@ -0,0 +1,66 @@
+"""
+Compare the lxml AADT parser with the BeautifulSoup process_data parser on the saved pages
+in benchmarks/fixtures, then report rows/sec for both.
+
+Run from the repository root:
+    python -m benchmarks.bench_aadt_parser [--repeat 2000]
+"""
+import argparse
+import glob
+import os
+import time
+
+from TxDOTTCDS_aadt import process_data
+from TCDS_Scraping_Tool.aadt_parser import AADT_COLUMNS, AADT_TYPES, CONVERTERS, parse_aadt_page
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def load_pages():
+    pages = {}
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, 'aadt_*.html'))):
+        with open(path, 'r', encoding='utf-8') as f:
+            pages[os.path.basename(path)] = f.read()
+    return pages
+
+
+def check_same_rows(pages):
+    """Both parsers must give the same rows; the old string cells are converted to the new types"""
+    for name, html in pages.items():
+        _, old_rows = process_data([html])
+        expected = [
+            {column: CONVERTERS[AADT_TYPES[column]](value) for column, value in zip(AADT_COLUMNS, row)}
+            for row in old_rows
+        ]
+        new_rows = parse_aadt_page(html)
+        if new_rows != expected:
+            raise AssertionError(f"{name}: parsers disagree\nold: {expected}\nnew: {new_rows}")
+        print(f"{name}: {len(new_rows)} rows match")
+
+
+def rows_per_sec(parse, pages, repeat):
+    rows = 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for html in pages:
+            rows += parse(html)
+    return rows / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='AADT parser benchmark')
+    parser.add_argument('--repeat', type=int, default=2000, help='Passes over the fixture pages (default: 2000)')
+    args = parser.parse_args()
+
+    pages = load_pages()
+    check_same_rows(pages)
+
+    html_pages = list(pages.values())
+    old = rows_per_sec(lambda html: len(process_data([html])[1]), html_pages, args.repeat)
+    new = rows_per_sec(lambda html: len(parse_aadt_page(html)), html_pages, args.repeat)
+    print(f"BeautifulSoup process_data: {old:,.0f} rows/sec")
+    print(f"lxml parse_aadt_page:       {new:,.0f} rows/sec ({new / old:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Compare the compiled detail-page extractor with per-field selector extraction on the saved
+station pages in benchmarks/fixtures, then report pages/sec for both.
+
+The per-field baseline is crawl4ai's JsonCssExtractionStrategy when crawl4ai is installed,
+otherwise the equivalent BeautifulSoup select_one() per field.
+
+Run from the repository root:
+    python -m benchmarks.bench_detail_extractor [--repeat 200]
+"""
+import argparse
+import glob
+import json
+import os
+import time
+import warnings
+
+from bs4 import BeautifulSoup
+
+from TCDS_Scraping_Tool.detail_extractor import compile_schema
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURES_DIR = os.path.join(BENCHMARKS_DIR, 'fixtures')
+SCHEMA_PATH = os.path.join(os.path.dirname(BENCHMARKS_DIR), 'C4A Tools', 'tcds_extraction_schema.json')
+
+
+def load_pages():
+    pages = {}
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, 'detail_*.html'))):
+        with open(path, 'r', encoding='utf-8') as f:
+            pages[os.path.basename(path)] = f.read()
+    return pages
+
+
+def soup_item(element, fields):
+    item = {}
+    for field in fields:
+        if field['type'] == 'nested_list':
+            value = [soup_item(sub_element, field['fields']) for sub_element in element.select(field['selector'])]
+        else:
+            selected = element.select_one(field['selector'])
+            value = selected.get_text(strip=True) if selected is not None else field.get('default')
+        if value is not None:
+            item[field['name']] = value
+    return item
+
+
+def per_field_extractor(schema):
+    """Extraction with one selector query per field, as the crawler does for every station"""
+    try:
+        from crawl4ai import JsonCssExtractionStrategy
+    except ImportError:
+        # The schema uses :contains, which soupsieve still supports but warns about
+        warnings.filterwarnings('ignore', category=FutureWarning, module='soupsieve')
+
+        def extract(html):
+            soup = BeautifulSoup(html, 'html.parser')
+            return [item for item in (soup_item(element, schema['fields']) for element in soup.select(schema['baseSelector'])) if item]
+        return 'BeautifulSoup select_one per field', extract
+
+    strategy = JsonCssExtractionStrategy(schema)
+    return 'crawl4ai JsonCssExtractionStrategy', lambda html: strategy.extract('', html)
+
+
+def check_same_items(pages, baseline, compiled):
+    for name, html in pages.items():
+        expected = baseline(html)
+        items = compiled.extract(html)
+        if items != expected:
+            raise AssertionError(f"{name}: extractors disagree\nold: {expected}\nnew: {items}")
+        print(f"{name}: {len(items[0]) if items else 0} fields match")
+
+
+def pages_per_sec(extract, pages, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for html in pages:
+            extract(html)
+    return repeat * len(pages) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Detail page extractor benchmark')
+    parser.add_argument('--repeat', type=int, default=200, help='Passes over the fixture pages (default: 200)')
+    args = parser.parse_args()
+
+    with open(SCHEMA_PATH, 'r') as f:
+        schema = json.load(f)
+    baseline_name, baseline = per_field_extractor(schema)
+    compiled = compile_schema(schema)
+
+    pages = load_pages()
+    check_same_items(pages, baseline, compiled)
+
+    html_pages = list(pages.values())
+    old = pages_per_sec(baseline, html_pages, args.repeat)
+    new = pages_per_sec(compiled.extract, html_pages, args.repeat)
+    print(f"{baseline_name}: {old:,.1f} pages/sec")
+    print(f"compiled schema: {new:,.1f} pages/sec ({new / old:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+"""
+End-to-end scraper benchmark against the local TCDS stub server (benchmarks/tcds_stub.py),
+so scraping changes can be compared without traffic to txdot.public.ms2soft.com.
+
+Scenarios:
+    scrape_traffic_data    TxDOTTCDS_aadt.scrape_traffic_data + process_data, one station after another
+    scrape_many            TxDOTTCDS_aadt.scrape_traffic_data_many (asyncio) + process_data
+    batch                  BatchScrapper with the HTTP backend, all directions, JSONL output
+    crawl                  crawl_stations from C4A Tools (skipped when crawl4ai is not installed)
+
+The stub runs in this process and every scenario in a child process of its own, so the
+report's CPU time per station and peak RSS belong to the scraper alone. Stations are
+synthetic IDs replayed from the recorded fixtures.
+
+Run from the repository root:
+    python -m benchmarks.bench_scrapers --stations 50 --workers 4 --json report.json
+    python -m benchmarks.bench_scrapers --error-rate 0.05 --baseline report.json
+"""
+import argparse
+import asyncio
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from benchmarks.tcds_stub import TCDSStub, add_stub_arguments, stub_options
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARKS_DIR)
+CRAWLER_PATH = os.path.join(REPO_DIR, 'C4A Tools', 'dynamic_scrape_utilities.py')
+# Compared with --baseline: (key, label, True if higher is better)
+COMPARED = [
+    ('stations_per_sec', 'stations/sec', True),
+    ('cpu_ms_per_station', 'CPU ms/station', False),
+    ('peak_rss_mb', 'peak RSS MB', False),
+]
+
+
+def setup_scrape_traffic_data(args, workdir):
+    from TxDOTTCDS_aadt import process_data, scrape_traffic_data
+
+    def run(ids):
+        ok = 0
+        for id in ids:
+            pages = scrape_traffic_data(id, base_url=args.stub_url)
+            if pages and process_data(pages)[1]:
+                ok += 1
+        return ok
+    return run
+
+
+def setup_scrape_many(args, workdir):
+    from TxDOTTCDS_aadt import process_data, scrape_traffic_data_many
+
+    def run(ids):
+        responses = scrape_traffic_data_many(ids, concurrency=args.workers, rate_limit=None, base_url=args.stub_url)
+        return sum(1 for pages in responses.values() if pages and process_data(pages)[1])
+    return run
+
+
+def setup_batch(args, workdir):
+    import logging
+    from TCDS_Scraping_Tool.aadt_scraping import BatchScrapper
+
+    os.chdir(workdir)
+    scraper = BatchScrapper(
+        batch_size=args.batch_size,
+        delay_between_batches=(0, 0),
+        fallback_backend=None,
+        workers=args.workers,
+        rate_limit=args.rate,
+        max_rate=args.rate,
+        progress_file=os.path.join(workdir, 'progress.sqlite'),
+        output_file=os.path.join(workdir, 'output.jsonl'),
+    )
+    scraper.backend_options['http']['base_url'] = args.stub_url
+    logging.getLogger().setLevel(logging.WARNING)
+    ids_file = os.path.join(workdir, 'ids.txt')
+
+    def run(ids):
+        with open(ids_file, 'w') as f:
+            f.write('\n'.join(ids) + '\n')
+        try:
+            scraper.process_file_in_batches(ids_file)
+        finally:
+            scraper.close()
+        return len(ids) - len(scraper.progress.pending(ids))
+    return run
+
+
+def setup_crawl(args, workdir):
+    spec = importlib.util.spec_from_file_location('dynamic_scrape_utilities', CRAWLER_PATH)
+    crawler = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(crawler)
+    # Station pages are loaded from the stub instead of the TCDS site
+    crawler.TCDS_BASE_URL = args.stub_url + '/tcds/tsearch.asp'
+
+    def run(ids):
+        results = asyncio.run(crawler.crawl_stations(ids, concurrency=args.workers))
+        return len(results)
+    return run
+
+
+SCENARIOS = {
+    'scrape_traffic_data': setup_scrape_traffic_data,
+    'scrape_many': setup_scrape_many,
+    'batch': setup_batch,
+    'crawl': setup_crawl,
+}
+
+
+def station_ids(count: int):
+    return [f"BENCH{i:05d}" for i in range(count)]
+
+
+def usage():
+    """(CPU seconds, peak RSS in MB) of this process and its waited-for children"""
+    if resource is None:
+        return time.process_time(), None
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    cpu = own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    unit = 1 if sys.platform == 'darwin' else 1024
+    rss = max(own.ru_maxrss, children.ru_maxrss) * unit / 2 ** 20
+    return cpu, rss
+
+
+def run_scenario(args):
+    """Child process: run one scenario and write its measurements to args.result"""
+    workdir = tempfile.mkdtemp(prefix=f'bench_{args.scenario}_')
+    ids = station_ids(args.stations)
+    try:
+        run = SCENARIOS[args.scenario](args, workdir)
+    except ImportError as e:
+        result = {'skipped': f"missing dependency: {e}"}
+    else:
+        cpu_before, _ = usage()
+        start = time.perf_counter()
+        ok = run(ids)
+        seconds = time.perf_counter() - start
+        cpu, rss = usage()
+        result = {
+            'stations': len(ids),
+            'ok': ok,
+            'seconds': round(seconds, 3),
+            'stations_per_sec': round(len(ids) / seconds, 3),
+            'cpu_ms_per_station': round((cpu - cpu_before) / len(ids) * 1000, 3),
+            'peak_rss_mb': round(rss, 1) if rss is not None else None,
+        }
+    with open(args.result, 'w') as f:
+        json.dump(result, f)
+
+
+def child_command(args, scenario, result_path):
+    return [
+        sys.executable, '-m', 'benchmarks.bench_scrapers',
+        '--scenario', scenario, '--result', result_path, '--stub-url', args.stub_url,
+        '--stations', str(args.stations), '--workers', str(args.workers),
+        '--rate', str(args.rate), '--batch-size', str(args.batch_size),
+    ]
+
+
+def run_child(args, scenario, stub):
+    with tempfile.TemporaryDirectory() as tmp:
+        result_path = os.path.join(tmp, 'result.json')
+        stub.server.reset()
+        output = None if args.verbose else subprocess.DEVNULL
+        process = subprocess.run(child_command(args, scenario, result_path), cwd=REPO_DIR,
+                                 stdout=output, stderr=output if args.verbose else subprocess.PIPE, text=True)
+        if process.returncode != 0 or not os.path.exists(result_path):
+            error = (process.stderr or '').strip().splitlines()
+            return {'error': error[-1] if error else f"exit code {process.returncode}"}
+        with open(result_path, 'r') as f:
+            result = json.load(f)
+    result['requests'] = stub.server.snapshot()
+    return result
+
+
+def print_report(results, baseline=None):
+    header = f"{'scenario':<20} {'ok':>9} {'seconds':>9} {'stations/sec':>13} {'CPU ms/station':>15} {'peak RSS MB':>12}"
+    print(header)
+    print('-' * len(header))
+    for scenario, result in results.items():
+        if 'stations' not in result:
+            print(f"{scenario:<20} {result.get('skipped') or 'failed: ' + result.get('error', '')}")
+            continue
+        ok = f"{result['ok']}/{result['stations']}"
+        rss = f"{result['peak_rss_mb']:.1f}" if result['peak_rss_mb'] is not None else '-'
+        print(f"{scenario:<20} {ok:>9} {result['seconds']:>9.2f} "
+              f"{result['stations_per_sec']:>13.2f} {result['cpu_ms_per_station']:>15.2f} {rss:>12}")
+        errors = {key: count for key, count in result['requests'].items() if not key.endswith(' 200')}
+        if errors:
+            print(f"{'':<20} injected/failed responses: " + ", ".join(f"{key}: {count}" for key, count in sorted(errors.items())))
+
+    if not baseline:
+        return
+    print("\nChange against baseline:")
+    for scenario, result in results.items():
+        old = baseline.get('results', {}).get(scenario, {})
+        if 'stations' not in result or 'stations' not in old:
+            continue
+        changes = []
+        for key, label, higher_is_better in COMPARED:
+            if result.get(key) is None or not old.get(key):
+                continue
+            change = (result[key] - old[key]) / old[key] * 100
+            better = (change > 0) == higher_is_better
+            changes.append(f"{label} {change:+.1f}%" + (" (better)" if better and abs(change) >= 1 else ""))
+        print(f"  {scenario:<20} " + ", ".join(changes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='End-to-end scraper benchmark against a local TCDS stub')
+    parser.add_argument('--stations', type=int, default=50, help='Number of synthetic stations per scenario (default: 50)')
+    parser.add_argument('--workers', type=int, default=4, help='Concurrency of the scenarios that support it (default: 4)')
+    parser.add_argument('--rate', type=float, default=100, help='Requests per second allowed to BatchScrapper (default: 100)')
+    parser.add_argument('--batch-size', type=int, default=25, help='BatchScrapper batch size (default: 25)')
+    parser.add_argument('--scenarios', nargs='+', choices=list(SCENARIOS), default=list(SCENARIOS), help='Scenarios to run (default: all)')
+    parser.add_argument('--json', help='Save the report to this file, for use as a later --baseline')
+    parser.add_argument('--baseline', help='Report saved by an earlier run to compare with')
+    parser.add_argument('--verbose', action='store_true', help='Show the output of the scenarios')
+    add_stub_arguments(parser)
+    # Used by the child processes
+    parser.add_argument('--scenario', help=argparse.SUPPRESS)
+    parser.add_argument('--result', help=argparse.SUPPRESS)
+    parser.add_argument('--stub-url', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.scenario:
+        run_scenario(args)
+        return
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+
+    config = {
+        'stations': args.stations,
+        'workers': args.workers,
+        'rate': args.rate,
+        'batch_size': args.batch_size,
+        **stub_options(args),
+    }
+    print("Config: " + ", ".join(f"{key}={value}" for key, value in config.items()))
+    results = {}
+    with TCDSStub(**stub_options(args)) as stub:
+        args.stub_url = stub.url
+        for scenario in args.scenarios:
+            results[scenario] = run_child(args, scenario, stub)
+    print_report(results, baseline)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'config': config, 'results': results}, f, indent=2)
+        print(f"\nReport saved to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Startup cost of the command-line entry points: wall time of fresh interpreters running
+--help or importing a module (median of several runs), and which heavy dependencies each
+of them loads. A cron job fetching a few stations pays this on every run, so the entry
+points should only import pandas, aiohttp, selenium or crawl4ai when a command needs them.
+
+With --fetch, also times `python -m TCDS_Scraping_Tool fetch` of one station against the
+local TCDS stub server (benchmarks/tcds_stub.py), startup included.
+
+Run from the repository root:
+    python -m benchmarks.bench_startup [--repeat 7] [--fetch]
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.tcds_stub import TCDSStub
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARKS_DIR)
+HEAVY_MODULES = ['pandas', 'numpy', 'pyarrow', 'aiohttp', 'bs4', 'selenium', 'crawl4ai']
+
+# Name, command line after the interpreter
+ENTRY_POINTS = [
+    ('cli --help', ['-m', 'TCDS_Scraping_Tool', '--help']),
+    ('cli fetch --help', ['-m', 'TCDS_Scraping_Tool', 'fetch', '--help']),
+    ('cli batch --help', ['-m', 'TCDS_Scraping_Tool', 'batch', '--help']),
+    ('aadt_scraping --help', ['-m', 'TCDS_Scraping_Tool.aadt_scraping', '--help']),
+    ('TxDOTTCDS_aadt.py --help', [os.path.join(REPO_DIR, 'TxDOTTCDS_aadt.py'), '--help']),
+]
+IMPORTS = [
+    'TCDS_Scraping_Tool.cli',
+    'TCDS_Scraping_Tool.backends',
+    'TCDS_Scraping_Tool.aadt_scraping',
+    'TCDS_Scraping_Tool.async_fetch',
+    'TxDOTTCDS_aadt',
+]
+# Runs a command line as the interpreter would, in the child of loaded_modules
+RUN_COMMAND = """
+import runpy, sys
+sys.argv = {argv!r}
+try:
+    if sys.argv[0] == '-m':
+        sys.argv = sys.argv[1:]
+        runpy.run_module(sys.argv[0], run_name='__main__', alter_sys=True)
+    else:
+        runpy.run_path(sys.argv[0], run_name='__main__')
+except SystemExit:
+    pass
+"""
+# Children run in a scratch directory so the log and progress files of BatchScrapper stay out of the repository
+WORK_DIR = tempfile.mkdtemp(prefix='bench_startup_')
+CHILD_ENV = {**os.environ, 'PYTHONPATH': os.pathsep.join(filter(None, [REPO_DIR, os.environ.get('PYTHONPATH')]))}
+
+
+def run_child(command: list, **options) -> subprocess.CompletedProcess:
+    return subprocess.run(command, cwd=WORK_DIR, env=CHILD_ENV, check=False, **options)
+
+
+def median_seconds(command: list, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run_child(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def loaded_modules(code: str) -> list:
+    """Heavy modules loaded after running `code` in a fresh interpreter"""
+    code += f"\nimport json, sys\nsys.stderr.write('\\n' + json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"
+    process = run_child([sys.executable, '-c', code], stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    try:
+        return json.loads(process.stderr.strip().splitlines()[-1])
+    except (IndexError, ValueError):
+        return ['? ' + process.stderr.strip()[-200:]]
+
+
+def report(name: str, seconds: float, baseline: float, modules: list):
+    print(f"{name:<42}{seconds * 1000:>8.0f} ms{(seconds - baseline) * 1000:>+9.0f} ms   {', '.join(modules) or '-'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Startup time of the scraper entry points')
+    parser.add_argument('--repeat', type=int, default=7, help='Runs per command, the median is reported (default: 7)')
+    parser.add_argument('--fetch', action='store_true', help='Also time a one-station fetch against the local stub server')
+    args = parser.parse_args()
+
+    baseline = median_seconds([sys.executable, '-c', 'pass'], args.repeat)
+    print(f"{'':<42}{'median':>11}{'vs python':>12}   heavy modules loaded")
+    report('python -c pass', baseline, baseline, [])
+    for name, argv in ENTRY_POINTS:
+        report(name, median_seconds([sys.executable] + argv, args.repeat), baseline, loaded_modules(RUN_COMMAND.format(argv=argv)))
+    for module in IMPORTS:
+        command = [sys.executable, '-c', f'import {module}']
+        report(f"import {module}", median_seconds(command, args.repeat), baseline, loaded_modules(f'import {module}'))
+
+    if args.fetch:
+        with TCDSStub(latency=0.0) as stub:
+            command = [sys.executable, '-m', 'TCDS_Scraping_Tool', 'fetch', '31H228', '--base-url', stub.url, '--rate', '100', '--max-rate', '100']
+            report('cli fetch 31H228 (stub)', median_seconds(command, args.repeat), baseline, [])
+    shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
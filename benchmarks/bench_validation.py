@@ -0,0 +1,104 @@
+"""
+Throughput of the AADT normalization and validation stage on a synthetic dataset of raw
+text records, as read from CSV or crawl4ai output: comma-formatted numbers, <sup> footnote
+markers, years repeated across pages and directional tables.
+
+Compares the cell-by-cell conversion with parse_int/parse_float that typed_aadt used to do
+with the vectorized normalize_aadt, checks both give the same values, and times
+validate_aadt on the result.
+
+Run from the repository root:
+    python -m benchmarks.bench_validation [--stations 5000] [--years 25]
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from TCDS_Scraping_Tool.aadt_parser import AADT_COLUMNS, AADT_TYPES, CONVERTERS, TWO_WAY
+from TCDS_Scraping_Tool.dataset import AADT_FACT_COLUMNS, AADT_KEY
+from TCDS_Scraping_Tool.validation import normalize_aadt, validate_aadt
+
+
+def synthetic_records(stations: int, years: int, seed: int = 0) -> pd.DataFrame:
+    """Two-way and NB/SB rows of every station and year as text cells, with one year repeated as on overlapping pages"""
+    rng = np.random.default_rng(seed)
+    station_ids = np.repeat([f"S{i:06d}" for i in range(stations)], years)
+    year = np.tile(np.arange(2024 - years, 2024), stations)
+    base = np.repeat(rng.integers(500, 80000, stations), years)
+    aadt = (base * rng.normal(1, 0.05, len(base)).cumprod().clip(0.2, 5)).astype(int)
+    north = (aadt * rng.uniform(0.45, 0.55, len(aadt))).astype(int)
+
+    def table(direction, values):
+        cells = np.char.add(np.char.mod('%d', values // 1000), ',')
+        cells = np.char.add(cells, np.char.zfill(np.char.mod('%d', values % 1000), 3))
+        cells = np.where(values >= 1000, cells, np.char.mod('%d', values))
+        footnote = rng.random(len(values)) < 0.1
+        cells = np.where(footnote, np.char.add(cells, '<sup>1</sup>'), cells)
+        return pd.DataFrame({
+            'station_id': station_ids,
+            'direction': direction,
+            'year': year.astype(str),
+            'aadt': cells,
+            'dhv_30': np.char.mod('%d', values // 10),
+            'k_percent': np.char.mod('%.1f', rng.uniform(7, 12, len(values))),
+            'd_percent': np.char.mod('%d', rng.integers(50, 65, len(values))),
+            'pa': np.char.mod('%d', values * 9 // 10),
+            'bc': np.char.mod('%d', values // 10),
+            'src': np.where(rng.random(len(values)) < 0.5, 'Actual', 'Grown from prior year'),
+        })
+
+    # A few miscounted two-way values, caught by both the direction sum and year-over-year checks
+    two_way = np.where(rng.random(len(aadt)) < 0.001, aadt * 3, aadt)
+    records = pd.concat([table(TWO_WAY, two_way), table('NB', north), table('SB', aadt - north)], ignore_index=True)
+    # Pages overlap by a year: the first row of each station's second page repeats the first page
+    repeated = records[records['year'] == str(2024 - years // 2)]
+    return pd.concat([records, repeated], ignore_index=True).astype(object)
+
+
+def cell_by_cell(records: pd.DataFrame) -> pd.DataFrame:
+    """The conversion typed_aadt did before: each cell through parse_int/parse_float"""
+    df = records.reindex(columns=AADT_FACT_COLUMNS)
+    for column in AADT_COLUMNS:
+        convert = CONVERTERS[AADT_TYPES[column]]
+        df[column] = [convert(value) if isinstance(value, str) and value.strip() else None for value in df[column]]
+    return df[df['year'].notna()].drop_duplicates(AADT_KEY, keep='first')
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='AADT normalization and validation benchmark')
+    parser.add_argument('--stations', type=int, default=5000, help='Number of synthetic stations (default: 5000)')
+    parser.add_argument('--years', type=int, default=25, help='AADT years per station and direction (default: 25)')
+    args = parser.parse_args()
+
+    records = synthetic_records(args.stations, args.years)
+    rows = len(records)
+    print(f"{rows:,} raw rows ({args.stations} stations x {args.years} years x 3 directions, plus repeated years)")
+
+    old, old_seconds = timed(cell_by_cell, records)
+    (new, counts), new_seconds = timed(normalize_aadt, records)
+    issues, check_seconds = timed(validate_aadt, new)
+
+    old = old.sort_values(AADT_KEY).reset_index(drop=True)
+    for column in AADT_COLUMNS:
+        expected = old[column].astype('string' if AADT_TYPES[column] is str else 'Float64')
+        actual = new[column].astype('string' if AADT_TYPES[column] is str else 'Float64')
+        if not expected.equals(actual):
+            raise AssertionError(f"{column}: vectorized values differ from the cell-by-cell conversion")
+    print(f"Both conversions give the same {len(new):,} rows ({counts['duplicates']:,} repeated years dropped)")
+
+    print(f"cell by cell (parse_int/parse_float): {rows / old_seconds:>12,.0f} rows/sec")
+    print(f"normalize_aadt (vectorized):          {rows / new_seconds:>12,.0f} rows/sec ({old_seconds / new_seconds:.1f}x)")
+    print(f"validate_aadt:                        {len(new) / check_seconds:>12,.0f} rows/sec, "
+          + ", ".join(f"{count} {issue}" for issue, count in issues['issue'].value_counts().sort_index().items()))
+
+
+if __name__ == "__main__":
+    main()
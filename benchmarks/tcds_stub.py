@@ -0,0 +1,285 @@
+"""
+Local stand-in for the TCDS site that replays the recorded pages in benchmarks/fixtures.
+
+Endpoints:
+    /tcds/tsearch.asp                   sets the session cookie; with local_id, the station detail page
+    /tcds/ajax/tcds_tdetail_aadt.asp    AADT table page `pg` of `local_id`, per direction with `dir`
+    /tcds/ajax/tcds_tsearch_list.asp    page `pg` of a synthetic location list of `list_size` stations
+                                        (BENCH00000, ...), filtered by `district`/`county` if given
+
+Fixtures are named aadt_{id}_pg{n}.html, aadt_{id}_{dir}_pg{n}.html and detail_{id}.html.
+Any other station ID is served the pages of a recorded station chosen from a hash of the ID,
+so a benchmark can use as many stations as it likes; a direction without its own recording
+is served the two-way pages with that direction's button selected. A request without the
+`dir` parameter gets the two-way page itself, which the scrapers report as an ignored
+direction parameter. Every response except the cookie handshake is delayed by
+`latency` plus up to `jitter` seconds, and a share of them fails with 503 (`error_rate`)
+or 429 with a Retry-After header (`throttle_rate`).
+
+Run from the repository root:
+    python -m benchmarks.tcds_stub --port 8765 --latency 0.05 --error-rate 0.02
+"""
+import argparse
+import glob
+import os
+import random
+import re
+import threading
+import time
+import zlib
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlparse
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+AADT_FIXTURE_RE = re.compile(r'^aadt_(?P<id>[^_]+)(?:_(?P<dir>NB|SB|EB|WB))?_pg(?P<pg>\d+)\.html$')
+DETAIL_FIXTURE_RE = re.compile(r'^detail_(?P<id>[^_]+)\.html$')
+LIST_DISTRICTS = [('Austin', 'Travis'), ('Dallas', 'Dallas'), ('Houston', 'Harris'), ('El Paso', 'El Paso'), ('Lubbock', 'Lubbock')]
+LIST_PAGE_SIZE = 25
+EMPTY_AADT_PAGE = (
+    '<div id="TCDS_TDETAIL_AADT_DIV"><table id="tblTable4" class="FormTable">'
+    '<tr class="FormRowLabel"><td class="FormRowLabel">&nbsp;</td><td class="FormRowLabel">Year</td>'
+    '<td class="FormRowLabel">AADT</td></tr></table></div>'
+)
+
+
+class Fixtures:
+    """Recorded pages, indexed by station, direction and page"""
+
+    def __init__(self, fixtures_dir: str = FIXTURES_DIR):
+        self.aadt: Dict[str, Dict[Optional[str], Dict[int, bytes]]] = {}
+        self.detail: Dict[str, bytes] = {}
+        for path in sorted(glob.glob(os.path.join(fixtures_dir, '*.html'))):
+            name = os.path.basename(path)
+            with open(path, 'rb') as f:
+                html = f.read()
+            match = AADT_FIXTURE_RE.match(name)
+            if match:
+                pages = self.aadt.setdefault(match.group('id'), {}).setdefault(match.group('dir'), {})
+                pages[int(match.group('pg'))] = html
+                continue
+            match = DETAIL_FIXTURE_RE.match(name)
+            if match:
+                self.detail[match.group('id')] = html
+        self.aadt_ids = sorted(self.aadt)
+        self.detail_ids = sorted(self.detail)
+
+    @staticmethod
+    def recorded_id(id: str, recorded: list) -> Optional[str]:
+        if id in recorded:
+            return id
+        if not recorded:
+            return None
+        return recorded[zlib.crc32(id.encode()) % len(recorded)]
+
+    def aadt_page(self, id: str, pg: int, dir: Optional[str] = None) -> bytes:
+        station = self.aadt.get(self.recorded_id(id, self.aadt_ids), {})
+        if dir and dir not in station:
+            # As on the site, the requested direction's button is the selected one
+            html = station.get(None, {}).get(pg, EMPTY_AADT_PAGE.encode())
+            return select_direction(html, dir)
+        pages = station.get(dir) or station.get(None, {})
+        return pages.get(pg, EMPTY_AADT_PAGE.encode())
+
+    def detail_page(self, id: str) -> Optional[bytes]:
+        return self.detail.get(self.recorded_id(id, self.detail_ids))
+
+
+def select_direction(html: bytes, dir: str) -> bytes:
+    """A two-way page with the buttons switched to `dir`, so it differs from the two-way page like the site's"""
+    html = html.replace(b'class="btnSel" value="2-Way"', b'class="btn" value="2-Way"')
+    return html.replace(f'class="btn" value="{dir}"'.encode(), f'class="btnSel" value="{dir}"'.encode())
+
+
+def list_station(i: int) -> dict:
+    district, county = LIST_DISTRICTS[i % len(LIST_DISTRICTS)]
+    day = date.fromordinal(date(2015, 1, 1).toordinal() + (i * 37) % 3000)
+    return {
+        'station_id': f"BENCH{i:05d}",
+        'district': district,
+        'county': county,
+        'active': 'No' if i % 7 == 0 else 'Yes',
+        'last_count': f"{day.month}/{day.day}/{day.year}",
+    }
+
+
+def station_list_page(size: int, pg: int, district: Optional[str] = None, county: Optional[str] = None) -> bytes:
+    """One page of the location list grid, with a "Page n of m" pagination row"""
+    stations = [station for station in map(list_station, range(size))
+                if (not district or station['district'] == district) and (not county or station['county'] == county)]
+    pages = max(1, -(-len(stations) // LIST_PAGE_SIZE))
+    out = ['<div id="TCDS_TSEARCH_LIST_DIV"><table class="FormTable">',
+           '<tr class="FormRowLabel"><th>Loc ID</th><th>District</th><th>County</th><th>Active</th><th>Last Count</th></tr>']
+    for station in stations[(pg - 1) * LIST_PAGE_SIZE:pg * LIST_PAGE_SIZE]:
+        out.append(f'<tr class="FormRow"><td><a href="tsearch.asp?loc=Txdot&mod=tcds&local_id={station["station_id"]}">{station["station_id"]}</a></td>'
+                   f'<td>{station["district"]}</td><td>{station["county"]}</td><td>{station["active"]}</td><td>{station["last_count"]}</td></tr>')
+    disabled = ' disabled="disabled"' if pg >= pages else ''
+    out.append(f'<tr class="FormRowLabel"><td colspan="5"><input type="button" value="<<" name="a_prev"> Page {pg} of {pages} '
+               f'<input type="button" value=">" name="a_first"{disabled}></td></tr></table></div>')
+    return ''.join(out).encode()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def send(self, status: int, body: bytes = b'', content_type: str = 'text/html', headers: Optional[dict] = None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server
+        url = urlparse(self.path)
+        query = {name: values[0] for name, values in parse_qs(url.query).items()}
+
+        if url.path == '/tcds/tsearch.asp' and 'local_id' not in query:
+            server.count(url.path, 200)
+            return self.send(200, b'<html><body>TCDS search</body></html>',
+                             headers={'Set-Cookie': 'ASPSESSIONIDSTUB=benchmark; path=/'})
+
+        status, retry_after = server.inject()
+        if status != 200:
+            server.count(url.path, status)
+            headers = {'Retry-After': str(retry_after)} if retry_after is not None else None
+            return self.send(status, b'', headers=headers)
+
+        if url.path == '/tcds/tsearch.asp':
+            body = server.fixtures.detail_page(query['local_id'])
+        elif url.path == '/tcds/ajax/tcds_tsearch_list.asp':
+            body = station_list_page(server.list_size, int(query.get('pg', 1)), query.get('district'), query.get('county'))
+        elif url.path == '/tcds/ajax/tcds_tdetail_aadt.asp':
+            body = server.fixtures.aadt_page(query.get('local_id', ''), int(query.get('pg', 1)), query.get('dir') or None)
+        else:
+            body = None
+        status = 200 if body is not None else 404
+        server.count(url.path, status)
+        self.send(status, body or b'')
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, fixtures: Fixtures, latency: float = 0.05, jitter: float = 0.0,
+                 error_rate: float = 0.0, throttle_rate: float = 0.0, retry_after: int = 1, seed: int = 0,
+                 list_size: int = 1000):
+        super().__init__(address, StubHandler)
+        self.fixtures = fixtures
+        self.list_size = list_size
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def inject(self):
+        """Sleep the configured latency; returns (status, Retry-After) with any injected error"""
+        with self._lock:
+            delay = self.latency + self._random.uniform(0, self.jitter)
+            draw = self._random.random()
+        time.sleep(delay)
+        if draw < self.throttle_rate:
+            return 429, self.retry_after
+        if draw < self.throttle_rate + self.error_rate:
+            return 503, None
+        return 200, None
+
+    def count(self, path: str, status: int):
+        with self._lock:
+            key = f"{path} {status}"
+            self.requests[key] = self.requests.get(key, 0) + 1
+
+    def reset(self):
+        with self._lock:
+            self.requests = {}
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self.requests)
+
+
+class TCDSStub:
+    """
+    The stub server on a background thread of the calling process.
+    Usage:
+        with TCDSStub(latency=0.05) as stub:
+            scrape_traffic_data('31H228', base_url=stub.url)
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, fixtures_dir: str = FIXTURES_DIR, **options):
+        self.server = StubServer((host, port), Fixtures(fixtures_dir), **options)
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def add_stub_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument('--latency', type=float, default=0.05, help='Seconds before each response (default: 0.05)')
+    parser.add_argument('--jitter', type=float, default=0.02, help='Up to this many extra seconds per response (default: 0.02)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of responses failing with 503 (default: 0)')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='Share of responses failing with 429 (default: 0)')
+    parser.add_argument('--retry-after', type=int, default=1, help='Retry-After seconds of 429 responses (default: 1)')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the latency and error draws (default: 0)')
+    parser.add_argument('--list-size', type=int, default=1000, help='Stations in the location list (default: 1000)')
+
+
+def stub_options(args) -> dict:
+    return {
+        'latency': args.latency,
+        'jitter': args.jitter,
+        'error_rate': args.error_rate,
+        'throttle_rate': args.throttle_rate,
+        'retry_after': args.retry_after,
+        'seed': args.seed,
+        'list_size': args.list_size,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local TCDS stub server replaying recorded pages')
+    parser.add_argument('--host', default='127.0.0.1', help='Address to listen on (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8765, help='Port to listen on (default: 8765)')
+    parser.add_argument('--fixtures', default=FIXTURES_DIR, help='Directory of recorded pages (default: benchmarks/fixtures)')
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    server = StubServer((args.host, args.port), Fixtures(args.fixtures), **stub_options(args))
+    print(f"TCDS stub listening on http://{args.host}:{server.server_address[1]}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
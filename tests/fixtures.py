@@ -0,0 +1,39 @@
+import os
+import re
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks', 'fixtures')
+DATA_ROW_RE = re.compile(r'<tr class="FormRowLabel"><td class="FormRow">.*?</tr>\n?', re.S)
+
+
+def read_fixture(name: str) -> str:
+    with open(os.path.join(FIXTURES_DIR, name), 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def aadt_fixtures():
+    return sorted(name for name in os.listdir(FIXTURES_DIR) if name.startswith('aadt_'))
+
+
+def empty_page(name: str = 'aadt_S133_pg1.html') -> str:
+    """A recorded page with its data rows removed: the header and pagination rows only"""
+    return DATA_ROW_RE.sub('', read_fixture(name))
+
+
+def aadt_page(years, pg: int, pages: int) -> str:
+    """An AADT page in the site's format listing `years` (newest first), with a "Page pg of pages" control"""
+    header = ''.join(f'<td class="FormRowLabel">{name}</td>' for name in ['&nbsp;', 'Year', 'AADT', 'DHV-30', 'K %', 'D %', 'PA', 'BC', 'Src'])
+    rows = ''.join(
+        f'<tr class="FormRowLabel"><td class="FormRow"></td><td class="FormRow">{year}</td><td class="FormRow">{year * 10:,}</td>'
+        + '<td class="FormRow"></td>' * 5 + '<td class="FormRow">Actual</td></tr>\n'
+        for year in years
+    )
+    return ('<div id="TCDS_TDETAIL_AADT_DIV"><table id="tblTable4" class="FormTable">\n'
+            f'<tr class="FormRowLabel">{header}</tr>\n{rows}'
+            f'<tr class="FormRowLabel"><td colspan="9" align="center"> Page {pg} of {pages} </td></tr>\n</table></div>')
+
+
+def aadt_pages(first_year: int, last_year: int, per_page: int = 10) -> dict:
+    """{pg: page html} of a station with AADT from first_year to last_year, newest year first"""
+    years = list(range(last_year, first_year - 1, -1))
+    chunks = [years[i:i + per_page] for i in range(0, len(years), per_page)]
+    return {pg: aadt_page(chunk, pg, len(chunks)).encode() for pg, chunk in enumerate(chunks, 1)}
@@ -0,0 +1,61 @@
+import pytest
+
+from TCDS_Scraping_Tool.aadt_parser import (AADT_COLUMNS, AADT_TYPES, CONVERTERS, TWO_WAY, parse_aadt_page,
+                                            parse_aadt_pages, station_records)
+from TxDOTTCDS_aadt import process_data
+from tests.fixtures import aadt_fixtures, empty_page, read_fixture
+
+
+def process_data_rows(pages):
+    """Rows of the BeautifulSoup parser, converted to the types of the lxml parser"""
+    _, rows = process_data(pages)
+    return [
+        {column: CONVERTERS[AADT_TYPES[column]](value) if value else None for column, value in zip(AADT_COLUMNS, row)}
+        for row in rows
+    ]
+
+
+@pytest.mark.parametrize('name', aadt_fixtures())
+def test_parse_aadt_page_matches_process_data(name):
+    html = read_fixture(name)
+    rows = parse_aadt_page(html)
+    assert rows
+    assert rows == process_data_rows([html])
+
+
+def test_sup_footnotes_are_dropped():
+    rows = {row['year']: row for row in parse_aadt_page(read_fixture('aadt_31H228_pg1.html'))}
+    # 2020 is shown as 11,084<sup>E</sup>
+    assert rows[2020]['aadt'] == 11084
+    assert rows[2023]['src'] == 'Actual'
+    assert rows[2014]['src'] == 'Grown from 2013'
+
+
+def test_empty_table():
+    html = empty_page()
+    assert 'Page 1 of 1' in html
+    assert parse_aadt_page(html) == []
+    assert process_data_rows([html]) == []
+    assert parse_aadt_page('') == []
+
+
+def test_last_page():
+    rows = parse_aadt_page(read_fixture('aadt_31H228_pg2.html'))
+    assert [row['year'] for row in rows] == [2013, 2012, 2011, 2010]
+    assert rows[-1] == {'year': 2010, 'aadt': 9624, 'dhv_30': 914, 'k_percent': 9.5, 'd_percent': 51.0,
+                        'pa': 8469, 'bc': 1155, 'src': 'Actual'}
+
+
+def test_parse_aadt_pages_keeps_first_row_of_each_year():
+    first, last = read_fixture('aadt_31H228_pg1.html'), read_fixture('aadt_31H228_pg2.html')
+    rows = parse_aadt_pages([first, last, last])
+    assert [row['year'] for row in rows] == list(range(2023, 2009, -1))
+    assert rows == process_data_rows([first, last])
+
+
+def test_station_records():
+    records = station_records('31H228', {None: [{'year': 2023, 'aadt': 1}], 'NB': [{'year': 2023, 'aadt': 2}]})
+    assert records == [
+        {'station_id': '31H228', 'direction': TWO_WAY, 'year': 2023, 'aadt': 1},
+        {'station_id': '31H228', 'direction': 'NB', 'year': 2023, 'aadt': 2},
+    ]
@@ -0,0 +1,47 @@
+import logging
+
+import pytest
+
+from benchmarks.tcds_stub import TCDSStub
+from TCDS_Scraping_Tool.async_fetch import fetch_stations
+from TCDS_Scraping_Tool.backends import HttpBackend
+
+
+@pytest.fixture(scope='module')
+def stub():
+    with TCDSStub(latency=0.0) as stub:
+        yield stub
+
+
+def test_http_backend_fetches_every_direction(stub, caplog):
+    backend = HttpBackend(base_url=stub.url)
+    try:
+        with caplog.at_level(logging.WARNING):
+            results = backend.scrape_station('31H228')
+    finally:
+        backend.close()
+    assert list(results) == [None, 'NB', 'SB']
+    assert [row['year'] for row in results[None]] == list(range(2023, 2009, -1))
+    assert 'identical to the two-way page' not in caplog.text
+
+
+def test_http_backend_warns_when_direction_is_ignored(stub, caplog):
+    backend = HttpBackend(base_url=stub.url, direction_param='direction')
+    try:
+        with caplog.at_level(logging.WARNING):
+            backend.fetch_pages('31H228')
+    finally:
+        backend.close()
+    assert "31H228 NB AADT page is identical to the two-way page" in caplog.text
+    assert backend.metrics.counters['direction_param_ignored'] == 2
+
+
+def test_async_fetch_warns_when_direction_is_ignored(stub, caplog):
+    with caplog.at_level(logging.WARNING):
+        pages = fetch_stations(['31H228'], directions=True, base_url=stub.url, rate_limit=None)
+    assert list(pages['31H228']) == [None, 'NB', 'SB']
+    assert 'identical to the two-way page' not in caplog.text
+
+    with caplog.at_level(logging.WARNING):
+        fetch_stations(['31H228'], directions=True, base_url=stub.url, rate_limit=None, direction_param='direction')
+    assert "31H228 SB AADT page is identical to the two-way page" in caplog.text
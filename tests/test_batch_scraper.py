@@ -0,0 +1,106 @@
+import json
+import shutil
+
+import pytest
+
+from benchmarks.tcds_stub import TCDSStub
+from TCDS_Scraping_Tool.aadt_scraping import BatchScrapper
+from TCDS_Scraping_Tool.rate_limit import AdaptiveRateController
+from TCDS_Scraping_Tool.spool import Spool
+from TCDS_Scraping_Tool.work_queue import WorkQueue
+from tests.fixtures import FIXTURES_DIR, empty_page, read_fixture
+
+
+@pytest.fixture(scope='module')
+def stub(tmp_path_factory):
+    """The recorded stations, plus EMPTY (an AADT table without rows) and BROKEN (no AADT table)"""
+    fixtures = tmp_path_factory.mktemp('fixtures')
+    for path in ('aadt_31H228_pg1.html', 'aadt_31H228_pg2.html', 'aadt_S133_pg1.html'):
+        shutil.copy(f"{FIXTURES_DIR}/{path}", fixtures / path)
+    (fixtures / 'aadt_EMPTY_pg1.html').write_text(empty_page())
+    (fixtures / 'aadt_BROKEN_pg1.html').write_text('<html><body>Service temporarily busy</body></html>')
+    with TCDSStub(fixtures_dir=str(fixtures), latency=0.0) as stub:
+        yield stub
+
+
+@pytest.fixture
+def scraper(stub, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    scraper = BatchScrapper(delay_between_batches=(0, 0), max_retries=1, progress_file=str(tmp_path / 'progress.sqlite'),
+                            output_file=str(tmp_path / 'output.jsonl'), flush_every=1)
+    scraper.backend_options['http']['base_url'] = stub.url
+    scraper.rate_limiter = AdaptiveRateController(rate=100, max_rate=100, backoff=0.01)
+    yield scraper
+    scraper.close()
+
+
+def output_records(scraper):
+    scraper.sink.flush()
+    with open(scraper.output_file) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_station_records_are_written(scraper):
+    results = scraper.process_batch(['31H228'], 0)
+    assert results['successful'] == ['31H228']
+    records = output_records(scraper)
+    assert {record['direction'] for record in records} == {'two-way', 'NB', 'SB'}
+    assert scraper.progress.is_completed('31H228')
+
+
+def test_empty_table_is_final_without_backoff(scraper):
+    results = scraper.process_batch(['EMPTY'], 0)
+    assert results['successful'] == ['EMPTY']
+    assert scraper.progress.is_completed('EMPTY')
+    assert scraper.rate_limiter.failures == 0
+    assert scraper.rate_limiter.rate == 100
+    assert scraper.metrics.counters.get('retries', 0) == 0
+    assert scraper.metrics.counters['stations_empty'] == 1
+
+
+def test_page_without_table_is_a_failure(scraper):
+    results = scraper.process_batch(['BROKEN'], 0)
+    assert results['failed'] == ['BROKEN']
+    assert scraper.rate_limiter.rate < 100
+    assert scraper.metrics.counters['malformed_responses'] >= 2
+    assert scraper.metrics.counters['retries'] == 1
+    assert 'has no AADT table' in scraper.progress.failed()['BROKEN']['reason']
+
+
+def test_spooled_station_is_completed_once_its_records_are_written(scraper, tmp_path):
+    scraper.spool = Spool(str(tmp_path / 'spool'))
+    scraper.parse_processes = 1
+    results = scraper.process_batch(['31H228', 'EMPTY'], 0)
+    assert sorted(results['successful']) == ['31H228', 'EMPTY']
+    assert {record['direction'] for record in output_records(scraper)} == {'two-way', 'NB', 'SB'}
+    assert scraper.progress.is_completed('31H228') and scraper.progress.is_completed('EMPTY')
+    assert scraper.spool.files() == []
+    assert len(scraper.spool.files(parsed=True)) == 3
+
+
+def test_leftover_spool_files_are_parsed_once(scraper, tmp_path):
+    # A run that was interrupted after spooling 31H228
+    spool = Spool(str(tmp_path / 'spool'))
+    spool.write('31H228', None, [read_fixture('aadt_31H228_pg1.html'), read_fixture('aadt_31H228_pg2.html')])
+    scraper.spool = spool
+    scraper.parse_processes = 1
+    scraper.parse_leftover_spool()
+    records = output_records(scraper)
+    assert [record['year'] for record in records] == list(range(2023, 2009, -1))
+    assert scraper.progress.is_completed('31H228')
+
+    scraper.parse_leftover_spool()
+    assert len(output_records(scraper)) == len(records)
+
+
+def test_queue_records_failure_reasons(scraper, tmp_path):
+    queue = WorkQueue(str(tmp_path / 'queue.sqlite'))
+    try:
+        queue.add_ids(['31H228', 'BROKEN'])
+        scraper.process_queue(queue, worker='w1')
+        outcomes = dict(queue.conn.execute("SELECT id, status FROM chunk_ids").fetchall())
+        assert outcomes == {'31H228': 'completed', 'BROKEN': 'failed'}
+        reason, = queue.conn.execute("SELECT reason FROM chunk_ids WHERE id = 'BROKEN'").fetchone()
+        assert 'has no AADT table' in reason
+    finally:
+        queue.close()
@@ -0,0 +1,20 @@
+import logging
+
+from TCDS_Scraping_Tool.config import setup_logging
+
+
+def test_later_setup_keeps_the_log_file(tmp_path, monkeypatch):
+    root = logging.getLogger()
+    monkeypatch.setattr(root, 'handlers', [])
+    monkeypatch.setattr(root, 'level', root.level)
+
+    # The command line sets up logging, then BatchScrapper asks for its log file
+    setup_logging()
+    setup_logging(str(tmp_path / 'scraping.log'))
+    setup_logging(str(tmp_path / 'scraping.log'))
+    assert [type(handler) for handler in root.handlers] == [logging.StreamHandler, logging.FileHandler]
+
+    logging.getLogger('TCDS_Scraping_Tool.aadt_scraping').info('Processing ID: S133')
+    root.handlers[1].flush()
+    assert 'INFO - Processing ID: S133' in (tmp_path / 'scraping.log').read_text()
+    root.handlers[1].close()
@@ -0,0 +1,41 @@
+import pandas as pd
+import pytest
+
+pytest.importorskip('pyarrow')
+
+from TCDS_Scraping_Tool.dataset import AADTDataset
+
+AADT = pd.DataFrame([
+    {'station_id': 'S1', 'direction': 'two-way', 'year': 2023, 'aadt': 1200, 'src': 'Actual'},
+    {'station_id': 'S1', 'direction': 'two-way', 'year': 2022, 'aadt': 1100, 'src': 'Actual'},
+    {'station_id': 'S2', 'direction': 'two-way', 'year': 2023, 'aadt': 500, 'src': 'Actual'},
+])
+
+
+def station(station_id, district, county):
+    return pd.DataFrame([{'station_id': station_id, 'district': district, 'county': county}])
+
+
+def partition_rows(dataset, **partition):
+    return sorted(map(tuple, dataset.read_aadt(**partition)[['station_id', 'year']].to_numpy().tolist()))
+
+
+def test_aadt_rows_follow_their_station(tmp_path):
+    dataset = AADTDataset(str(tmp_path))
+    dataset.upsert_stations(station('S2', 'Austin', 'Travis'))
+    assert dataset.upsert_aadt(AADT) == 3
+    assert partition_rows(dataset, district='unknown') == [('S1', 2022), ('S1', 2023)]
+
+    # Metadata loaded after the AADT moves the rows out of the unknown partition
+    dataset.upsert_stations(station('S1', 'Austin', 'Hays'))
+    assert partition_rows(dataset, district='unknown') == []
+    assert partition_rows(dataset, county='Hays') == [('S1', 2022), ('S1', 2023)]
+
+    # A station moved to another district leaves nothing in the old one
+    dataset.upsert_stations(station('S1', 'San Antonio', 'Comal'))
+    assert partition_rows(dataset, district='Austin') == [('S2', 2023)]
+    assert partition_rows(dataset, district='San Antonio') == [('S1', 2022), ('S1', 2023)]
+    assert len(dataset.read_aadt()) == 3
+
+    # Unchanged metadata moves nothing
+    assert dataset.move_aadt(dataset.station_partitions()) == 0
@@ -0,0 +1,61 @@
+import pytest
+
+from benchmarks.tcds_stub import TCDSStub, list_station
+from TCDS_Scraping_Tool.discovery import (discover, parse_station_list, read_index, select_stations, shard_stations,
+                                          update_index)
+
+LIST_SIZE = 60
+
+
+@pytest.fixture(scope='module')
+def stub():
+    with TCDSStub(latency=0.0, list_size=LIST_SIZE) as stub:
+        yield stub
+
+
+@pytest.fixture(scope='module')
+def index(stub):
+    return discover(base_url=stub.url, rate_limit=None)
+
+
+def test_every_page_of_the_list_is_read(stub, index):
+    assert len(index) == LIST_SIZE
+    assert stub.server.snapshot()['/tcds/ajax/tcds_tsearch_list.asp 200'] >= 3
+    stations = index.set_index('station_id')
+    assert stations.loc['BENCH00000', ['district', 'county', 'last_count_date']].tolist() == ['Austin', 'Travis', '2015-01-01']
+    assert stations.loc[['BENCH00000', 'BENCH00001'], 'active'].tolist() == [False, True]
+
+
+def test_parse_station_list_reads_cells_by_header():
+    html = ('<table><tr><th>Active</th><th>Loc ID</th><th>Last Count</th></tr>'
+            '<tr><td>No</td><td><a href="#">S133</a></td><td>5/2/2023</td></tr>'
+            '<tr><td colspan="3">Page 1 of 1</td></tr></table>')
+    assert parse_station_list(html) == [{'active': False, 'station_id': 'S133', 'last_count_date': '2023-05-02'}]
+    assert parse_station_list('') == []
+
+
+def test_district_filter(stub, index):
+    austin = discover(base_url=stub.url, rate_limit=None, district='Austin')
+    expected = sorted(station['station_id'] for station in map(list_station, range(LIST_SIZE)) if station['district'] == 'Austin')
+    assert sorted(austin['station_id']) == expected
+    assert sorted(select_stations(index, districts=['Austin'])['station_id']) == expected
+    assert select_stations(index, active_only=True)['active'].all()
+
+
+def test_update_index_keeps_unlisted_stations(index, tmp_path):
+    path = str(tmp_path / 'index.csv')
+    update_index(path, index)
+    updated = update_index(path, index[index['district'] == 'Austin'].assign(listed='later'))
+    assert len(updated) == LIST_SIZE
+    stored = read_index(path).set_index('station_id')
+    assert stored.loc['BENCH00000', 'listed'] == 'later'
+    assert stored.loc['BENCH00001', 'listed'] != 'later'
+    assert stored.loc[['BENCH00000', 'BENCH00001'], 'active'].tolist() == [False, True]
+
+
+def test_shards_are_stable_and_cover_every_station(index):
+    queues = shard_stations(index, by='district', shards=2)
+    assert shard_stations(index.sample(frac=1, random_state=1), by='district', shards=2) == queues
+    assert set(name.rsplit('_', 1)[0] for name in queues) == {'Austin', 'Dallas', 'Houston', 'El_Paso', 'Lubbock'}
+    ids = [id for shard in queues.values() for id in shard]
+    assert sorted(ids) == sorted(index['station_id'])
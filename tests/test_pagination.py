@@ -0,0 +1,52 @@
+from TCDS_Scraping_Tool.pagination import collect_pages, find_directions, has_data_rows, has_next_page, page_count
+from tests.fixtures import empty_page, read_fixture
+
+
+def test_page_count():
+    assert page_count(read_fixture('aadt_31H228_pg1.html')) == 2
+    assert page_count(read_fixture('aadt_S133_pg1.html')) == 1
+    assert page_count('<td>11 - 20 of 25</td>') == 3
+    assert page_count('<table></table>') is None
+
+
+def test_next_button():
+    assert has_next_page(read_fixture('aadt_31H228_pg1.html'))
+    assert not has_next_page(read_fixture('aadt_31H228_pg2.html'))
+
+
+def test_data_rows():
+    assert has_data_rows(read_fixture('aadt_31H228_pg2.html'))
+    assert not has_data_rows(empty_page())
+
+
+def test_find_directions():
+    assert find_directions(read_fixture('aadt_31H228_pg1.html')) == ['NB', 'SB']
+    assert find_directions(empty_page()) == []
+
+
+def test_collect_pages_follows_page_count():
+    site = {1: read_fixture('aadt_31H228_pg1.html'), 2: read_fixture('aadt_31H228_pg2.html')}
+    requested = []
+
+    def get_page(pg):
+        requested.append(pg)
+        return site.get(pg, empty_page())
+
+    pages, truncated = collect_pages(get_page, max_pages=20)
+    assert pages == [site[1], site[2]]
+    assert requested == [1, 2]
+    assert not truncated
+
+
+def test_collect_pages_stops_at_empty_table():
+    pages, truncated = collect_pages(lambda pg: empty_page(), max_pages=20)
+    assert len(pages) == 1
+    assert not truncated
+
+
+def test_collect_pages_truncates_at_max_pages():
+    # Without a page count, the enabled next button is followed
+    html = read_fixture('aadt_31H228_pg1.html').replace('Page 1 of 2', '')
+    pages, truncated = collect_pages(lambda pg: html, max_pages=3)
+    assert len(pages) == 3
+    assert truncated
@@ -0,0 +1,63 @@
+import json
+
+from TCDS_Scraping_Tool.progress_store import ProgressStore
+
+
+def test_completed_and_failed_survive_reopening(tmp_path):
+    path = str(tmp_path / 'progress.sqlite')
+    store = ProgressStore(path)
+    store.mark_failed('A', 'timeout')
+    store.mark_completed('B')
+    store.mark_failed('C', 'no AADT data retrieved')
+    store.mark_failed('C', 'no AADT data retrieved')
+    store.set_state(last_batch=3)
+    store.close()
+
+    store = ProgressStore(path)
+    try:
+        assert store.is_completed('B')
+        assert not store.is_completed('A')
+        assert store.failed() == {
+            'A': {'reason': 'timeout', 'attempts': 1},
+            'C': {'reason': 'no AADT data retrieved', 'attempts': 2},
+        }
+        assert store.pending(['A', 'B', 'C', 'D']) == ['A', 'C', 'D']
+        assert store.get_state('last_batch') == 3
+        assert store.get_state('missing', 0) == 0
+        assert set(store.completed_at()) == {'B'}
+    finally:
+        store.close()
+
+
+def test_failed_id_completed_later(tmp_path):
+    store = ProgressStore(str(tmp_path / 'progress.sqlite'))
+    try:
+        store.mark_failed('A', 'timeout')
+        store.mark_completed('A')
+        assert store.failed() == {}
+        assert store.is_completed('A')
+    finally:
+        store.close()
+
+
+def test_legacy_json_import(tmp_path):
+    legacy = tmp_path / 'scraping_progress.json'
+    legacy.write_text(json.dumps({'completed_ids': ['A', 'B'], 'failed_ids': ['C'], 'last_batch': 4}))
+    store = ProgressStore(str(tmp_path / 'progress.sqlite'), legacy_json=str(legacy))
+    try:
+        assert store.pending(['A', 'B', 'C']) == ['C']
+        assert store.failed() == {'C': {'reason': 'imported', 'attempts': 1}}
+        assert store.get_state('last_batch') == 4
+    finally:
+        store.close()
+
+
+def test_failed_lookup_of_some_ids(tmp_path):
+    store = ProgressStore(str(tmp_path / 'progress.sqlite'))
+    try:
+        store.mark_failed('A', 'timeout')
+        store.mark_failed('B', 'malformed')
+        assert store.failed(['B', 'C']) == {'B': {'reason': 'malformed', 'attempts': 1}}
+        assert store.failed([]) == {}
+    finally:
+        store.close()
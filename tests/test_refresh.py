@@ -0,0 +1,50 @@
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytest
+
+pytest.importorskip('pyarrow')
+
+from TCDS_Scraping_Tool.dataset import AADTDataset
+from TCDS_Scraping_Tool.progress_store import ProgressStore
+from TCDS_Scraping_Tool.refresh import MISSING, Refresher, plan_refresh
+
+
+class EmptyBackend:
+    """Backend whose stations all have an AADT table without rows"""
+
+    def fetch_first_page(self, id):
+        return None
+
+    def scrape_station(self, id, first_page=None):
+        if id == 'BROKEN':
+            raise RuntimeError('page has no AADT table')
+        return {}
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    dataset = AADTDataset(str(tmp_path / 'dataset'))
+    dataset.upsert_stations(pd.DataFrame([{'station_id': id, 'district': 'Austin', 'county': 'Travis'}
+                                          for id in ('S1', 'S2', 'S3')]))
+    return dataset
+
+
+def test_missing_stations_follow_recheck_days(dataset):
+    recent = datetime.now().isoformat()
+    old = (datetime.now() - timedelta(days=45)).isoformat()
+    plan = plan_refresh(dataset, last_checked={'S1': recent, 'S2': old})
+    assert list(plan['station_id']) == ['S3', 'S2']
+    assert set(plan['reason']) == {MISSING}
+
+
+def test_empty_station_counts_as_checked(dataset, tmp_path):
+    progress = ProgressStore(str(tmp_path / 'progress.sqlite'))
+    try:
+        counts = Refresher(dataset, EmptyBackend(), progress).run(pd.DataFrame({'station_id': ['S1', 'BROKEN']}))
+        assert (counts['empty'], counts['failed']) == (1, 1)
+        assert progress.failed()['BROKEN']['reason'] == 'page has no AADT table'
+        plan = plan_refresh(dataset, last_checked=progress.completed_at())
+        assert list(plan['station_id']) == ['S2', 'S3']
+    finally:
+        progress.close()
@@ -0,0 +1,141 @@
+import sqlite3
+
+import pytest
+
+from benchmarks.tcds_stub import TCDSStub
+from TCDS_Scraping_Tool.backends import HttpBackend
+from TCDS_Scraping_Tool.response_cache import CacheMiss, ResponseCache, cache_key, first_page_key
+from tests.fixtures import aadt_pages
+
+AADT_REQUESTS = '/tcds/ajax/tcds_tdetail_aadt.asp 200'
+
+
+def page_key(pg, direction=None):
+    return cache_key('tcds_tdetail_aadt.asp', '97', 'S1', pg, direction)
+
+
+def fetcher(body, status=200, headers=None):
+    calls = []
+
+    def fetch(conditional):
+        calls.append(conditional)
+        return status, body, headers or {}
+
+    return fetch, calls
+
+
+def test_first_page_key():
+    assert first_page_key(page_key(3, 'NB')) == page_key(1, 'NB')
+    assert first_page_key(page_key(1)) is None
+    assert first_page_key(cache_key('tsearch.asp', 'Txdot', 'S1')) is None
+
+
+def test_hit_and_offline_miss(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    fetch, calls = fetcher('<html>1</html>')
+    assert cache.get_or_fetch(page_key(1), fetch, current=True) == '<html>1</html>'
+    assert cache.get_or_fetch(page_key(1), fetch, current=True) == '<html>1</html>'
+    assert len(calls) == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+    cache.close()
+
+    offline = ResponseCache(str(tmp_path), offline=True)
+    assert offline.get_fresh(page_key(1)) == '<html>1</html>'
+    with pytest.raises(CacheMiss):
+        offline.get_or_fetch(page_key(2), fetch)
+    offline.close()
+
+
+def test_stale_entry_is_revalidated(tmp_path):
+    cache = ResponseCache(str(tmp_path), ttl=0)
+    fetch, _ = fetcher('<html>1</html>', headers={'ETag': '"v1"'})
+    cache.get_or_fetch(page_key(1), fetch, current=True)
+
+    not_modified, calls = fetcher('', status=304)
+    assert cache.get_or_fetch(page_key(1), not_modified, current=True) == '<html>1</html>'
+    assert calls == [{'If-None-Match': '"v1"'}]
+    cache.close()
+
+
+def test_later_pages_follow_their_first_page(tmp_path):
+    cache = ResponseCache(str(tmp_path), ttl=0)
+    cache.get_or_fetch(page_key(1), fetcher('first v1')[0], current=True)
+    cache.get_or_fetch(page_key(2), fetcher('second v1')[0])
+
+    # Same first page: the historical page is served from the cache
+    cache.get_or_fetch(page_key(1), fetcher('first v1')[0], current=True)
+    fetch, calls = fetcher('second v2')
+    assert cache.get_or_fetch(page_key(2), fetch) == 'second v1'
+    assert not calls
+
+    # A changed first page invalidates the later pages of the same station and direction only
+    cache.get_or_fetch(page_key(1), fetcher('first v2')[0], current=True)
+    assert cache.get_or_fetch(page_key(2), fetch) == 'second v2'
+    assert len(calls) == 1
+    assert cache.get_or_fetch(page_key(2), fetch) == 'second v2'
+    assert len(calls) == 1
+    cache.close()
+
+
+def test_new_year_shifts_rows_to_later_pages(tmp_path):
+    """A year published after caching moves every row one place; no year may be lost"""
+    with TCDSStub(latency=0.0) as stub:
+        fixtures = stub.server.fixtures
+        pages = fixtures.aadt.setdefault('SHIFT', {})
+        fixtures.aadt_ids.append('SHIFT')
+        pages[None] = aadt_pages(2010, 2023)
+        cache = ResponseCache(str(tmp_path), ttl=0)
+        backend = HttpBackend(base_url=stub.url, cache=cache)
+        try:
+            years = [row['year'] for row in backend.scrape_station('SHIFT')[None]]
+            assert years == list(range(2023, 2009, -1))
+
+            # Unchanged first page: only it is requested again
+            stub.server.reset()
+            backend.scrape_station('SHIFT')
+            assert stub.server.snapshot()[AADT_REQUESTS] == 1
+
+            pages[None] = aadt_pages(2010, 2024)
+            years = [row['year'] for row in backend.scrape_station('SHIFT')[None]]
+            assert years == list(range(2024, 2009, -1))
+        finally:
+            backend.close()
+            cache.close()
+
+
+def test_cache_of_older_schema_is_upgraded(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / 'index.sqlite'))
+    conn.execute("CREATE TABLE responses (key TEXT PRIMARY KEY, digest TEXT NOT NULL, size INTEGER NOT NULL, etag TEXT, "
+                 "last_modified TEXT, stored_at REAL NOT NULL, accessed_at REAL NOT NULL)")
+    conn.commit()
+    conn.close()
+    cache = ResponseCache(str(tmp_path))
+    cache.get_or_fetch(page_key(1), fetcher('first')[0], current=True)
+    fetch, calls = fetcher('second')
+    cache.get_or_fetch(page_key(2), fetch)
+    cache.get_or_fetch(page_key(2), fetch)
+    assert len(calls) == 1
+    cache.close()
+
+
+def test_least_recently_used_responses_are_evicted(tmp_path):
+    cache = ResponseCache(str(tmp_path), max_bytes=25)
+    for pg in (1, 2):
+        cache.store(page_key(pg), f'page {pg} '.ljust(10, '.'))
+    # A body shared by two keys is counted once
+    cache.store(page_key(1, 'NB'), 'page 1 ...')
+    assert cache.total_bytes == 20
+    cache.get_fresh(page_key(1))
+    cache.store(page_key(3), 'page 3 ...')
+    assert cache.total_bytes == 20
+    assert cache.lookup(page_key(2)) is None
+    assert cache.lookup(page_key(1)).body == 'page 1 ...'
+
+    # Replacing a body releases the old one
+    cache.store(page_key(3), 'page 3 v2.')
+    assert cache.total_bytes == cache.stored_bytes() == 20
+    assert len(list(tmp_path.glob('objects/*/*'))) == 2
+    cache.close()
+    cache = ResponseCache(str(tmp_path))
+    assert cache.total_bytes == 20
+    cache.close()
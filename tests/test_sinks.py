@@ -0,0 +1,70 @@
+import csv
+import json
+
+import pytest
+
+from TCDS_Scraping_Tool.sinks import CsvSink, JsonlSink, open_sink, output_files
+
+RECORDS = [
+    {'station_id': '31H228', 'direction': 'two-way', 'year': 2023, 'aadt': 18611, 'k_percent': 9.5, 'src': 'Actual'},
+    {'station_id': '31H228', 'direction': 'NB', 'year': 2023, 'aadt': 9300, 'k_percent': None, 'src': 'Actual'},
+]
+
+
+def test_jsonl_flushes_every_n_records(tmp_path):
+    path = tmp_path / 'out.jsonl'
+    flushes = []
+    sink = open_sink(str(path), flush_every=2, on_flush=lambda: flushes.append(1))
+    assert isinstance(sink, JsonlSink)
+    sink.write(RECORDS[0])
+    assert not path.exists()
+    sink.write(RECORDS[1])
+    assert [json.loads(line) for line in path.read_text().splitlines()] == RECORDS
+    assert flushes == [1]
+    sink.close()
+
+
+def test_csv_appends_without_repeating_the_header(tmp_path):
+    path = tmp_path / 'out.csv'
+    for record in RECORDS:
+        sink = open_sink(str(path))
+        assert isinstance(sink, CsvSink)
+        sink.write(record)
+        sink.close()
+    with open(path, newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert [row['direction'] for row in rows] == ['two-way', 'NB']
+    assert rows[1]['k_percent'] == ''
+
+
+def test_rotation(tmp_path):
+    path = tmp_path / 'out.jsonl'
+    sink = open_sink(str(path), flush_every=1, max_bytes=10)
+    for record in RECORDS:
+        sink.write(record)
+    sink.close()
+    assert [file.name for file in output_files(str(path))] == ['out.00000.jsonl', 'out.00001.jsonl']
+
+    # A new run continues after the full parts
+    sink = open_sink(str(path), flush_every=1, max_bytes=10)
+    assert sink.current_path.name == 'out.00002.jsonl'
+    sink.close()
+
+
+def test_parquet_parts_keep_types(tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    path = tmp_path / 'out.parquet'
+    for _ in range(2):
+        sink = open_sink(str(path))
+        sink.write_many(RECORDS)
+        sink.close()
+    files = output_files(str(path))
+    assert [file.name for file in files] == ['out.00000.parquet', 'out.00001.parquet']
+    table = pq.read_table(files[0])
+    assert table.column('aadt').to_pylist() == [18611, 9300]
+    assert table.column('k_percent').to_pylist() == [9.5, None]
+
+
+def test_unsupported_format(tmp_path):
+    with pytest.raises(ValueError):
+        open_sink(str(tmp_path / 'out.xlsx'))
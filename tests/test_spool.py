@@ -0,0 +1,21 @@
+import json
+
+from TCDS_Scraping_Tool.spool import Spool, main
+from tests.fixtures import read_fixture
+
+
+def test_offline_parse_skips_parsed_files(tmp_path):
+    spool = Spool(str(tmp_path / 'spool'))
+    spool.write('S133', None, [read_fixture('aadt_S133_pg1.html')])
+    output = tmp_path / 'out.jsonl'
+
+    main([str(spool.root), '-o', str(output), '-p', '1'])
+    records = output.read_text().splitlines()
+    assert records and {json.loads(line)['station_id'] for line in records} == {'S133'}
+    assert spool.files() == []
+
+    main([str(spool.root), '-o', str(output), '-p', '1'])
+    assert output.read_text().splitlines() == records
+
+    main([str(spool.root), '-o', str(tmp_path / 'all.jsonl'), '-p', '1', '--all'])
+    assert (tmp_path / 'all.jsonl').read_text().splitlines() == records
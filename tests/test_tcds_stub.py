@@ -0,0 +1,52 @@
+from urllib.request import urlopen
+
+import pytest
+
+from benchmarks.tcds_stub import TCDSStub
+from tests.fixtures import read_fixture
+
+
+@pytest.fixture(scope='module')
+def stub():
+    with TCDSStub(latency=0.0, list_size=60) as stub:
+        yield stub
+
+
+def get(stub, path):
+    with urlopen(stub.url + path, timeout=10) as response:
+        return response.status, response.read().decode('utf-8')
+
+
+def test_detail_page_is_replayed(stub):
+    status, body = get(stub, '/tcds/tsearch.asp?loc=Txdot&mod=tcds&local_id=S133')
+    assert status == 200
+    assert body == read_fixture('detail_S133.html')
+    # Other stations get a recorded detail page too
+    assert get(stub, '/tcds/tsearch.asp?loc=Txdot&mod=tcds&local_id=OTHER')[1] == body
+
+
+def test_every_endpoint_answers(stub):
+    """Smoke test of the endpoints in the module docstring, so a broken harness fails here and not in a benchmark"""
+    stub.server.reset()
+    with urlopen(stub.url + '/tcds/tsearch.asp?loc=Txdot&mod=tcds', timeout=10) as response:
+        assert response.status == 200
+        assert 'ASPSESSIONID' in response.headers['Set-Cookie']
+
+    assert 'Location ID' in get(stub, '/tcds/tsearch.asp?loc=Txdot&mod=tcds&local_id=S133')[1]
+
+    two_way = get(stub, '/tcds/ajax/tcds_tdetail_aadt.asp?loc=Txdot&local_id=31H228&pg=1')[1]
+    assert two_way == read_fixture('aadt_31H228_pg1.html')
+    north = get(stub, '/tcds/ajax/tcds_tdetail_aadt.asp?loc=Txdot&local_id=31H228&pg=1&dir=NB')[1]
+    assert 'class="btnSel" value="NB"' in north and north != two_way
+    assert 'Page 2 of 2' in get(stub, '/tcds/ajax/tcds_tdetail_aadt.asp?loc=Txdot&local_id=31H228&pg=2')[1]
+
+    listed = get(stub, '/tcds/ajax/tcds_tsearch_list.asp?loc=Txdot&pg=1')[1]
+    assert 'BENCH00000' in listed and 'Page 1 of 3' in listed
+    austin = get(stub, '/tcds/ajax/tcds_tsearch_list.asp?loc=Txdot&pg=1&district=Austin')[1]
+    assert 'Page 1 of 1' in austin and 'Dallas' not in austin
+
+    assert stub.server.snapshot() == {
+        '/tcds/tsearch.asp 200': 2,
+        '/tcds/ajax/tcds_tdetail_aadt.asp 200': 3,
+        '/tcds/ajax/tcds_tsearch_list.asp 200': 2,
+    }
@@ -0,0 +1,76 @@
+import time
+
+import pytest
+
+from TCDS_Scraping_Tool.work_queue import WorkQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = WorkQueue(str(tmp_path / 'queue.sqlite'), lease_seconds=60, max_attempts=2)
+    yield queue
+    queue.close()
+
+
+def ids(queue, status):
+    return sorted(id for id, in queue.conn.execute("SELECT id FROM chunk_ids WHERE status = ?", (status,)))
+
+
+def expire_leases(queue):
+    queue.conn.execute("UPDATE chunks SET lease_until = ? WHERE status = 'leased'", (time.time() - 1,))
+
+
+def test_claim_hands_out_each_chunk_once(queue):
+    assert queue.add_ids(['A', 'B', 'C', 'A'], chunk_size=2) == 3
+    assert queue.add_ids(['C', 'D'], chunk_size=2) == 1
+    first = queue.claim('w1')
+    second = queue.claim('w2')
+    assert (first.chunk_id, first.ids, first.attempts) == (1, ['A', 'B'], 1)
+    assert second.ids == ['C']
+    assert queue.claim('w3').ids == ['D']
+    assert queue.claim('w4') is None
+
+
+def test_expired_lease_is_reclaimed(queue):
+    queue.add_ids(['A', 'B'])
+    chunk = queue.claim('w1')
+    assert queue.heartbeat('w1', chunk.chunk_id)
+    expire_leases(queue)
+
+    reclaimed = queue.claim('w2')
+    assert (reclaimed.chunk_id, reclaimed.attempts) == (chunk.chunk_id, 2)
+    assert not queue.heartbeat('w1', chunk.chunk_id)
+    # The late worker's outcome is kept, but it no longer owns the chunk
+    assert not queue.finish_chunk('w1', chunk.chunk_id, completed=['A'])
+    assert queue.finish_chunk('w2', chunk.chunk_id, completed=['B'])
+    assert queue.counts() == {'chunks': {'done': 1}, 'ids': {'completed': 2}}
+
+
+def test_chunk_is_given_up_after_max_attempts(queue):
+    queue.add_ids(['A'])
+    for _ in range(2):
+        assert queue.claim('w1') is not None
+        expire_leases(queue)
+    assert queue.claim('w2') is None
+    assert queue.counts()['chunks'] == {'failed': 1}
+
+    queue.requeue_failed()
+    assert queue.claim('w2').attempts == 1
+
+
+def test_finish_chunk_records_outcomes(queue):
+    queue.add_ids(['A', 'B', 'C'])
+    chunk = queue.claim('w1')
+    assert queue.finish_chunk('w1', chunk.chunk_id, completed=['A'], failed={'B': 'timeout'})
+    assert ids(queue, 'completed') == ['A']
+    assert queue.conn.execute("SELECT reason FROM chunk_ids WHERE id = 'B'").fetchone() == ('timeout',)
+
+    # C has no outcome, so the chunk goes back to the queue with only C
+    retry = queue.claim('w2')
+    assert (retry.chunk_id, retry.ids) == (chunk.chunk_id, ['C'])
+    assert queue.finish_chunk('w2', retry.chunk_id, completed=['C'])
+    assert queue.counts()['chunks'] == {'done': 1}
+    assert ids(queue, 'failed') == ['B']
+
+    queue.requeue_failed()
+    assert queue.claim('w3').ids == ['B']